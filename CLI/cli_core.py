@@ -1,4 +1,10 @@
+import re
+
 from mvcc.record import Record
+from vector_search import metrics
+
+# "@field=value" metadata tokens; queries also accept @field!=value, <, <=, >, >=
+_FIELD = re.compile(r"@(\w+)(==|!=|<=|>=|=|<|>)(.*)")
 
 class Shell:
     def __init__(self, user, store=None):
@@ -7,6 +13,30 @@ class Shell:
         self.current_txn = None
         self.txn_map = {}  # Maps user txn names to actual txn IDs
 
+def _parse_value(text):
+    if text in ("true", "false"):
+        return text == "true"
+    for kind in (int, float):
+        try:
+            return kind(text)
+        except ValueError:
+            pass
+    return text
+
+def parse_fields(args):
+    """Splits leading @field<op>value tokens off args. Returns ({field: (op, value)}, remaining args)."""
+    fields = {}
+    while args and (match := _FIELD.fullmatch(args[0])):
+        field, op, value = match.groups()
+        fields[field] = ("==" if op == "=" else op, _parse_value(value))
+        args = args[1:]
+    return fields, args
+
+def _metadata(fields):
+    if any(op != "==" for op, _ in fields.values()):
+        raise ValueError("metadata is set with @field=value")
+    return {field: value for field, (_, value) in fields.items()} or None
+
 def process_line(shell, line):
     cmd, *args = line.strip().split()
     if cmd == "begin":
@@ -16,12 +46,14 @@ def process_line(shell, line):
         shell.current_txn = txn_id  # Optionally set as current
         return f"began {txn_name} T{txn_id}"
     elif cmd == "insert":
+        # insert <txn> <key> [@field=value ...] <value...>
         txn_name = args[0]
-        key, value = args[1], " ".join(args[2:])
+        fields, words = parse_fields(args[2:])
+        key, value = args[1], " ".join(words)
         txn_id = shell.txn_map[txn_name]
 
         try:
-            shell.store.insert(txn_id, Record(key, value))
+            shell.store.insert(txn_id, Record(key, value, _metadata(fields)))
         except Exception as e:
             print("write conflict, aborting transaction: ", txn_id)
             shell.store.abort_transaction(txn_id)
@@ -30,17 +62,32 @@ def process_line(shell, line):
     
     elif cmd == "update":
         txn_name = args[0]
-        key, value = args[1], " ".join(args[2:])
+        fields, words = parse_fields(args[2:])
+        key, value = args[1], " ".join(words)
         txn_id = shell.txn_map[txn_name]
 
         try:
-            shell.store.update(txn_id, Record(key, value))
+            shell.store.update(txn_id, Record(key, value, _metadata(fields)))
         except Exception as e:
             print("write conflict, aborting transaction: ", txn_id)
             shell.store.abort_transaction(txn_id)
             return f"{e}"
         
         return "ok"
+    elif cmd == "load":
+        # load <txn> <path>: bulk insert one "<key> <value...>" record per line of the file
+        txn_name, path = args[0], args[1]
+        txn_id = shell.txn_map[txn_name]
+        with open(path) as f:
+            records = [Record(*line.strip().split(maxsplit=1)) for line in f if line.strip()]
+
+        try:
+            shell.store.insert_many(txn_id, records)
+        except Exception as e:
+            print("write conflict, aborting transaction: ", txn_id)
+            shell.store.abort_transaction(txn_id)
+            return f"{e}"
+        return f"loaded {len(records)}"
     elif cmd == "delete":
         txn_name = args[0]
         key = args[1]
@@ -50,7 +97,11 @@ def process_line(shell, line):
     elif cmd == "commit":
         txn_name = args[0] if args else "default"
         txn_id = shell.txn_map.get(txn_name, shell.current_txn)
-        shell.store.commit_transaction(txn_id)
+        try:
+            shell.store.commit_transaction(txn_id)
+        except Exception as e:
+            # e.g. the transaction was aborted by an earlier write conflict
+            return f"{e}"
         return f"committed {txn_name} T{txn_id}"
     elif cmd == "abort":
         txn_name = args[0] if args else "default"
@@ -59,14 +110,36 @@ def process_line(shell, line):
         return f"aborted {txn_name} T{txn_id}"
     elif cmd == "query":
         # If a txn name is provided, use it; otherwise, use current_txn
+        # query [<txn>] [--hybrid[=prefilter]] [@field<op>value ...] <text...>
+        where = None
+        hybrid = None
+        for flag in [a for a in args if a.startswith("--hybrid")]:
+            hybrid = flag.partition("=")[2] or True
+            args.remove(flag)
         if args:
             txn_name = args[0]
             txn_id = shell.txn_map.get(txn_name, shell.current_txn)
-            query_str = " ".join(args[1:]) if len(args) > 1 else ""
+            where, words = parse_fields(args[1:])
+            query_str = " ".join(words)
         else:
             txn_id = shell.current_txn
             query_str = ""
-        return repr({r.id: r.value for r in shell.store.read(txn_id, query_str, 2)})
+        return repr({r.id: r.value for r in shell.store.read(txn_id, query_str, 2, where=where or None, hybrid=hybrid)})
+    elif cmd == "index":
+        # index <field> [hash|sorted]
+        field, kind = args[0], args[1] if len(args) > 1 else "hash"
+        shell.store.create_index(field, kind)
+        return f"indexed {field} ({kind})"
+    elif cmd == "stats":
+        # stats: counters, latency summaries and gauges; stats prometheus [path]: text exposition (to a file)
+        if args and args[0] == "prometheus":
+            text = metrics.prometheus(shell.store)
+            if len(args) > 1:
+                with open(args[1], "w") as f:
+                    f.write(text)
+                return f"wrote {args[1]}"
+            return text
+        return repr(metrics.stats(shell.store))
     elif cmd == "sleep":
         import time
         time.sleep(5)
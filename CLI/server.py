@@ -0,0 +1,169 @@
+"""
+Asyncio TCP front-end for the CLI command language.
+
+Clients send one command per line (begin / insert / update / delete / query /
+commit / abort / ..., exactly as in cli_core) and get one response line per
+command, in order. Each connection is a session with its own Shell, so
+transaction names are private to it; transactions a client leaves open are
+aborted when it disconnects.
+
+Commands are executed on a thread pool, since encoding and search block (the
+Store is thread-safe). A connection may pipeline up to `max_pipeline` commands
+before the server stops reading from it, and responses wait on the socket's
+drain(), so a slow client is throttled instead of buffered without bound.
+Connections over `max_connections` get an error line and are closed.
+
+    python -m CLI.server --port 7431 --workers 8 [--data-dir DIR]
+
+- CommandServer: The server (start / stop, or serve_forever through main).
+- main: Command-line entry point; with --data-dir it recovers from and logs to DIR.
+"""
+
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from CLI.cli_core import Shell, process_line
+from mvcc.store import Store
+from mvcc.transaction import TransactionStatus
+
+
+class CommandServer:
+    def __init__(self, store: Store, host: str = "127.0.0.1", port: int = 7431, workers: int = 8,
+                 max_connections: int = 256, max_pipeline: int = 32):
+        """
+        Args:
+            store (Store): The store every session works against.
+            host, port: Where to listen (port 0 picks a free port; see self.port after start).
+            workers (int): Threads executing commands.
+            max_connections (int): Concurrent sessions; further connections are refused.
+            max_pipeline (int): Commands read ahead per connection before reading pauses.
+        """
+        self.store = store
+        self.host = host
+        self.port = port
+        self.max_connections = max_connections
+        self.max_pipeline = max_pipeline
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cli-server")
+        self.connections = 0
+        self.stats = {"connections": 0, "refused": 0, "commands": 0, "errors": 0}
+        self._server = None
+        self._sessions: dict[asyncio.Task, asyncio.StreamWriter] = {}
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self) -> None:
+        """Stops listening, hangs up on every session (aborting their open transactions) and waits for them."""
+        if self._server is not None:
+            self._server.close()
+        for writer in self._sessions.values():
+            writer.close()
+        await asyncio.gather(*self._sessions, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+        self.executor.shutdown(wait=True)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        if self.connections >= self.max_connections:
+            self.stats["refused"] += 1
+            writer.write(b"error: too many connections\n")
+            await writer.drain()
+            writer.close()
+            return
+        self.connections += 1
+        self.stats["connections"] += 1
+        self._sessions[asyncio.current_task()] = writer
+        shell = Shell(user=str(writer.get_extra_info("peername")), store=self.store)
+        pending: asyncio.Queue = asyncio.Queue(maxsize=self.max_pipeline)
+        executor = asyncio.create_task(self._execute(shell, pending, writer))
+        try:
+            # reading stops while the pipeline is full, which pushes back on the client through TCP
+            while not executor.done():
+                line = await reader.readline()
+                if not line:
+                    break
+                line = line.decode().strip()
+                if line:
+                    await self._enqueue(pending, line, executor)
+                if line == "quit":
+                    break
+            await self._enqueue(pending, None, executor)
+            await executor
+        except (ConnectionError, asyncio.IncompleteReadError):
+            executor.cancel()
+        finally:
+            self.connections -= 1
+            await asyncio.get_running_loop().run_in_executor(self.executor, self._end_session, shell)
+            writer.close()
+            del self._sessions[asyncio.current_task()]
+
+    @staticmethod
+    async def _enqueue(pending: asyncio.Queue, line, executor: asyncio.Task) -> None:
+        # waits for room in the pipeline, unless the executor stopped (e.g. the client hung up)
+        put = asyncio.ensure_future(pending.put(line))
+        await asyncio.wait({put, executor}, return_when=asyncio.FIRST_COMPLETED)
+        put.cancel()
+
+    async def _execute(self, shell: Shell, pending: asyncio.Queue, writer: asyncio.StreamWriter) -> None:
+        loop = asyncio.get_running_loop()
+        while (line := await pending.get()) is not None:
+            if line == "quit":
+                writer.write(b"bye\n")
+                await writer.drain()
+                return
+            self.stats["commands"] += 1
+            try:
+                response = await loop.run_in_executor(self.executor, process_line, shell, line)
+            except Exception as e:
+                self.stats["errors"] += 1
+                response = f"error: {e}"
+            response = "ok" if response is None else str(response)
+            writer.write(response.replace("\n", " ").encode() + b"\n")
+            await writer.drain()
+
+    def _end_session(self, shell: Shell) -> None:
+        # transactions left open by a client that went away would otherwise pin old versions forever
+        for txn_id in shell.txn_map.values():
+            txn = self.store.transactions.get(txn_id)
+            if txn is not None and txn.status == TransactionStatus.ACTIVE:
+                self.store.abort_transaction(txn_id)
+
+
+async def _serve(server: CommandServer) -> None:
+    await server.start()
+    # the bound port, which differs from --port when that is 0
+    print(f"listening on {server.host}:{server.port}", flush=True)
+    await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7431)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--max-connections", type=int, default=256)
+    parser.add_argument("--max-pipeline", type=int, default=32)
+    parser.add_argument("--data-dir", help="recover from and write the WAL / checkpoints to this directory")
+    args = parser.parse_args()
+
+    if args.data_dir:
+        from mvcc.durability import Checkpointer, WriteAheadLog, recover
+
+        store = recover(args.data_dir, wal=WriteAheadLog(args.data_dir))
+        Checkpointer(store, args.data_dir).start()
+    else:
+        store = Store()
+    server = CommandServer(store, args.host, args.port, args.workers, args.max_connections, args.max_pipeline)
+    asyncio.run(_serve(server))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Transaction begin cost as the store grows.
+
+For each store size reports the latency of begin_transaction, the memory a
+freshly begun transaction holds, and the cost of its first read (where the
+snapshot is resolved lazily, or reused when another transaction with the same
+snapshot already resolved it).
+
+    python -m benchmarks.bench_begin --sizes 1000 10000 50000
+"""
+
+import argparse
+import json
+import tracemalloc
+
+from benchmarks.common import populated_store, summarize, time_calls
+
+
+def run(sizes, begins):
+    report = {"results": []}
+    for n in sizes:
+        store = populated_store(n)
+
+        begin_latency = summarize(time_calls(lambda _: store.begin_transaction(), range(begins)))
+
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        txns = [store.begin_transaction() for _ in range(begins)]
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        held = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+        # first read after a commit resolves the snapshot; later readers share it
+        writer = store.begin_transaction()
+        store.commit_transaction(writer)
+        fresh = [store.begin_transaction() for _ in range(2)]
+        first_read = summarize(time_calls(lambda t: store.read(t, "w1 w2", 10), fresh[:1]))
+        shared_read = summarize(time_calls(lambda t: store.read(t, "w1 w2", 10), fresh[1:]))
+
+        report["results"].append({
+            "n": n,
+            "begin": begin_latency,
+            "bytes_per_begun_txn": round(held / len(txns), 1),
+            "first_read_resolving_snapshot": first_read,
+            "read_sharing_snapshot": shared_read,
+            "snapshot_stats": store.snapshot_stats(fresh[1]),
+        })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--begins", type=int, default=1000)
+    args = parser.parse_args()
+    print(json.dumps(run(args.sizes, args.begins), indent=2))
+
+
+if __name__ == "__main__":
+    main()
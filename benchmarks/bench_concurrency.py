@@ -0,0 +1,88 @@
+"""
+Store throughput under concurrent clients.
+
+Runs read-heavy (90/10), mixed (50/50) and write-heavy (10/90) workloads with
+1..N client threads against one Store and reports committed operations per
+second. Every operation is its own transaction: a read is begin / read /
+commit, a write is begin / update of a random record / commit. Updates that
+lose a write-write race are aborted and counted as conflicts. Each result also
+carries the store's per-operation latency histograms (vector_search.metrics).
+
+    python -m benchmarks.bench_concurrency --records 5000 --threads 1 2 4 8
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+
+from benchmarks.common import populated_store, store_metrics, synthetic_texts
+from vector_search import metrics
+
+WORKLOADS = {"read_heavy": 0.9, "mixed": 0.5, "write_heavy": 0.1}
+
+
+def _client(store, n_records, read_ratio, ops, values, seed, counts):
+    from mvcc.record import Record
+
+    rng = random.Random(seed)
+    done = conflicts = 0
+    for _ in range(ops):
+        txn = store.begin_transaction()
+        try:
+            if rng.random() < read_ratio:
+                store.read(txn, rng.choice(values), 5)
+            else:
+                store.update(txn, Record(f"r{rng.randrange(n_records)}", rng.choice(values)))
+        except Exception:
+            store.abort_transaction(txn)
+            conflicts += 1
+            continue
+        store.commit_transaction(txn)
+        done += 1
+    counts.append((done, conflicts))
+
+
+def run(n_records, thread_counts, ops_per_thread):
+    values = synthetic_texts(256, seed=1)
+    report = {"records": n_records, "ops_per_thread": ops_per_thread, "results": []}
+    for workload, read_ratio in WORKLOADS.items():
+        for n_threads in thread_counts:
+            store = populated_store(n_records)
+            store.lock_wait_timeout = 1.0
+            metrics.registry.reset()
+            counts = []
+            threads = [
+                threading.Thread(target=_client, args=(store, n_records, read_ratio, ops_per_thread, values, seed, counts))
+                for seed in range(n_threads)
+            ]
+            start = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            elapsed = time.perf_counter() - start
+            done = sum(c[0] for c in counts)
+            report["results"].append({
+                "workload": workload,
+                "threads": n_threads,
+                "ops_per_s": round(done / elapsed, 1),
+                "conflicts": sum(c[1] for c in counts),
+                "lock_waits": store.lock_wait_stats(),
+                "metrics": store_metrics(store),
+            })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--ops", type=int, default=200, help="operations per client thread")
+    args = parser.parse_args()
+    print(json.dumps(run(args.records, args.threads, args.ops), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+HNSW index vs. the exact search path.
+
+Builds a VectorMatrix of synthetic embeddings, then reports build time, query
+latency and recall@k of HNSWIndex for several ef_search values against
+VectorMatrix.exact_search (what get_top_k_keys runs with no index attached).
+Also reports a filtered run where only a fraction of rows is visible.
+
+    python -m benchmarks.bench_hnsw --n 20000 --dim 128 --ef 16 32 64 128
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from benchmarks.common import summarize, synthetic_vectors, time_calls
+from vector_search.hnsw import HNSWIndex
+from vector_search.vector_store import VectorMatrix
+
+
+def run(n, dim, k, queries, M, ef_construction, ef_values, visible_fraction):
+    data = synthetic_vectors(n, dim)
+    query_vecs = synthetic_vectors(queries, dim, seed=1)
+
+    store = VectorMatrix(dim=dim, capacity=n)
+    for i, vec in enumerate(data):
+        store.add(f"k{i}", vec)
+    rng = np.random.default_rng(2)
+    visible_rows = np.sort(rng.choice(n, size=max(k, int(n * visible_fraction)), replace=False))
+    allowed = np.zeros(n, dtype=bool)
+    allowed[visible_rows] = True
+
+    exact = [set(store.exact_search(q, k).tolist()) for q in query_vecs]
+    exact_filtered = [set(store.exact_search(q, k, allowed).tolist()) for q in query_vecs]
+    report = {
+        "n": n, "dim": dim, "k": k, "M": M, "ef_construction": ef_construction,
+        "exact": summarize(time_calls(lambda q: store.exact_search(q, k), query_vecs)),
+        "exact_filtered": summarize(time_calls(lambda q: store.exact_search(q, k, allowed), query_vecs)),
+    }
+
+    index = HNSWIndex(M=M, ef_construction=ef_construction)
+    start = time.perf_counter()
+    store.attach_index(index)
+    report["build_s"] = round(time.perf_counter() - start, 3)
+
+    report["hnsw"] = []
+    for ef in ef_values:
+        def recall(truth, mask):
+            hits = 0
+            for q, expected in zip(query_vecs, truth):
+                rows, _ = index.search(store.normalize(q), k, mask, ef_search=ef)
+                hits += len(expected & set(rows.tolist()))
+            return round(hits / (k * len(query_vecs)), 4)
+
+        report["hnsw"].append({
+            "ef_search": ef,
+            "latency": summarize(time_calls(lambda q: index.search(store.normalize(q), k, ef_search=ef), query_vecs)),
+            "recall": recall(exact, None),
+            "filtered_latency": summarize(
+                time_calls(lambda q: index.search(store.normalize(q), k, allowed, ef_search=ef), query_vecs)
+            ),
+            "filtered_recall": recall(exact_filtered, allowed),
+        })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=10000)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--M", type=int, default=16)
+    parser.add_argument("--ef-construction", type=int, default=100)
+    parser.add_argument("--ef", type=int, nargs="+", default=[16, 32, 64, 128])
+    parser.add_argument("--visible-fraction", type=float, default=0.5)
+    args = parser.parse_args()
+    report = run(args.n, args.dim, args.k, args.queries, args.M, args.ef_construction, args.ef, args.visible_fraction)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Bytes per version record.
+
+Builds n records with several versions each, once with a plain dict-backed
+class laid out like the original Record and once with the current __slots__
+Record (interned ids), then registers the latter in a VersionTable, and
+reports the traced allocation per version of each (values, vector keys and
+vectors excluded: both layouts share them). Also times
+resolving a full snapshot by walking every chain vs. through the version table.
+
+    python -m benchmarks.bench_memory --n 100000
+"""
+
+import argparse
+import json
+import math
+import tracemalloc
+
+from benchmarks.common import summarize, time_calls
+
+
+class DictRecord:
+    # the layout Record had before __slots__ and the version table
+    def __init__(self, id, value=""):
+        self.id = id
+        self.key = ""
+        self.begin_ts = 0
+        self.end_ts = math.inf
+        self.deleted = False
+        self.created_by_txn_id = None
+        self.value = value
+        self.next = None
+
+
+def _traced_bytes(build):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    return sum(stat.size_diff for stat in after.compare_to(before, "filename")), kept
+
+
+def run(n, versions_per_record):
+    from mvcc.record import Record
+    from mvcc.store import Store
+    from mvcc.version_table import VersionTable
+
+    total = n * versions_per_record
+    value = "shared value"
+
+    # ids arrive as fresh strings with every write (parsed from a command or a file), as in
+    # the CLI; vector keys are left out, the vector store holds those either way
+    def build_dict():
+        out = []
+        for v in range(versions_per_record):
+            for i in range(n):
+                r = DictRecord(f"record-{i}", value)
+                r.begin_ts = r.created_by_txn_id = v + 1
+                out.append(r)
+        return out
+
+    def build_slots():
+        out = []
+        for v in range(versions_per_record):
+            for i in range(n):
+                r = Record(f"record-{i}", value)
+                r.created_by_txn_id = v + 1
+                out.append(r)
+        return out
+
+    def build_table():
+        table = VersionTable()
+        for r in records:
+            table.add(r)
+        return table
+
+    dict_bytes, _ = _traced_bytes(build_dict)
+    slots_bytes, records = _traced_bytes(build_slots)
+    table_bytes, table = _traced_bytes(build_table)
+
+    # visibility: chain walk vs. columnar, over a store holding the same history
+    store = Store()
+    store.versions = table
+    for r in records:
+        r.next = store.records.get(r.id)
+        store.records[r.id] = r
+    # writers are txns 1..versions; the reader starts before the newest versions commit,
+    # so chain walks have to skip them
+    writers = [store.begin_transaction() for _ in range(versions_per_record)]
+    for txn in writers[:-1]:
+        store.commit_transaction(txn)
+    reader = store.transactions[store.begin_transaction()]
+    store.commit_transaction(writers[-1])
+
+    return {
+        "versions": total,
+        "bytes_per_version": {
+            "dict_record": round(dict_bytes / total, 1),
+            "slots_record": round(slots_bytes / total, 1),
+            "version_table_row": round(table_bytes / total, 1),
+        },
+        "snapshot_resolution": {
+            "chain_walk": summarize(time_calls(lambda _: [store._committed_version(reader, h)
+                                                         for h in store.records.values()], range(3))),
+            "version_table": summarize(time_calls(lambda _: store._build_snapshot(reader), range(3))),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=100000, help="number of records")
+    parser.add_argument("--versions", type=int, default=3, help="versions per record")
+    args = parser.parse_args()
+    print(json.dumps(run(args.n, args.versions), indent=2))
+
+
+if __name__ == "__main__":
+    main()
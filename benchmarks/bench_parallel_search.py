@@ -0,0 +1,71 @@
+"""
+Sharded parallel exact search vs. worker count.
+
+Builds a VectorMatrix of synthetic embeddings and reports single-query
+latency, with and without a visibility filter, plus batched throughput
+(search_many) for each number of search workers. With one worker the rows
+are scored on the calling thread; with more, they are split into shards
+scored on a thread pool and the per-shard top-k lists are merged.
+
+Pin BLAS to one thread (e.g. OPENBLAS_NUM_THREADS=1) to measure the pool
+rather than BLAS's own threading:
+
+    OPENBLAS_NUM_THREADS=1 python -m benchmarks.bench_parallel_search --n 200000 --workers 1 2 4 8 16 32
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from benchmarks.common import summarize, synthetic_vectors, time_calls
+from vector_search.vector_store import VectorMatrix
+
+
+def run(n, dim, k, queries, workers_list, shards_per_worker, visible_fraction):
+    data = synthetic_vectors(n, dim)
+    query_vecs = synthetic_vectors(queries, dim, seed=1)
+
+    store = VectorMatrix(dim=dim, capacity=n)
+    for i, vec in enumerate(data):
+        store.add(f"k{i}", vec)
+    rng = np.random.default_rng(2)
+    allowed = rng.random(n) < visible_fraction
+
+    expected = store.search_many(query_vecs, k)
+    report = {"n": n, "dim": dim, "k": k, "cpus": os.cpu_count(), "runs": []}
+    for workers in workers_list:
+        store.set_search_workers(workers, workers * shards_per_worker)
+        assert store.search_many(query_vecs, k) == expected
+        start = time.perf_counter()
+        store.search_many(query_vecs, k)
+        batch_s = time.perf_counter() - start
+        report["runs"].append({
+            "workers": workers,
+            "shards": store.search_shards or 1,
+            "latency": summarize(time_calls(lambda q: store.search(q, k), query_vecs)),
+            "filtered_latency": summarize(time_calls(lambda q: store.search(q, k, allowed), query_vecs)),
+            "batch_qps": round(len(query_vecs) / batch_s, 1),
+        })
+    store.set_search_workers(1)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--shards-per-worker", type=int, default=1)
+    parser.add_argument("--visible-fraction", type=float, default=0.5)
+    args = parser.parse_args()
+    report = run(args.n, args.dim, args.k, args.queries, args.workers, args.shards_per_worker, args.visible_fraction)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Quantized candidate search vs. the exact search path.
+
+Builds a VectorMatrix of synthetic embeddings, then reports recall@k, queries
+per second and code bytes per vector for int8 scalar quantization and for
+product quantization with several sub-vector counts, each at several
+re-rank shortlist lengths, against VectorMatrix.exact_search (float32,
+4 * dim bytes per vector).
+
+    python -m benchmarks.bench_quantization --n 50000 --dim 128 --pq-m 8 16 32 --rerank 2 4 8
+"""
+
+import argparse
+import json
+import time
+
+from benchmarks.common import synthetic_vectors
+from vector_search.quantization import ProductQuantizer, ScalarQuantizer
+from vector_search.vector_store import VectorMatrix
+
+
+def _qps(fn, queries):
+    start = time.perf_counter()
+    for q in queries:
+        fn(q)
+    return round(len(queries) / (time.perf_counter() - start), 1)
+
+
+def run(n, dim, k, queries, pq_m, rerank_factors):
+    data = synthetic_vectors(n, dim)
+    query_vecs = synthetic_vectors(queries, dim, seed=1)
+
+    store = VectorMatrix(dim=dim, capacity=n)
+    for i, vec in enumerate(data):
+        store.add(f"k{i}", vec)
+    exact = [set(store.exact_search(q, k).tolist()) for q in query_vecs]
+    report = {
+        "n": n, "dim": dim, "k": k,
+        "exact": {"qps": _qps(lambda q: store.exact_search(q, k), query_vecs), "bytes_per_vector": 4 * dim},
+        "quantized": [],
+    }
+
+    indexes = [("int8", lambda: ScalarQuantizer())]
+    indexes += [(f"pq{m}", lambda m=m: ProductQuantizer(m=m)) for m in pq_m]
+    for name, make in indexes:
+        index = make()
+        start = time.perf_counter()
+        store.attach_index(index)
+        train_s = round(time.perf_counter() - start, 3)
+        for factor in rerank_factors:
+            shortlist = k * factor
+
+            def search(q):
+                return index.search(store.normalize(q), k, ef_search=shortlist)[0]
+
+            hits = sum(len(expected & set(search(q).tolist())) for q, expected in zip(query_vecs, exact))
+            report["quantized"].append({
+                "index": name,
+                "rerank": shortlist,
+                "train_s": train_s,
+                "bytes_per_vector": index.code_bytes,
+                "recall": round(hits / (k * len(query_vecs)), 4),
+                "qps": _qps(search, query_vecs),
+            })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--pq-m", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--rerank", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+    print(json.dumps(run(args.n, args.dim, args.k, args.queries, args.pq_m, args.rerank), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Load generator for the CLI command server.
+
+Opens `sessions` concurrent connections; each runs `rounds` transactions of
+begin / insert / query / commit, sending up to `pipeline` commands before
+reading their responses. Reports per-command latency percentiles (from send
+to response), transactions per second and error responses. Without --port an
+in-process server over a fresh Store is started first.
+
+    python -m benchmarks.bench_server --sessions 1 8 32 --rounds 50 --pipeline 1 4
+    python -m benchmarks.bench_server --port 7431 --sessions 64     # against a running server
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import time
+
+from benchmarks.common import summarize, synthetic_texts
+from CLI.server import CommandServer
+from mvcc.store import Store
+
+_ids = itertools.count()
+
+
+async def _session(host, port, rounds, pipeline, texts, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(rounds):
+            n = next(_ids)
+            commands = [
+                f"begin t{n}",
+                f"insert t{n} load{n} {texts[n % len(texts)]}",
+                f"query t{n} {texts[(n * 7) % len(texts)]}",
+                f"commit t{n}",
+            ]
+            for start in range(0, len(commands), pipeline):
+                batch = commands[start : start + pipeline]
+                sent = time.perf_counter()
+                writer.write("".join(c + "\n" for c in batch).encode())
+                await writer.drain()
+                for _ in batch:
+                    response = (await reader.readline()).decode()
+                    latencies.append(time.perf_counter() - sent)
+                    if response.startswith("error") or not response:
+                        errors.append(response.strip())
+        writer.write(b"quit\n")
+        await writer.drain()
+        await reader.readline()
+    finally:
+        writer.close()
+
+
+async def _run(host, port, sessions, rounds, pipeline):
+    texts = synthetic_texts(1000)
+    latencies, errors = [], []
+    start = time.perf_counter()
+    await asyncio.gather(*(_session(host, port, rounds, pipeline, texts, latencies, errors) for _ in range(sessions)))
+    elapsed = time.perf_counter() - start
+    return {
+        "sessions": sessions,
+        "pipeline": pipeline,
+        "latency": summarize(latencies),
+        "txn_per_s": round(sessions * rounds / elapsed, 1),
+        "errors": len(errors),
+    }
+
+
+async def _main(args):
+    server = None
+    host, port = args.host, args.port
+    if port is None:
+        server = CommandServer(Store(), host, 0, workers=args.workers, max_connections=max(args.sessions) + 1)
+        await server.start()
+        port = server.port
+    report = {"workers": args.workers if server else None, "runs": []}
+    try:
+        for sessions in args.sessions:
+            for pipeline in args.pipeline:
+                report["runs"].append(await _run(host, port, sessions, args.rounds, pipeline))
+    finally:
+        if server is not None:
+            await server.stop()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--rounds", type=int, default=25)
+    parser.add_argument("--pipeline", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(_main(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Visibility filtering + top-k selection as the store grows.
+
+For each store size, compares:
+- legacy: the old list-membership filter (`key in valid_keys` over a list) plus
+  a full argsort; only run up to --legacy-max because it is quadratic.
+- keys: a key collection turned into a row mask per query (get_top_k_keys with keys).
+- mask: a prebuilt RowMask, as Store.read passes it, with argpartition selection.
+
+    python -m benchmarks.bench_topk --sizes 10000 100000 1000000 --dim 64
+"""
+
+import argparse
+import json
+
+import numpy as np
+
+from benchmarks.common import summarize, synthetic_vectors, time_calls
+from vector_search.vector_store import RowMask, VectorMatrix
+
+
+def legacy_top_k(store, query, valid_keys, k):
+    candidates = [key for key in store.keys() if key in valid_keys]
+    rows = store.rows_for(candidates)
+    matrix, _, _ = store.view()
+    distances = 1.0 - matrix[rows] @ store.normalize(query)
+    return [candidates[i] for i in np.argsort(distances)[:k]]
+
+
+def run(sizes, dim, k, queries, visible_fraction, legacy_max):
+    report = {"dim": dim, "k": k, "visible_fraction": visible_fraction, "results": []}
+    query_vecs = synthetic_vectors(queries, dim, seed=1)
+    for n in sizes:
+        store = VectorMatrix(dim=dim, capacity=n)
+        data = synthetic_vectors(n, dim)
+        keys = [f"k{i}" for i in range(n)]
+        for key, vec in zip(keys, data):
+            store.add(key, vec)
+        visible = keys[:: max(1, round(1 / visible_fraction))]
+        visible_set = set(visible)
+        mask = RowMask(store, visible)
+
+        entry = {
+            "n": n,
+            "visible": len(visible),
+            "keys": summarize(time_calls(lambda q: store.exact_search(q, k, store.mask_for(visible_set)), query_vecs)),
+            "mask": summarize(time_calls(lambda q: store.exact_search(q, k, mask.view()), query_vecs)),
+        }
+        if n <= legacy_max:
+            entry["legacy"] = summarize(time_calls(lambda q: legacy_top_k(store, q, visible, k), query_vecs[:5]))
+        report["results"].append(entry)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--visible-fraction", type=float, default=0.5)
+    parser.add_argument("--legacy-max", type=int, default=20000)
+    args = parser.parse_args()
+    report = run(args.sizes, args.dim, args.k, args.queries, args.visible_fraction, args.legacy_max)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+YCSB-style transaction mixes against the MVCC store.
+
+Loads a synthetic corpus of `records` documents, embedded with the
+deterministic hashing encoder so runs are offline and repeatable. Then each
+workload runs `threads` client threads of `txns` transactions each, on a
+freshly loaded store. Every transaction is begin / one operation / commit,
+the operation drawn from the workload's mix. Record keys follow a uniform or
+zipfian (YCSB's default) distribution, and every thread is seeded, so two
+runs issue the same operations.
+
+    A  update heavy    50% query, 50% update
+    B  read mostly     95% query,  5% update
+    C  read only      100% query
+    D  read latest     95% query,  5% insert
+    F  read-modify-w   50% query, 50% read + update of the same record
+    X  churn           50% query, 20% insert, 20% update, 10% delete
+
+For each (workload, threads) pair the report has:
+- committed transactions per second, and write conflicts (aborted and counted)
+- p50 / p95 / p99 latency per operation, for commit and for whole transactions
+- the store's own per-operation histograms (vector_search.metrics)
+
+It also reports memory per loaded record (traced allocations of a
+`memory_sample` load: versions, vector rows, indexes, cached embeddings) and recall@k of Store.read
+against an exact scan of the same snapshot, which is 1.0 unless --index
+attaches an ANN or quantized index. --out writes the JSON report. --baseline
+compares it to an earlier report (e.g. from the previous commit) and flags
+throughput drops and p99 increases beyond --tolerance.
+
+    python -m benchmarks.bench_ycsb --records 10000 --threads 1 4 --txns 500 --out ycsb.json
+    python -m benchmarks.bench_ycsb --workloads A C --index hnsw --baseline ycsb.json
+"""
+
+import argparse
+import bisect
+import json
+import os
+import platform
+import random
+import subprocess
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+
+import numpy as np
+
+from benchmarks.common import populated_store, store_metrics, summarize, synthetic_texts
+
+WORKLOADS = {
+    "A": {"query": 0.5, "update": 0.5},
+    "B": {"query": 0.95, "update": 0.05},
+    "C": {"query": 1.0},
+    "D": {"query": 0.95, "insert": 0.05},
+    "F": {"query": 0.5, "read_modify_write": 0.5},
+    "X": {"query": 0.5, "insert": 0.2, "update": 0.2, "delete": 0.1},
+}
+
+
+def _make_index(name):
+    from vector_search.hnsw import HNSWIndex
+    from vector_search.quantization import ProductQuantizer, ScalarQuantizer
+
+    return {"none": lambda: None, "hnsw": HNSWIndex, "int8": ScalarQuantizer, "pq": ProductQuantizer}[name]()
+
+
+class KeyChooser:
+    """Record numbers drawn uniformly or from a zipfian distribution (theta 0.99, hot keys scattered)."""
+
+    def __init__(self, n, distribution, theta=0.99, seed=0):
+        self.n = n
+        self.cdf = None
+        if distribution == "zipfian":
+            weights = 1.0 / np.arange(1, n + 1) ** theta
+            self.cdf = np.cumsum(weights / weights.sum()).tolist()
+            self.order = np.random.default_rng(seed).permutation(n).tolist()
+
+    def __call__(self, rng):
+        if self.cdf is None:
+            return rng.randrange(self.n)
+        return self.order[min(bisect.bisect_left(self.cdf, rng.random()), self.n - 1)]
+
+
+def _client(store, mix, chooser, texts, k, txns, seed, results):
+    from mvcc.record import Record
+    from mvcc.transaction import TransactionStatus
+
+    rng = random.Random(seed)
+    ops, weights = list(mix), list(mix.values())
+    latencies = defaultdict(list)
+    committed = conflicts = 0
+    for i in range(txns):
+        op = rng.choices(ops, weights)[0]
+        key = f"r{chooser(rng)}"
+        text = texts[rng.randrange(len(texts))]
+        start = time.perf_counter()
+        txn = store.begin_transaction()
+        try:
+            op_start = time.perf_counter()
+            if op == "query":
+                store.read(txn, text, k)
+            elif op == "update":
+                store.update(txn, Record(key, text))
+            elif op == "insert":
+                store.insert(txn, Record(f"n{seed}_{i}", text))
+            elif op == "delete":
+                store.delete(txn, key)
+            else:  # read_modify_write
+                store.read(txn, text, k)
+                store.update(txn, Record(key, text))
+            latencies[op].append(time.perf_counter() - op_start)
+            commit_start = time.perf_counter()
+            store.commit_transaction(txn)
+            latencies["commit"].append(time.perf_counter() - commit_start)
+            committed += 1
+        except Exception:
+            # write conflict, lock wait timeout or deadlock; the update path may have aborted already
+            if store.transactions[txn].status == TransactionStatus.ACTIVE:
+                store.abort_transaction(txn)
+            conflicts += 1
+        latencies["transaction"].append(time.perf_counter() - start)
+    results.append((committed, conflicts, latencies))
+
+
+def run_workload(name, n_records, n_threads, txns, k, distribution, index, seed):
+    from vector_search import metrics, vector_store
+
+    store = populated_store(n_records, seed=seed)
+    vector_store.set_index(_make_index(index))
+    store.lock_wait_timeout = 1.0
+    metrics.registry.reset()
+    texts = synthetic_texts(1000, seed=seed + 1)
+    chooser = KeyChooser(n_records, distribution, seed=seed)
+    results = []
+    threads = [
+        threading.Thread(target=_client, args=(store, WORKLOADS[name], chooser, texts, k, txns, seed * 1000 + t, results))
+        for t in range(n_threads)
+    ]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    merged = defaultdict(list)
+    for _, _, latencies in results:
+        for op, values in latencies.items():
+            merged[op].extend(values)
+    committed = sum(r[0] for r in results)
+    report = {
+        "workload": name,
+        "threads": n_threads,
+        "txn_per_s": round(committed / elapsed, 1),
+        "committed": committed,
+        "conflicts": sum(r[1] for r in results),
+        "latency": {op: summarize(values) for op, values in sorted(merged.items())},
+        "store_metrics": store_metrics(store),
+    }
+    vector_store.set_index(None)
+    return report
+
+
+def memory_per_record(n, seed):
+    """Traced bytes per record of loading n records into a fresh store (everything the store keeps)."""
+    from vector_search.vector_store import reset_store
+
+    reset_store()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    store = populated_store(n, seed=seed)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del store
+    return {"records": n, "bytes_per_record": round((after - before) / n, 1)}
+
+
+def recall(n_records, k, queries, index, seed):
+    """recall@k of Store.read (through the attached index, if any) against an exact scan of the same snapshot."""
+    from vector_search import utils, vector_store
+
+    store = populated_store(n_records, seed=seed)
+    vector_store.set_index(_make_index(index))
+    try:
+        hits = total = 0
+        for text in synthetic_texts(queries, seed=seed + 2):
+            txn = store.begin_transaction()
+            found = {r.key for r in store.read(txn, text, k)}
+            rows = vector_store.vector_store.exact_search(utils.string_to_vector(text), k, store.transactions[txn].visible_mask)
+            exact = {vector_store.vector_store.row_keys[r] for r in rows.tolist()}
+            store.commit_transaction(txn)
+            hits += len(found & exact)
+            total += len(exact)
+    finally:
+        vector_store.set_index(None)
+    return {"index": index, "k": k, "queries": queries, "recall": round(hits / total, 4) if total else 1.0}
+
+
+def compare(report, baseline, tolerance):
+    """Per (workload, threads): throughput and transaction p99 relative to baseline; regressions beyond tolerance flagged."""
+    previous = {(r["workload"], r["threads"]): r for r in baseline.get("results", [])}
+    rows = []
+    for r in report["results"]:
+        old = previous.get((r["workload"], r["threads"]))
+        if old is None:
+            continue
+        throughput = r["txn_per_s"] / old["txn_per_s"] if old["txn_per_s"] else None
+        p99 = r["latency"]["transaction"]["p99_ms"] / old["latency"]["transaction"]["p99_ms"]
+        rows.append({
+            "workload": r["workload"],
+            "threads": r["threads"],
+            "throughput_ratio": round(throughput, 3) if throughput is not None else None,
+            "p99_ratio": round(p99, 3),
+            "regression": (throughput is not None and throughput < 1 - tolerance) or p99 > 1 + tolerance,
+        })
+    # runs are only comparable when the scale and the index match
+    old_config = baseline.get("config", {})
+    differs = sorted(key for key in ("records", "txns", "k", "distribution", "index", "seed")
+                     if old_config.get(key) != report["config"].get(key))
+    return {"baseline_commit": baseline.get("meta", {}).get("commit"), "tolerance": tolerance,
+            "config_differs": differs, "runs": rows}
+
+
+def _commit_id():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def run(args):
+    from vector_search import utils
+
+    report = {
+        "meta": {
+            "commit": _commit_id(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "cpus": os.cpu_count(),
+            "encoder": utils.get_encoder().name,
+        },
+        "config": {key: value for key, value in vars(args).items() if key not in ("out", "baseline")},
+        "memory": memory_per_record(args.memory_sample, args.seed),
+        "results": [],
+    }
+    for name in args.workloads:
+        for n_threads in args.threads:
+            report["results"].append(
+                run_workload(name, args.records, n_threads, args.txns, args.k, args.distribution, args.index, args.seed)
+            )
+    report["recall"] = recall(args.records, args.k, args.recall_queries, args.index, args.seed)
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["comparison"] = compare(report, json.load(f), args.tolerance)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=10000)
+    parser.add_argument("--workloads", nargs="+", choices=sorted(WORKLOADS), default=sorted(WORKLOADS))
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--txns", type=int, default=500, help="transactions per client thread")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--distribution", choices=["uniform", "zipfian"], default="zipfian")
+    parser.add_argument("--index", choices=["none", "hnsw", "int8", "pq"], default="none")
+    parser.add_argument("--memory-sample", type=int, default=2000, help="records loaded under tracemalloc")
+    parser.add_argument("--recall-queries", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--baseline", help="earlier JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="relative change counted as a regression")
+    args = parser.parse_args()
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Importing this module selects the model-free hashing encoder (unless
+VECTOR_DB_ENCODER is already set), so store benchmarks run offline; import it
+before mvcc / vector_search.utils.
+
+- synthetic_texts: Random documents over a fixed vocabulary.
+- populated_store: A Store with n committed synthetic records.
+- synthetic_vectors: Clustered random vectors that look more like text embeddings than white noise.
+- time_calls: Runs a callable per input and returns per-call latencies in seconds.
+- summarize: Mean / p50 / p95 / p99 of a latency list, in milliseconds.
+- store_metrics: Per-operation latencies, counters and gauges recorded by vector_search.metrics.
+"""
+
+import os
+import time
+
+import numpy as np
+
+os.environ.setdefault("VECTOR_DB_ENCODER", "hashing")
+
+
+def synthetic_texts(n, words_per_doc=8, vocab=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    words = [f"w{i}" for i in range(vocab)]
+    picks = rng.integers(0, vocab, size=(n, words_per_doc))
+    return [" ".join(words[i] for i in row) for row in picks]
+
+
+def populated_store(n, batch=5000, seed=0, store=None):
+    from mvcc.record import Record
+    from mvcc.store import Store
+    from vector_search.vector_store import reset_store
+
+    if store is None:
+        reset_store()
+        store = Store()
+    texts = synthetic_texts(n, seed=seed)
+    for start in range(0, n, batch):
+        txn = store.begin_transaction()
+        store.insert_many(txn, [Record(f"r{i}", texts[i]) for i in range(start, min(n, start + batch))])
+        store.commit_transaction(txn)
+    return store
+
+
+def synthetic_vectors(n, dim, clusters=64, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    return centers[labels] + 0.35 * rng.normal(size=(n, dim)).astype(np.float32)
+
+
+def time_calls(fn, inputs):
+    latencies = []
+    for item in inputs:
+        start = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def summarize(latencies):
+    ms = np.asarray(latencies) * 1000.0
+    return {
+        "mean_ms": round(float(ms.mean()), 4),
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p95_ms": round(float(np.percentile(ms, 95)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+    }
+
+
+def store_metrics(store=None):
+    from vector_search import metrics
+
+    return metrics.stats(store)
@@ -0,0 +1,334 @@
+"""
+Write-ahead log, checkpoints and restart without re-embedding.
+
+Every commit appends one frame to the log holding the transaction's final
+version of each record it wrote, including the float32 embedding, so replay
+never calls the model. Commits are made durable in groups: the first
+committer to need a sync becomes the leader, optionally waits `group_window`
+seconds for more commits to pile up, then flushes and fsyncs once for all of
+them. A commit only becomes visible to new snapshots after its frame is
+durable. If a sync fails, every frame it covered is cut off the log again
+and those commits fail, so a restart never replays a commit that was
+reported as aborted.
+
+A checkpoint writes the committed state of one snapshot as a records file
+plus the raw vector matrix (.npy), and lets the log drop the segments it
+covers. Recovery loads the newest checkpoint and replays the log tail.
+
+- WriteAheadLog: Segmented, append-only commit log with group commit.
+- write_checkpoint: Persists a snapshot of the store; returns its commit number.
+- Checkpointer: Writes checkpoints on a background thread every `interval` seconds.
+- recover: Rebuilds a Store from a directory's checkpoint and log.
+"""
+
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from .record import Record
+from vector_search import vector_store
+
+# frame header: payload length, crc32 of the payload
+_FRAME = struct.Struct("<II")
+_SEGMENT = "wal-{:020d}.log"
+
+
+def _segment_start(name: str) -> int:
+    return int(name[len("wal-"):-len(".log")])
+
+
+def _segments(directory: str) -> list[str]:
+    return sorted(n for n in os.listdir(directory) if n.startswith("wal-") and n.endswith(".log"))
+
+
+class WriteAheadLog:
+    def __init__(self, directory: str, sync: str = "fsync", group_window: float = 0.0,
+                 segment_bytes: int = 64 * 1024 * 1024):
+        """
+        Args:
+            directory (str): Where segments (and, by default, checkpoints) live.
+            sync (str): "fsync" (durable across power loss), "flush" (handed to the OS, survives a
+                process crash) or "none" (buffered; only for benchmarks).
+            group_window (float): Seconds the sync leader waits for more commits to join its fsync.
+            segment_bytes (int): Start a new segment once the current one is this large.
+        """
+        if sync not in ("fsync", "flush", "none"):
+            raise ValueError(f"unknown sync mode {sync!r}")
+        self.directory = directory
+        self.sync = sync
+        self.group_window = group_window
+        self.segment_bytes = segment_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._cond = threading.Condition(threading.Lock())
+        self._appended = 0   # frames written to the file buffer
+        self._durable = 0    # frames known to be synced
+        self._syncing = False
+        # (position, offset in the current segment) of appended frames not yet known to be synced
+        self._pending: list[tuple[int, int]] = []
+        # positions whose frames were discarded after a failed sync
+        self._lost: set[int] = set()
+        self.stats = {"commits": 0, "syncs": 0, "bytes": 0, "failed_syncs": 0}
+        self._file = None
+        self._segment_bytes_written = 0
+
+    def _close_segment(self) -> None:
+        self._file.flush()
+        if self.sync == "fsync":
+            os.fsync(self._file.fileno())
+        self._file.close()
+        self._file = None
+
+    def _open_segment(self, first_seq: int) -> None:
+        if self._file is not None:
+            self._close_segment()
+            # closing synced everything appended to it
+            self._durable = self._appended
+            self._pending.clear()
+        self._file = open(os.path.join(self.directory, _SEGMENT.format(first_seq)), "ab")
+        self._segment_bytes_written = self._file.tell()
+
+    def append(self, commit_seq: int, txn_id: int, versions: list[Record]) -> int:
+        """
+        Appends the commit frame for commit_seq and returns its log position. Callers append
+        in commit_seq order (the store does it under its commit lock) and then wait_durable.
+        """
+        header = {"seq": commit_seq, "txn": txn_id, "dim": vector_store.vector_store.dim,
+                  "writes": [[v.id, v.value, v.deleted, v.metadata] for v in versions]}
+        vectors = [vector_store.get_vector(v.key) for v in versions if not v.deleted]
+        blob = np.asarray(vectors, dtype=np.float32).tobytes() if vectors else b""
+        payload = json.dumps(header).encode() + b"\n" + blob
+        frame = _FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+        with self._cond:
+            if self._file is None or self._segment_bytes_written >= self.segment_bytes:
+                self._open_segment(commit_seq)
+            self._appended += 1
+            self._pending.append((self._appended, self._segment_bytes_written))
+            self._file.write(frame)
+            self._segment_bytes_written += len(frame)
+            self.stats["commits"] += 1
+            self.stats["bytes"] += len(frame)
+            return self._appended
+
+    def wait_durable(self, position: int) -> None:
+        """Blocks until the frame at position is synced, syncing a whole group if nobody else is."""
+        if self.sync == "none":
+            return
+        with self._cond:
+            while True:
+                if position in self._lost:
+                    raise OSError("write-ahead log sync failed; the commit frame was discarded")
+                if self._durable >= position:
+                    return
+                if self._syncing:
+                    self._cond.wait()
+                    continue
+                self._syncing = True
+                self._cond.release()
+                failure = None
+                try:
+                    if self.group_window:
+                        time.sleep(self.group_window)
+                    with self._cond:
+                        target = self._appended
+                        segment = self._file
+                        segment.flush()
+                        fd = segment.fileno()
+                    if self.sync == "fsync":
+                        try:
+                            os.fsync(fd)
+                        except OSError:
+                            if not segment.closed:
+                                raise
+                            # the segment was rotated meanwhile, which synced it before closing
+                except OSError as e:
+                    failure = e
+                finally:
+                    self._cond.acquire()
+                    self._syncing = False
+                if failure is not None:
+                    self.stats["failed_syncs"] += 1
+                    self._discard_unsynced()
+                    self._cond.notify_all()
+                    raise failure
+                self._durable = max(self._durable, target)
+                self._pending = [(p, offset) for p, offset in self._pending if p > self._durable]
+                self.stats["syncs"] += 1
+                self._cond.notify_all()
+
+    def _discard_unsynced(self) -> None:
+        # caller holds self._cond; cuts every frame not known to be durable off the current segment,
+        # so neither a later flush nor a restart can resurrect commits that are being failed
+        self._lost.update(range(self._durable + 1, self._appended + 1))
+        if not self._pending:
+            return
+        offset = self._pending[0][1]
+        path = self._file.name
+        try:
+            self._file.close()
+        except OSError:
+            pass
+        self._file = None
+        with open(path, "r+b") as f:
+            f.truncate(offset)
+            f.flush()
+            os.fsync(f.fileno())
+        self._pending.clear()
+
+    def truncate(self, upto_seq: int) -> None:
+        """Deletes segments whose frames all have commit_seq <= upto_seq (they are in a checkpoint)."""
+        with self._cond:
+            segments = _segments(self.directory)
+            for name, successor in zip(segments, segments[1:]):
+                if _segment_start(successor) <= upto_seq + 1:
+                    os.remove(os.path.join(self.directory, name))
+
+    def close(self) -> None:
+        with self._cond:
+            if self._file is not None:
+                self._close_segment()
+
+
+def read_log(directory: str, after_seq: int = 0, repair: bool = False):
+    """
+    Yields (commit_seq, txn_id, [(id, value, deleted, vector or None, metadata)]) for every intact frame
+    with commit_seq > after_seq, in order. Stops at the first torn or corrupt frame (a commit
+    that never became durable); with repair, cuts the log off there so new frames follow
+    the last good one.
+    """
+    for name in _segments(directory):
+        path = os.path.join(directory, name)
+        with open(path, "rb") as f:
+            while True:
+                good = f.tell()
+                head = f.read(_FRAME.size)
+                if len(head) < _FRAME.size:
+                    torn = len(head) > 0
+                    break
+                length, crc = _FRAME.unpack(head)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    torn = True
+                    break
+                header, blob = payload.split(b"\n", 1)
+                header = json.loads(header)
+                if header["seq"] <= after_seq:
+                    continue
+                vectors = iter(np.frombuffer(blob, dtype=np.float32).reshape(-1, header["dim"] or 0))
+                # frames written before metadata existed carry three fields per write
+                writes = [(i, value, deleted, None if deleted else next(vectors), meta[0] if meta else None)
+                          for i, value, deleted, *meta in header["writes"]]
+                yield header["seq"], header["txn"], writes
+        if torn:
+            if repair:
+                with open(path, "r+b") as f:
+                    f.truncate(good)
+                for later in _segments(directory):
+                    if later > name:
+                        os.remove(os.path.join(directory, later))
+            return
+
+
+def write_checkpoint(store, directory: str) -> int:
+    """
+    Persists the committed state visible to a fresh snapshot: records-<seq>.json (ids, values
+    and metadata) and vectors-<seq>.npy (their un-normalized float32 rows, in the same order).
+    Returns the snapshot's commit number; the log can drop everything up to it.
+    """
+    os.makedirs(directory, exist_ok=True)
+    txn_id = store.begin_transaction()
+    txn = store.transactions[txn_id]
+    try:
+        seq = txn.snapshot_ts
+        snapshot = store._build_snapshot(txn)
+        records = list(snapshot.values())
+        matrix = vector_store.vector_store
+        with matrix.lock:
+            vectors = np.stack([matrix.get(r.key) for r in records]) if records else np.empty((0, matrix.dim or 0), np.float32)
+    finally:
+        store.commit_transaction(txn_id)
+
+    tmp_vectors = os.path.join(directory, f"vectors-{seq}.npy.tmp")
+    with open(tmp_vectors, "wb") as f:
+        np.save(f, vectors.astype(np.float32, copy=False))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_vectors, os.path.join(directory, f"vectors-{seq}.npy"))
+    # the records file goes last: its presence marks the checkpoint as complete
+    tmp_records = os.path.join(directory, f"records-{seq}.json.tmp")
+    with open(tmp_records, "w") as f:
+        json.dump({"seq": seq, "records": [[r.id, r.value, r.metadata] for r in records]}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_records, os.path.join(directory, f"records-{seq}.json"))
+
+    for name in os.listdir(directory):
+        if name.startswith(("records-", "vectors-")) and not name.endswith((f"-{seq}.json", f"-{seq}.npy")):
+            os.remove(os.path.join(directory, name))
+    if store.wal is not None:
+        store.wal.truncate(seq)
+    return seq
+
+
+def latest_checkpoint(directory: str) -> int | None:
+    seqs = [int(n[len("records-"):-len(".json")]) for n in os.listdir(directory)
+            if n.startswith("records-") and n.endswith(".json")]
+    return max(seqs, default=None)
+
+
+def recover(directory: str, wal: WriteAheadLog | None = None, **store_kwargs):
+    """
+    Rebuilds a Store from the newest checkpoint in directory plus the log tail, without
+    calling the encoder. The vector store is reset first. Pass wal to keep logging new
+    commits (it should point at the same directory).
+    """
+    from .store import Store
+
+    vector_store.reset_store()
+    store = Store(**store_kwargs)
+    seq = latest_checkpoint(directory) if os.path.isdir(directory) else None
+    if seq is not None:
+        with open(os.path.join(directory, f"records-{seq}.json")) as f:
+            records = json.load(f)["records"]
+        vectors = np.load(os.path.join(directory, f"vectors-{seq}.npy"))
+        store._replay(seq, [(i, value, False, vector, meta[0] if meta else None)
+                            for (i, value, *meta), vector in zip(records, vectors)])
+    for commit_seq, _, writes in read_log(directory, after_seq=seq or 0, repair=True):
+        store._replay(commit_seq, writes)
+    store.wal = wal
+    return store
+
+
+class Checkpointer:
+    def __init__(self, store, directory: str, interval: float = 300.0):
+        self.store = store
+        self.directory = directory
+        self.interval = interval
+        self.last_seq: int | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def run_once(self) -> int:
+        self.last_seq = write_checkpoint(self.store, self.directory)
+        return self.last_seq
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="mvcc-checkpoint", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
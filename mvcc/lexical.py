@@ -0,0 +1,118 @@
+"""
+Inverted index (BM25) over record values, for hybrid lexical + vector retrieval.
+
+Like the metadata indexes, postings are keyed by version key ("<id>_<txn>"):
+every written version is indexed when it is linked into its chain and
+dropped again when it is aborted or vacuumed, and a query only scores the
+versions its transaction's visibility mask lets through. A delete adds no
+postings; the deleted version keeps its own until the vacuum reclaims it,
+because older snapshots can still see it. Term statistics (document
+frequencies, collection size, average length) are taken over the versions
+the reader sees too, so concurrent uncommitted or aborted writes never
+change a snapshot's ranking.
+
+- tokenize: Lower-cased word tokens.
+- InvertedIndex.add / discard: Maintains the postings of one version.
+- InvertedIndex.candidates: Version keys containing any query term.
+- InvertedIndex.collection_stats: Number and total length of a set of versions.
+- InvertedIndex.rank: BM25 top-k over a given set of (visible) version keys.
+- reciprocal_rank_fusion: Fuses several rankings into one.
+"""
+
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+
+from .record import Record
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN.findall(text.lower())
+
+
+class InvertedIndex:
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.lock = threading.Lock()
+        self.postings: dict[str, dict[str, int]] = {}  # term -> {version key: term frequency}
+        self.lengths: dict[str, int] = {}  # version key -> number of tokens
+        self.terms: dict[str, tuple[str, ...]] = {}  # version key -> its distinct terms, for discard
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def add(self, record: Record) -> None:
+        counts = Counter(tokenize(record.value))
+        with self.lock:
+            # a version written twice by one transaction is re-indexed under the same key
+            self._discard(record.key)
+            for term, tf in counts.items():
+                self.postings.setdefault(term, {})[record.key] = tf
+            self.terms[record.key] = tuple(counts)
+            self.lengths[record.key] = sum(counts.values())
+
+    def discard(self, key: str) -> None:
+        with self.lock:
+            self._discard(key)
+
+    def _discard(self, key: str) -> None:
+        if key not in self.lengths:
+            return
+        del self.lengths[key]
+        for term in self.terms.pop(key):
+            keys = self.postings[term]
+            del keys[key]
+            if not keys:
+                del self.postings[term]
+
+    def candidates(self, query: str) -> set[str]:
+        with self.lock:
+            found = set()
+            for term in set(tokenize(query)):
+                found.update(self.postings.get(term, ()))
+            return found
+
+    def collection_stats(self, keys) -> tuple[int, int]:
+        """(number of indexed versions, their total length in tokens) among keys."""
+        with self.lock:
+            lengths = [self.lengths[key] for key in keys if key in self.lengths]
+        return len(lengths), sum(lengths)
+
+    def rank(self, query: str, keys: set[str], k: int, collection: tuple[int, int]) -> list[str]:
+        """
+        BM25 top-k among keys, best first. keys are the versions the caller can see that
+        contain a query term, and collection is collection_stats() of every version it can
+        see, so document frequencies and lengths are those of the caller's snapshot.
+        """
+        if k <= 0 or not keys:
+            return []
+        scores = dict.fromkeys(keys, 0.0)
+        n, total_length = collection
+        average = total_length / n if n else 0.0
+        with self.lock:
+            for term in set(tokenize(query)):
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                matching = scores.keys() & postings.keys()
+                idf = math.log(1 + (n - len(matching) + 0.5) / (len(matching) + 0.5))
+                for key in matching:
+                    tf = postings[key]
+                    norm = self.k1 * (1 - self.b + self.b * self.lengths[key] / average) if average else self.k1
+                    scores[key] += idf * tf * (self.k1 + 1) / (tf + norm)
+        matched = (key for key, score in scores.items() if score > 0)
+        return heapq.nsmallest(k, matched, key=lambda key: (-scores[key], key))
+
+
+def reciprocal_rank_fusion(rankings: list[list[str]], k: int = 60) -> list[str]:
+    """Orders keys by sum(1 / (k + rank)) over the rankings that contain them (rank starts at 1)."""
+    scores: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda key: -scores[key])
@@ -0,0 +1,215 @@
+"""
+Typed metadata on record versions and secondary indexes over it.
+
+Metadata is a flat dict of field -> str / int / float / bool carried by each
+version. Indexes map field values to version keys (the same "<id>_<txn>" keys
+the vector store uses), so they never decide visibility themselves: a filtered
+read intersects the keys an index returns with the transaction's visible
+mask, which keeps MVCC semantics intact while pruning candidates before any
+vector is scored. Entries are added when a version is written and dropped when
+it is aborted or vacuumed.
+
+A filter ("where") is a dict of field -> value (equality) or field -> (op,
+value) with op one of ==, !=, <, <=, >, >=, in; or any callable taking a
+Record. Conditions an index can answer are resolved through it; the rest are
+checked against the visible versions.
+
+- check_metadata: Validates field names and value types.
+- HashIndex: value -> keys, for == and in.
+- SortedIndex: (value, key) pairs kept sorted, for ranges as well.
+- MetadataIndexes: The store's indexes by field.
+- matches: Evaluates conditions against one version's metadata.
+"""
+
+import bisect
+import operator
+import threading
+
+from .record import Record
+
+METADATA_TYPES = (str, int, float, bool)
+
+_OPS = {
+    "==": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le,
+    ">": operator.gt, ">=": operator.ge, "in": lambda value, options: value in options,
+}
+
+
+def check_metadata(metadata: dict | None) -> None:
+    """Raises TypeError unless metadata is None or a dict of str field names to str / int / float / bool."""
+    if metadata is None:
+        return
+    if not isinstance(metadata, dict):
+        raise TypeError("metadata must be a dict")
+    for field, value in metadata.items():
+        if not isinstance(field, str):
+            raise TypeError(f"metadata field names must be strings, got {field!r}")
+        if not isinstance(value, METADATA_TYPES):
+            raise TypeError(f"metadata field {field!r} has unsupported type {type(value).__name__}")
+
+
+def normalize(where: dict) -> list[tuple[str, str, object]]:
+    """Turns a where dict into (field, op, value) conditions."""
+    conditions = []
+    for field, condition in where.items():
+        op, value = condition if isinstance(condition, tuple) else ("==", condition)
+        if op not in _OPS:
+            raise ValueError(f"unknown filter operator {op!r}")
+        conditions.append((field, op, value))
+    return conditions
+
+
+def matches(metadata: dict | None, conditions: list[tuple[str, str, object]]) -> bool:
+    for field, op, value in conditions:
+        if metadata is None or field not in metadata:
+            return False
+        try:
+            if not _OPS[op](metadata[field], value):
+                return False
+        except TypeError:
+            return False  # e.g. a range over a field holding a string
+    return True
+
+
+class HashIndex:
+    ops = ("==", "in")
+
+    def __init__(self, field: str):
+        self.field = field
+        self.keys_by_value: dict[object, set[str]] = {}
+        self.value_of: dict[str, object] = {}
+
+    def check(self, value) -> None:
+        pass
+
+    def add(self, key: str, value) -> None:
+        self.discard(key)
+        self.keys_by_value.setdefault(value, set()).add(key)
+        self.value_of[key] = value
+
+    def discard(self, key: str) -> None:
+        if key in self.value_of:
+            value = self.value_of.pop(key)
+            keys = self.keys_by_value[value]
+            keys.discard(key)
+            if not keys:
+                del self.keys_by_value[value]
+
+    def lookup(self, op: str, value) -> set[str]:
+        values = value if op == "in" else (value,)
+        found = set()
+        for v in values:
+            found |= self.keys_by_value.get(v, set())
+        return found
+
+
+class SortedIndex:
+    ops = ("==", "in", "<", "<=", ">", ">=")
+
+    def __init__(self, field: str):
+        self.field = field
+        self.entries: list[tuple[object, str]] = []  # (value, key), sorted
+        self.values: list[object] = []  # entries' values, for bisecting on a value alone
+        self.value_of: dict[str, object] = {}
+
+    def check(self, value) -> None:
+        # one ordering per field: numbers with numbers, strings with strings
+        if self.entries and isinstance(value, str) != isinstance(self.entries[0][0], str):
+            raise TypeError(f"sorted index on {self.field!r} cannot order {value!r} with {self.entries[0][0]!r}")
+
+    def add(self, key: str, value) -> None:
+        self.discard(key)
+        position = bisect.bisect_left(self.entries, (value, key))
+        self.entries.insert(position, (value, key))
+        self.values.insert(position, value)
+        self.value_of[key] = value
+
+    def discard(self, key: str) -> None:
+        if key in self.value_of:
+            position = bisect.bisect_left(self.entries, (self.value_of.pop(key), key))
+            del self.entries[position]
+            del self.values[position]
+
+    def _range(self, low=None, low_inclusive=True, high=None, high_inclusive=True) -> set[str]:
+        values = self.values
+        try:
+            start = 0 if low is None else (bisect.bisect_left if low_inclusive else bisect.bisect_right)(values, low)
+            end = len(values) if high is None else (bisect.bisect_right if high_inclusive else bisect.bisect_left)(values, high)
+        except TypeError:
+            return set()  # a bound of another type than the field's values matches nothing, as in matches()
+        return {key for _, key in self.entries[start:end]}
+
+    def lookup(self, op: str, value) -> set[str]:
+        if op == "in":
+            return set().union(*(self._range(v, True, v, True) for v in value))
+        bounds = {
+            "==": dict(low=value, high=value),
+            "<": dict(high=value, high_inclusive=False),
+            "<=": dict(high=value),
+            ">": dict(low=value, low_inclusive=False),
+            ">=": dict(low=value),
+        }[op]
+        return self._range(**bounds)
+
+
+INDEX_KINDS = {"hash": HashIndex, "sorted": SortedIndex}
+
+
+class MetadataIndexes:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.by_field: dict[str, HashIndex | SortedIndex] = {}
+
+    def create(self, field: str, kind: str, versions) -> None:
+        """Adds an index of kind ("hash" or "sorted") on field over the given existing versions."""
+        if kind not in INDEX_KINDS:
+            raise ValueError(f"unknown index kind {kind!r}")
+        index = INDEX_KINDS[kind](field)
+        # held throughout, so a version written meanwhile is either walked here or added after
+        with self.lock:
+            for version in versions:
+                if not version.deleted and version.metadata and field in version.metadata:
+                    index.check(version.metadata[field])
+                    index.add(version.key, version.metadata[field])
+            self.by_field[field] = index
+
+    def check(self, metadata: dict | None) -> None:
+        check_metadata(metadata)
+        if metadata:
+            with self.lock:
+                for field, value in metadata.items():
+                    if field in self.by_field:
+                        self.by_field[field].check(value)
+
+    def add(self, record: Record) -> None:
+        # by_field is checked under the lock: create() may be walking the versions right now
+        with self.lock:
+            if not self.by_field:
+                return
+            for field, index in self.by_field.items():
+                if record.metadata and field in record.metadata:
+                    index.add(record.key, record.metadata[field])
+                else:
+                    index.discard(record.key)
+
+    def discard(self, key: str) -> None:
+        with self.lock:
+            for index in self.by_field.values():
+                index.discard(key)
+
+    def lookup(self, conditions: list[tuple[str, str, object]]) -> tuple[set[str] | None, list]:
+        """
+        Resolves the conditions an index can answer. Returns (version keys satisfying all of
+        them, or None if no condition was indexed; the conditions left to check per version).
+        """
+        keys, rest = None, []
+        with self.lock:
+            for condition in conditions:
+                field, op, value = condition
+                index = self.by_field.get(field)
+                if index is None or op not in index.ops:
+                    rest.append(condition)
+                    continue
+                found = index.lookup(op, value)
+                keys = found if keys is None else keys & found
+        return keys, rest
@@ -1,13 +1,28 @@
 import math
+import sys
 
 class Record:
-    def __init__(self, id: str, value: str = ""):
-        self.id = id
+    # no per-version __dict__: with millions of versions the instance dicts dominated memory
+    __slots__ = ("id", "key", "end_ts", "deleted", "created_by_txn_id", "value", "metadata", "next")
+
+    def __init__(self, id: str, value: str = "", metadata: dict | None = None):
+        # interned: every version of a record shares one id string
+        self.id = sys.intern(id)
         self.key = ""
-        self.begin_ts: int | float = 0
         self.end_ts: int | float = math.inf
         self.deleted: bool = False
         self.created_by_txn_id: int | None = None
         # store the raw text and its vector
         self.value: str = value
-        self.next: Record | None = None
\ No newline at end of file
+        # typed attributes (str / int / float / bool); None when the version has none
+        self.metadata: dict | None = metadata or None
+        self.next: Record | None = None
+
+    # a version begins with the transaction that creates it, so the two share one slot
+    @property
+    def begin_ts(self) -> int | None:
+        return self.created_by_txn_id
+
+    @begin_ts.setter
+    def begin_ts(self, ts: int | None) -> None:
+        self.created_by_txn_id = ts
@@ -0,0 +1,100 @@
+"""
+Cache of top-k read results, keyed by the committed state they were computed on.
+
+Every commit that writes something advances the store's state sequence number
+(Store.state_seq: the newest visible commit that wrote). Two snapshots with
+the same state_seq see exactly the same committed versions, so the ranked
+version keys of a read are a pure function of (query, k, filter, hybrid
+mode, search configuration, state_seq). The search configuration is the
+active encoder, the attached vector index and its search knobs, and the
+hybrid fusion depth: changing any of them starts a fresh set of keys.
+Snapshot isolation holds without any locking against writers:
+- a cached entry is only ever served to a transaction whose snapshot has the
+  same state_seq, and
+- transactions that wrote something themselves see their own writes, so they
+  bypass the cache.
+
+Commits and aborts drop entries whose state_seq is older than every state a
+transaction can still read (see ResultCache.prune). Others are evicted LRU
+once max_entries is exceeded.
+
+- ResultCache.key_for: Cache key of one read.
+- ResultCache.get / put: LRU lookup and insert of a list of version keys.
+- ResultCache.prune: Drops entries no live or future snapshot can hit.
+- ResultCache.stats: Hit / miss / eviction / invalidation counters.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class ResultCache:
+    def __init__(self, max_entries: int = 1024):
+        """
+        Args:
+            max_entries (int): Cached reads kept; 0 disables the cache.
+        """
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self) -> None:
+        self.entries: OrderedDict[tuple, tuple[str, ...]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key_for(query: str, k: int, state_seq: int, where=None, hybrid=None, search=None) -> tuple:
+        """
+        where is the normalized condition list (see mvcc.metadata.normalize) or None; search
+        is a hashable description of everything else that shapes the ranking (encoder, index).
+        """
+        digest = hashlib.sha256(query.encode("utf-8")).digest()
+        # state_seq stays last: prune reads it from there
+        return (digest, k, repr(where), hybrid, search, state_seq)
+
+    def get(self, key: tuple) -> list[str] | None:
+        with self.lock:
+            keys = self.entries.get(key)
+            if keys is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return list(keys)
+
+    def put(self, key: tuple, keys: list[str]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self.lock:
+            self.entries[key] = tuple(keys)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def prune(self, oldest_state_seq: int) -> None:
+        """Drops entries computed on a state older than oldest_state_seq."""
+        with self.lock:
+            stale = [key for key in self.entries if key[-1] < oldest_state_seq]
+            for key in stale:
+                del self.entries[key]
+            self.invalidations += len(stale)
+
+    def stats(self) -> dict:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def __len__(self):
+        return len(self.entries)
@@ -8,103 +8,291 @@ sys.path.insert(0, project_root)
 import threading
 import time
 import math
+from contextlib import ExitStack
+
+import numpy as np
+from .lexical import InvertedIndex, reciprocal_rank_fusion
+from .metadata import MetadataIndexes, matches, normalize as normalize_where
 from .record import Record
+from .result_cache import ResultCache
 from .transaction import Transaction, TransactionStatus
-from vector_search import utils, vector_store
+from .version_table import VersionTable
+from vector_search import metrics, utils, vector_store
+
+
+class LockWaitTimeout(Exception):
+    pass
+
+
+class DeadlockError(Exception):
+    pass
+
 
 class Store:
-    def __init__(self):
+    """
+    Locking:
+    - self.lock is a short commit lock around transaction state (ids, commit sequence,
+      status, active set). It is never held while embedding, searching or walking chains.
+    - Each version chain is latched by one of `lock_stripes` striped locks (by record id
+      hash); writers of the same record serialize there, writers of different records don't.
+    - Reads take neither: chains are only ever changed by swapping single references, and
+      visibility is decided by commit timestamps, so a reader always sees a consistent chain.
+    """
+
+    def __init__(self, embed_batch_size: int = 64, lock_wait_timeout: float | None = None, lock_stripes: int = 64,
+                 wal=None, lexical_index: bool = True):
         self.records: dict[str, Record] = {}
+        # columnar copy of every version's visibility data, for vectorized snapshot resolution
+        self.versions = VersionTable()
+        # secondary indexes over version metadata (see create_index)
+        self.metadata_indexes = MetadataIndexes()
+        # BM25 postings over version values, for hybrid reads (None: disabled)
+        self.lexical = InvertedIndex() if lexical_index else None
         self.transactions: dict[int, Transaction] = {}
+        self.active_txns: set[int] = set()
         self.lock = threading.RLock()
+        self._stripes = [threading.RLock() for _ in range(lock_stripes)]
         self.current_txn_id = 0
+        # bumped by every commit; a transaction's snapshot is "all commits up to visible_seq at begin"
+        self.commit_seq = 0
+        # highest commit number such that it and every earlier commit are durable and visible
+        self.visible_seq = 0
+        self._finished_seqs: set[int] = set()
+        # newest visible commit that wrote something; read-only commits leave the committed state alone
+        self.state_seq = 0
+        self._writing_seqs: set[int] = set()
+        # top-k results of committed-state reads, keyed by state_seq (see mvcc.result_cache)
+        self.result_cache = ResultCache()
+        # optional mvcc.durability.WriteAheadLog; commits are logged and synced before they become visible
+        self.wal = wal
+        # candidates taken from each ranking before a hybrid read fuses them
+        self.hybrid_depth = 50
+        # (state_seq, BM25 collection statistics) of the last committed state a hybrid read ranked on
+        self._lexical_stats: tuple[int, tuple[int, int]] | None = None
+        # number of values per model call in insert_many
+        self.embed_batch_size = embed_batch_size
+        # (snapshot_ts, snapshot, visibility mask) of the last resolved committed state, shared by
+        # every transaction with that snapshot_ts
+        self._shared_snapshot: tuple[int, dict[str, Record], vector_store.RowMask] | None = None
+        # seconds an update may wait for another transaction's uncommitted head (None: forever)
+        self.lock_wait_timeout = lock_wait_timeout
+        # record id -> [condition, number of waiters]; woken by commit / abort of the head's creator
+        self._record_waits: dict[str, list] = {}
+        # wait-for graph: blocked txn id -> txn id holding the head it waits on (guarded by _graph_lock)
+        self.waits_for: dict[int, int] = {}
+        self._graph_lock = threading.Lock()
+        # how often a blocked update re-checks whether deadlock detection picked it as victim
+        self.deadlock_poll_interval = 0.05
+        self.wait_stats = {"waits": 0, "blocked": 0, "wait_time_s": 0.0, "max_wait_s": 0.0, "timeouts": 0, "deadlocks": 0}
 
     def begin_transaction(self) -> int:
         with self.lock:
             self.current_txn_id += 1
-            txn = Transaction(self.current_txn_id)
-            
-            self.transactions[txn.id] = txn
+            # O(1): only the commit sequence number is recorded; visibility is resolved on first read
+            txn = Transaction(self.current_txn_id, snapshot_ts=self.visible_seq)
+            txn.state_seq = self.state_seq
 
-            # Initialize snapshot data
-            self.read(txn.id, "", 0)
+            self.transactions[txn.id] = txn
+            self.active_txns.add(txn.id)
 
             return txn.id
 
-    def insert(self, txn_id: int, record: Record) -> None:
+    def _stripe_index(self, record_id: str) -> int:
+        return hash(record_id) % len(self._stripes)
+
+    def stripe(self, record_id: str) -> threading.RLock:
+        """The latch guarding record_id's version chain."""
+        return self._stripes[self._stripe_index(record_id)]
+
+    @staticmethod
+    def _stamp_version(txn_id: int, record: Record) -> None:
         record.begin_ts = txn_id
         record.end_ts = math.inf
         record.deleted = False
         record.created_by_txn_id = txn_id
         record.key = record.id + "_" + str(txn_id)
 
-        with self.lock:
+    def insert(self, txn_id: int, record: Record) -> None:
+        self.metadata_indexes.check(record.metadata)
+        self._stamp_version(txn_id, record)
+        # embed before taking the latch so other transactions are not held up by the model
+        vector = utils.string_to_vector(record.value)
+
+        with self.stripe(record.id):
             head = self.records.get(record.id)
             if head is not None and not head.deleted:
                 raise Exception(f"record with ID {record.id} already exists")
+            # keep the deleted history reachable for older snapshots
+            record.next = head
             self.records[record.id] = record
-
-            # update the transaction's snapshot data
-            txn = self.transactions[txn_id]
-            if getattr(txn, "snapshot_data", None) is not None:
-                # replace any older version of this key in the snapshot
-                txn.snapshot_data = [
-                    r for r in txn.snapshot_data if r.id != record.id
-                ] + [record]
-
-            vector = utils.string_to_vector(record.value)
             vector_store.add_vector(record.key, vector)
-
-    def update(self, txn_id: int, record: Record) -> None:
-        record.begin_ts = txn_id
-        record.end_ts = math.inf
-        record.deleted = False
-        record.created_by_txn_id = txn_id
-        record.key = record.id + "_" + str(txn_id)
-
-        wasBlocked = False
-
-        # Wait for existing head version to be committed or same txn
-        while True:
-            with self.lock:
+            self.versions.add(record)
+            self._index_version(record)
+
+            # overlay the new version on the transaction's snapshot
+            self.transactions[txn_id].record_write(record)
+
+    def insert_many(self, txn_id: int, records: list[Record], batch_size: int | None = None) -> None:
+        """
+        Bulk insert. Values are embedded in model batches of batch_size (default
+        embed_batch_size) without holding any lock; all versions and vectors are
+        then published in one short critical section over the records' latches.
+        Either every record is inserted or, if any ID already exists, none is.
+        """
+        record_ids = set()
+        for record in records:
+            if record.id in record_ids:
+                raise Exception(f"record with ID {record.id} appears more than once")
+            record_ids.add(record.id)
+            self.metadata_indexes.check(record.metadata)
+            self._stamp_version(txn_id, record)
+
+        vectors = utils.strings_to_vectors([r.value for r in records], batch_size or self.embed_batch_size)
+
+        with ExitStack() as latches:
+            # take each latch once, in a fixed order, so concurrent bulk inserts cannot deadlock
+            for index in sorted({self._stripe_index(r) for r in record_ids}):
+                latches.enter_context(self._stripes[index])
+            for record in records:
                 head = self.records.get(record.id)
-            if head is None:
-                raise Exception(f"record with ID {record.id} not found")
-            creator_id = head.created_by_txn_id
-            creator_txn = self.transactions.get(creator_id)
-            if creator_id == txn_id or (creator_txn and creator_txn.status != TransactionStatus.ACTIVE):
-                break
-            
-            if not wasBlocked:
-                print("blocking by txn", creator_id, "for record", record.id)
-                wasBlocked = True
-            time.sleep(0.001)
-
-        with self.lock:
-            head = self.records[record.id]
+                if head is not None and not head.deleted:
+                    raise Exception(f"record with ID {record.id} already exists")
             txn = self.transactions[txn_id]
+            for record, vector in zip(records, vectors):
+                record.next = self.records.get(record.id)
+                self.records[record.id] = record
+                vector_store.add_vector(record.key, vector)
+                self.versions.add(record)
+                self._index_version(record)
+                txn.record_write(record)
 
-            snapshot_version = next((r for r in txn.snapshot_data if r.id == record.id), None)
-            if snapshot_version is not None and snapshot_version.key != head.key:
-                raise Exception(f"Write conflict on record '{record.id}': ")
-            
-            
-            record.next = head
-            self.records[record.id] = record
-
-            txn = self.transactions[txn_id]
-            if getattr(txn, "snapshot_data", None) is not None:
-                txn.snapshot_data = [
-                    r for r in txn.snapshot_data if r.id != record.id
-                ] + [record]
+    def update(self, txn_id: int, record: Record) -> None:
+        """Writes a new version of record. Without metadata of its own it keeps the previous version's."""
+        self.metadata_indexes.check(record.metadata)
+        self._stamp_version(txn_id, record)
+        vector = utils.string_to_vector(record.value)
+
+        txn = self.transactions[txn_id]
+        try:
+            with self.stripe(record.id):
+                # wait for the existing head version to be committed / aborted, or be our own
+                head = self._wait_for_head(txn, record.id)
+
+                snapshot_version = self._visible_version(txn, record.id)
+                if snapshot_version is not None and not snapshot_version.deleted and snapshot_version.key != head.key:
+                    metrics.inc("store.conflicts")
+                    raise Exception(f"Write conflict on record '{record.id}': ")
+                
+                
+                if record.metadata is None and not head.deleted:
+                    record.metadata = head.metadata
+                record.next = head
+                self.records[record.id] = record
+                vector_store.add_vector(record.key, vector)
+                self.versions.add(record)
+                self._index_version(record)
+
+                txn.record_write(record)
+        except DeadlockError:
+            # abort outside the latch: the victim's other chains are latched by other stripes
+            self.abort_transaction(txn_id)
+            raise
+
+    def _wait_for_head(self, txn: Transaction, record_id: str) -> Record:
+        # caller holds the record's latch; Condition.wait releases it while blocked
+        started = None
+        try:
+            while True:
+                if txn.deadlock_victim:
+                    self._deadlock(txn)
+                head = self.records.get(record_id)
+                if head is None:
+                    raise Exception(f"record with ID {record_id} not found")
+                creator_id = head.created_by_txn_id
+                creator_txn = self.transactions.get(creator_id)
+                if creator_id == txn.id or creator_txn is None or creator_txn.status != TransactionStatus.ACTIVE:
+                    return head
+
+                with self._graph_lock:
+                    if started is None:
+                        started = time.monotonic()
+                        self.wait_stats["waits"] += 1
+                        self.wait_stats["blocked"] += 1
+                    self.waits_for[txn.id] = creator_id
+                    victim = self._deadlock_victim(txn.id)
+                    if victim is not None and victim != txn.id:
+                        # the victim is blocked elsewhere and notices on its next poll
+                        self.transactions[victim].deadlock_victim = True
+                if victim == txn.id:
+                    self._deadlock(txn)
+
+                timeout = self.deadlock_poll_interval
+                if self.lock_wait_timeout is not None:
+                    remaining = self.lock_wait_timeout - (time.monotonic() - started)
+                    if remaining <= 0:
+                        with self._graph_lock:
+                            self.wait_stats["timeouts"] += 1
+                        raise LockWaitTimeout(
+                            f"lock wait timeout on record '{record_id}' held by transaction {creator_id}"
+                        )
+                    timeout = min(timeout, remaining)
+                waiters = self._record_waits.setdefault(record_id, [threading.Condition(self.stripe(record_id)), 0])
+                waiters[1] += 1
+                try:
+                    waiters[0].wait(timeout)
+                finally:
+                    waiters[1] -= 1
+                    if waiters[1] == 0:
+                        del self._record_waits[record_id]
+        finally:
+            with self._graph_lock:
+                self.waits_for.pop(txn.id, None)
+                if started is not None:
+                    waited = time.monotonic() - started
+                    self.wait_stats["blocked"] -= 1
+                    self.wait_stats["wait_time_s"] += waited
+                    self.wait_stats["max_wait_s"] = max(self.wait_stats["max_wait_s"], waited)
+            if started is not None:
+                metrics.observe("store.lock_wait", waited)
+
+    def _deadlock_victim(self, txn_id: int) -> int | None:
+        # caller holds self._graph_lock; follows the wait-for graph from txn_id; on a cycle, picks the youngest transaction in it
+        cycle = [txn_id]
+        holder = self.waits_for.get(txn_id)
+        while holder is not None and holder not in cycle:
+            cycle.append(holder)
+            holder = self.waits_for.get(holder)
+        if holder != txn_id:
+            return None
+        return max(cycle)
+
+    def _deadlock(self, txn: Transaction) -> None:
+        with self._graph_lock:
+            self.wait_stats["deadlocks"] += 1
+        raise DeadlockError(f"deadlock detected; transaction {txn.id} was chosen as victim")
+
+    def _wake_waiters(self, txn: Transaction) -> None:
+        for record_id in txn.writes:
+            # waiters register under the stripe latch, so look them up under it too
+            with self.stripe(record_id):
+                waiters = self._record_waits.get(record_id)
+                if waiters is not None:
+                    waiters[0].notify_all()
+
+    def low_water_mark(self) -> int:
+        """Oldest snapshot timestamp any active transaction can read; versions superseded at or
+        before it by a committed version are invisible to everyone."""
+        with self.lock:
+            return min((self.transactions[t].snapshot_ts for t in self.active_txns), default=self.visible_seq)
 
-            vector = utils.string_to_vector(record.value)
-            vector_store.add_vector(record.key, vector)
+    def lock_wait_stats(self) -> dict:
+        with self._graph_lock:
+            return dict(self.wait_stats)
 
 
     def delete(self, txn_id: int, record_id: str) -> None:
         # treat delete as a new tombstone version
-        with self.lock:
+        with self.stripe(record_id):
             head = self.records.get(record_id)
             if head is None:
                 raise Exception(f"record with ID {record_id} not found")
@@ -115,86 +303,344 @@ class Store:
             tombstone.created_by_txn_id = txn_id
             tombstone.next = head
             self.records[record_id] = tombstone
+            self.versions.add(tombstone)
             # update this txn's snapshot to hide deleted key
-            txn = self.transactions[txn_id]
-            if getattr(txn, "snapshot_data", None) is not None:
-                txn.snapshot_data = [
-                    r for r in txn.snapshot_data if r.id != record_id
-                ]
-
-
-    def read(self, txn_id: int, query: str, k: int) -> list[Record]:
-        with self.lock:
-            items = list(self.records.values())
-            txns = dict(self.transactions)
-            txn = txns.get(txn_id)
-
-            if txn.snapshot_data != None:
-                query_vector = utils.string_to_vector(query)
-                return_keys = utils.get_top_k_keys(query_vector, [r.key for r in txn.snapshot_data], k=k)
-
-                return_values = [s for s in txn.snapshot_data if s.key in return_keys]
-                return return_values
-
-        valid_records: list[Record] = []
-        for head in items:
-            current = head
-            tombstone_by_this_txn = False
-
-            while current:
-                if current.created_by_txn_id == txn_id and current.deleted:
-                    tombstone_by_this_txn = True
-                    break
-
-                creator_txn = txns.get(current.created_by_txn_id)
-                if creator_txn and creator_txn.status == TransactionStatus.ACTIVE:
-                    current = current.next
-                    continue
-                if current.begin_ts <= txn_id < current.end_ts and not current.deleted:
-                    valid_records.append(current)
-                    break
-                current = current.next
-
-            if tombstone_by_this_txn:
-                continue
-        txn.snapshot_data = valid_records
-
+            self.transactions[txn_id].record_write(tombstone)
+
+    def _creator_visible(self, txn: Transaction, creator_id: int) -> bool:
+        # committed state as of txn's begin: creators that committed at or before snapshot_ts
+        creator = self.transactions.get(creator_id)
+        return (
+            creator is not None
+            and creator.status == TransactionStatus.COMMITTED
+            and creator.commit_ts <= txn.snapshot_ts
+        )
+
+    def _committed_version(self, txn: Transaction, head: Record | None) -> Record | None:
+        # newest version in the chain that txn's snapshot sees, ignoring its own writes
+        current = head
+        while current:
+            if self._creator_visible(txn, current.created_by_txn_id):
+                return None if current.deleted else current
+            current = current.next
+        return None
+
+    def _visible_version(self, txn: Transaction, record_id: str) -> Record | None:
+        if record_id in txn.writes or txn.snapshot_data is not None:
+            return txn.snapshot_version(record_id)
+        return self._committed_version(txn, self.records.get(record_id))
+
+    def _init_snapshot(self, txn: Transaction) -> None:
+        # lock-free: visibility depends only on commit timestamps, which never change once set
+        shared = self._shared_snapshot
+        if shared is None or shared[0] != txn.snapshot_ts:
+            with metrics.span("store.snapshot"):
+                snapshot = self._build_snapshot(txn)
+                mask = vector_store.RowMask(vector_store.vector_store, (r.key for r in snapshot.values()))
+            shared = (txn.snapshot_ts, snapshot, mask)
+            if txn.snapshot_ts == self.visible_seq:
+                self._shared_snapshot = shared
+        txn.attach_snapshot(shared[1], shared[2])
+
+    def _build_snapshot(self, txn: Transaction) -> dict[str, Record]:
+        # same answer as _committed_version over every chain: the table picks each record's
+        # visible version column-wise, the chain is only walked to fetch that version's object
+        valid_records: dict[str, Record] = {}
+        for record_id, creator_id in zip(*self.versions.visible(txn.snapshot_ts)):
+            version = self.records.get(record_id)
+            while version is not None and version.created_by_txn_id != creator_id:
+                version = version.next
+            if version is not None:
+                valid_records[record_id] = version
+        return valid_records
+
+    def read(self, txn_id: int, query: str, k: int, where=None, hybrid=None) -> list[Record]:
+        """
+        Top-k visible versions for query. where (see mvcc.metadata) restricts the candidates
+        to versions whose metadata matches, before any vector is scored. hybrid mixes in BM25
+        over the values: "rrf" (or True) fuses the lexical and vector rankings by reciprocal
+        rank, "prefilter" ranks by vector only among versions containing a query term.
+        Transactions that have not written are served from self.result_cache when a reader
+        of the same committed state (state_seq) already ran the same read.
+        """
+        with metrics.span("store.read"):
+            return self._read(self.transactions.get(txn_id), query, k, where, hybrid)
+
+    def _read(self, txn: Transaction, query: str, k: int, where, hybrid) -> list[Record]:
+        # a transaction that wrote sees its own versions, which no other reader shares
+        cache_key = None
+        if not txn.writes and not callable(where):
+            conditions = None if where is None else normalize_where(where)
+            cache_key = ResultCache.key_for(query, k, txn.state_seq, conditions, hybrid, self._search_config(hybrid))
+            return_keys = self.result_cache.get(cache_key)
+            if return_keys is not None:
+                if txn.snapshot_data is None:
+                    self._init_snapshot(txn)
+                return self._records_for_keys(txn, return_keys)
         query_vector = utils.string_to_vector(query)
-        return_keys = utils.get_top_k_keys(query_vector, [r.key for r in valid_records], k=k)
-
-        return_values = [s for s in valid_records if s.key in return_keys]
-        return return_values
+        if txn.snapshot_data is None:
+            self._init_snapshot(txn)
+        if where is None:
+            mask = txn.visible_mask
+        else:
+            with metrics.span("store.filter"):
+                mask = self._filter_mask(txn, where)
+        if hybrid:
+            return_keys = self._hybrid_keys(txn, query, query_vector, mask, k, "rrf" if hybrid is True else hybrid)
+        else:
+            return_keys = utils.get_top_k_keys(query_vector, mask, k=k)
+        if cache_key is not None:
+            self.result_cache.put(cache_key, return_keys)
+        return self._records_for_keys(txn, return_keys)
+
+    def _search_config(self, hybrid) -> tuple:
+        # what ranks a read besides the snapshot: a different encoder, index or beam width gives other keys
+        index = vector_store.vector_store.index
+        index_config = None
+        if index is not None:
+            index_config = (type(index).__name__, id(index), getattr(index, "ef_search", None), getattr(index, "rerank", None))
+        return (utils.get_encoder().name, index_config, self.hybrid_depth if hybrid else None)
+
+    def _hybrid_keys(self, txn: Transaction, query: str, query_vector, mask, k: int, mode: str) -> list[str]:
+        if self.lexical is None:
+            raise Exception("hybrid reads need Store(lexical_index=True)")
+        if mode not in ("rrf", "prefilter"):
+            raise ValueError(f"unknown hybrid mode {mode!r}")
+        # lexical candidates, cut down to what this read may see
+        matched, visible_keys = self._restrict_mask(mask, self.lexical.candidates(query))
+        if mode == "prefilter":
+            return utils.get_top_k_keys(query_vector, matched, k=k)
+        depth = max(k, self.hybrid_depth)
+        lexical = self.lexical.rank(query, visible_keys, depth, self._lexical_collection(txn))
+        dense = utils.get_top_k_keys(query_vector, mask, k=depth)
+        return reciprocal_rank_fusion([lexical, dense])[:k]
+
+    def _lexical_collection(self, txn: Transaction) -> tuple[int, int]:
+        # BM25 statistics over the versions txn sees, so other transactions' writes never move its ranking;
+        # readers of the same committed state share them
+        if not txn.writes:
+            cached = self._lexical_stats
+            if cached is not None and cached[0] == txn.state_seq:
+                return cached[1]
+        stats = self.lexical.collection_stats(version.key for version in txn.visible_records())
+        if not txn.writes:
+            self._lexical_stats = (txn.state_seq, stats)
+        return stats
+
+    def _index_version(self, record: Record) -> None:
+        self.metadata_indexes.add(record)
+        if self.lexical is not None:
+            self.lexical.add(record)
+
+    def _unindex_version(self, key: str) -> None:
+        self.metadata_indexes.discard(key)
+        if self.lexical is not None:
+            self.lexical.discard(key)
+
+    def create_index(self, field: str, kind: str = "hash") -> None:
+        """Adds a secondary index on a metadata field: "hash" (equality / in) or "sorted" (also ranges)."""
+        def versions():
+            for record_id in list(self.records):
+                version = self.records.get(record_id)
+                while version is not None:
+                    yield version
+                    version = version.next
+
+        self.metadata_indexes.create(field, kind, versions())
+
+    def _filter_mask(self, txn: Transaction, where) -> np.ndarray:
+        # candidate vector keys: from the indexes where they cover a condition, else from a scan of the snapshot
+        if callable(where):
+            keys = {r.key for r in txn.visible_records() if where(r)}
+        else:
+            conditions = normalize_where(where)
+            keys, rest = self.metadata_indexes.lookup(conditions)
+            if keys is None or rest:
+                keys = {r.key for r in txn.visible_records()
+                        if (keys is None or r.key in keys) and matches(r.metadata, rest)}
+        # ... intersected with the snapshot, so the indexes never decide visibility
+        return self._restrict_mask(txn.visible_mask, keys)[0]
+
+    @staticmethod
+    def _restrict_mask(mask, keys) -> tuple[np.ndarray, set[str]]:
+        """(row mask, key set) of the given vector keys that mask lets through."""
+        matrix = vector_store.vector_store
+        with matrix.lock:
+            visible = mask.view() if isinstance(mask, vector_store.RowMask) else mask
+            rows = matrix.rows_for(keys)
+            rows = rows[rows < visible.shape[0]]
+            rows = rows[visible[rows]]
+            restricted = np.zeros(visible.shape[0], dtype=bool)
+            restricted[rows] = True
+            return restricted, {matrix.row_keys[r] for r in rows.tolist()}
+
+    def read_many(self, txn_id: int, queries: list[str], k: int, where=None) -> list[list[Record]]:
+        """
+        read() for a batch of query strings against the same snapshot: the queries are encoded
+        in model batches, visibility (and the where filter) is resolved once, and all of them
+        are scored together. Returns one result list per query, in order.
+        """
+        with metrics.span("store.read_many"):
+            query_vectors = utils.strings_to_vectors(queries, batch_size=self.embed_batch_size)
+            txn = self.transactions.get(txn_id)
+            if txn.snapshot_data is None:
+                self._init_snapshot(txn)
+            mask = txn.visible_mask if where is None else self._filter_mask(txn, where)
+            key_lists = utils.get_top_k_keys_batch(query_vectors, mask, k=k)
+            return [self._records_for_keys(txn, keys) for keys in key_lists]
+
+    @staticmethod
+    def _records_for_keys(txn: Transaction, keys: list[str]) -> list[Record]:
+        # maps the selected vector keys ("<record id>_<txn id>") back to visible versions, in ranking order
+        selected = []
+        with metrics.span("store.resolve"):
+            for key in keys:
+                version = txn.snapshot_version(key.rsplit("_", 1)[0])
+                if version is not None and version.key == key:
+                    selected.append(version)
+        return selected
+
+    def snapshot_stats(self, txn_id: int) -> dict:
+        return self.transactions[txn_id].snapshot_stats()
 
     def commit_transaction(self, txn_id: int) -> None:
+        with metrics.span("store.commit"):
+            self._commit(txn_id)
+        metrics.inc("store.commits")
+
+    def _commit(self, txn_id: int) -> None:
         with self.lock:
             txn = self.transactions.get(txn_id)
             if not txn:
                 raise Exception(f"transaction {txn_id} not found")
-
-            for head in self.records.values():
-                current = head
-                while current:
-                    if current.created_by_txn_id == txn_id and current.next:
-                        current.next.end_ts = current.begin_ts
-                    current = current.next
-
-            txn.status = TransactionStatus.COMMITTED
+            if txn.status != TransactionStatus.ACTIVE:
+                # e.g. aborted after a write conflict; committing it would resurrect unlinked versions
+                raise Exception(f"transaction {txn_id} is {txn.status.lower()}, not active")
+
+            # only the chains this transaction wrote need their superseded versions closed
+            for _, version in txn.write_set:
+                if version.next:
+                    version.next.end_ts = version.begin_ts
+
+            self.commit_seq += 1
+            txn.commit_ts = self.commit_seq
+            position = None
+            try:
+                if self.wal is not None and txn.writes:
+                    # appended under the lock, so the log is in commit order
+                    position = self.wal.append(txn.commit_ts, txn_id, list(txn.writes.values()))
+            except Exception:
+                self._finish_seq(txn.commit_ts)
+                raise
+        if position is not None:
+            try:
+                # group commit: one sync covers every commit appended while the previous one ran
+                self.wal.wait_durable(position)
+            except Exception:
+                with self.lock:
+                    self._finish_seq(txn.commit_ts)
+                self.abort_transaction(txn_id)
+                raise
+        with self.lock:
+            self._publish(txn)
+        self._wake_waiters(txn)
+        if txn.writes:
+            self._prune_results()
+        txn.release()
+
+    def _finish_seq(self, commit_seq: int) -> None:
+        # caller holds self.lock; marks commit_seq published (or abandoned) and advances visible_seq
+        self._finished_seqs.add(commit_seq)
+        while self.visible_seq + 1 in self._finished_seqs:
+            self.visible_seq += 1
+            self._finished_seqs.discard(self.visible_seq)
+            if self.visible_seq in self._writing_seqs:
+                self._writing_seqs.discard(self.visible_seq)
+                self.state_seq = self.visible_seq
+
+    def _publish(self, txn: Transaction) -> None:
+        # caller holds self.lock; makes a committed (and durable) transaction visible
+        self.versions.commit(txn.id, txn.commit_ts)
+        txn.status = TransactionStatus.COMMITTED
+        self.active_txns.discard(txn.id)
+        if txn.writes:
+            self._writing_seqs.add(txn.commit_ts)
+        # new snapshots may only cover a prefix of commit numbers that are all visible
+        self._finish_seq(txn.commit_ts)
+
+    def _replay(self, commit_seq: int, writes: list) -> None:
+        """
+        Applies one recovered commit: (record id, value, deleted, vector, metadata) per record,
+        vectors taken as-is instead of being embedded. Used by mvcc.durability.recover.
+        """
+        txn_id = self.begin_transaction()
+        txn = self.transactions[txn_id]
+        for record_id, value, deleted, vector, metadata in writes:
+            record = Record(record_id, value, metadata)
+            self._stamp_version(txn_id, record)
+            record.deleted = deleted
+            with self.stripe(record_id):
+                record.next = self.records.get(record_id)
+                if record.next is not None:
+                    record.next.end_ts = txn_id
+                self.records[record_id] = record
+                if not deleted:
+                    vector_store.add_vector(record.key, vector)
+                self.versions.add(record)
+                self._index_version(record)
+                txn.record_write(record)
+        with self.lock:
+            # keep the logged commit numbers (read-only commits leave gaps between them) so
+            # frames logged after the restart sort after the replayed ones
+            self.commit_seq = max(self.commit_seq, commit_seq)
+            self.visible_seq = commit_seq - 1
+            txn.commit_ts = commit_seq
+            self._publish(txn)
 
     def abort_transaction(self, txn_id: int) -> None:
+        txn = self.transactions.get(txn_id)
+        if not txn:
+            raise Exception(f"transaction {txn_id} not found")
+        if txn.status == TransactionStatus.ABORTED:
+            return  # already aborted, e.g. as a deadlock victim inside update
+        if txn.status == TransactionStatus.COMMITTED:
+            # its versions are in the chains for good; unlinking them would lose committed data
+            raise Exception(f"transaction {txn_id} is already committed")
+        # remove any versions created by this txn from the chains it wrote
+        for key in {record_id for record_id, _ in txn.write_set}:
+            with self.stripe(key):
+                head = self.records.get(key)
+                while head is not None and head.created_by_txn_id == txn_id:
+                    head = head.next
+                if head is None:
+                    self.records.pop(key, None)
+                    continue
+                self.records[key] = head
+                prev, curr = head, head.next
+                while curr:
+                    if curr.created_by_txn_id == txn_id:
+                        prev.next = curr.next
+                    else:
+                        prev = curr
+                    curr = curr.next
+        # the aborted versions are unreachable now, so are their embeddings
+        for _, version in txn.write_set:
+            if not version.deleted:
+                vector_store.remove_vector(version.key)
+                self._unindex_version(version.key)
         with self.lock:
-            txn = self.transactions.get(txn_id)
-            if not txn:
-                raise Exception(f"transaction {txn_id} not found")
-            # remove any versions created by this txn from the chains
-            for key, head in list(self.records.items()):
-                if head.created_by_txn_id == txn_id:
-                    self.records[key] = head.next
-                else:
-                    prev = head
-                    curr = head.next
-                    while curr:
-                        if curr.created_by_txn_id == txn_id:
-                            prev.next = curr.next
-                            break
-                        prev, curr = curr, curr.next
-            txn.status = TransactionStatus.ABORTED
\ No newline at end of file
+            self.versions.abort(txn_id)
+            txn.status = TransactionStatus.ABORTED
+            self.active_txns.discard(txn_id)
+        metrics.inc("store.aborts")
+        self._wake_waiters(txn)
+        self._prune_results()
+        txn.release()
+
+    def _prune_results(self) -> None:
+        # cached reads on a state older than every readable one can never be hit again
+        if not len(self.result_cache):
+            return
+        with self.lock:
+            oldest = min((self.transactions[t].state_seq for t in self.active_txns), default=self.state_seq)
+        self.result_cache.prune(oldest)
@@ -1,4 +1,8 @@
+import sys
+from typing import Iterator
+
 from .record import Record
+from vector_search.vector_store import RowMask
 
 class TransactionStatus:
     ACTIVE = "Active"
@@ -7,8 +11,86 @@ class TransactionStatus:
 
 
 class Transaction:
-    def __init__(self, txn_id: int):
+    def __init__(self, txn_id: int, snapshot_ts: int = 0):
         self.id = txn_id
         self.status = TransactionStatus.ACTIVE
         self.start_ts = txn_id  # simplified timestamp
-        self.snapshot_data: list[Record] = None
\ No newline at end of file
+        # commit sequence number at begin: exactly the transactions with commit_ts <= snapshot_ts are visible
+        self.snapshot_ts = snapshot_ts
+        # newest writing commit at or before snapshot_ts; equal state_seq means equal committed state
+        self.state_seq = 0
+        self.commit_ts: int | None = None
+        # committed versions visible at start, keyed by record id; resolved lazily on first
+        # read and shared read-only with other transactions that have the same snapshot_ts
+        self.snapshot_data: dict[str, Record] | None = None
+        # overlay of this transaction's own newest version per record id (tombstones included)
+        self.writes: dict[str, Record] = {}
+        # every version this transaction created, in order; commit / abort only touch these chains
+        self.write_set: list[tuple[str, Record]] = []
+        # bitmap over vector_store rows that are visible to this snapshot (copied on first write)
+        self.visible_mask: RowMask | None = None
+        self.mask_shared = False
+        # set when deadlock detection picks this (blocked) transaction to abort
+        self.deadlock_victim = False
+
+    def snapshot_version(self, record_id: str) -> Record | None:
+        """The version of record_id this transaction sees, own writes first (may be a tombstone)."""
+        version = self.writes.get(record_id)
+        if version is None and self.snapshot_data is not None:
+            version = self.snapshot_data.get(record_id)
+        return version
+
+    def visible_records(self) -> Iterator[Record]:
+        for record_id, version in self.snapshot_data.items():
+            if record_id not in self.writes:
+                yield version
+        for version in self.writes.values():
+            if not version.deleted:
+                yield version
+
+    def attach_snapshot(self, snapshot: dict[str, Record], mask: RowMask) -> None:
+        """Installs the shared committed snapshot and replays earlier own writes onto its mask."""
+        self.snapshot_data, self.visible_mask, self.mask_shared = snapshot, mask, True
+        if self.writes:
+            self.visible_mask = mask.copy()
+            self.mask_shared = False
+            for record_id, version in self.writes.items():
+                previous = snapshot.get(record_id)
+                if previous is not None:
+                    self.visible_mask.discard(previous.key)
+                if not version.deleted:
+                    self.visible_mask.add(version.key)
+
+    def record_write(self, record: Record) -> None:
+        """Overlays a version written by this transaction (its vector must already be stored)."""
+        if self.visible_mask is not None:
+            if self.mask_shared:
+                self.visible_mask = self.visible_mask.copy()
+                self.mask_shared = False
+            previous = self.snapshot_version(record.id)
+            if previous is not None and not previous.deleted:
+                self.visible_mask.discard(previous.key)
+            if not record.deleted:
+                self.visible_mask.add(record.key)
+        self.writes[record.id] = record
+        self.write_set.append((record.id, record))
+
+    def release(self) -> None:
+        """Drops the references to written versions and the snapshot once the transaction has
+        finished, so the vacuum can actually free the versions it prunes."""
+        self.writes = {}
+        self.write_set = []
+        self.snapshot_data = None
+        self.visible_mask = None
+        self.mask_shared = False
+
+    def snapshot_stats(self) -> dict:
+        """Snapshot size, split into the shared part and what this transaction holds privately."""
+        private_bytes = sys.getsizeof(self.writes)
+        if self.visible_mask is not None and not self.mask_shared:
+            private_bytes += self.visible_mask.bits.nbytes
+        return {
+            "shared_records": len(self.snapshot_data or ()),
+            "own_writes": len(self.writes),
+            "private_bytes": private_bytes,
+        }
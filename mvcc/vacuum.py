@@ -0,0 +1,145 @@
+"""
+Garbage collection of dead versions and orphaned vectors.
+
+A version is dead once a newer version of the same record was committed at
+or before the store's low-water mark (the oldest snapshot timestamp any
+active transaction reads): no current or future snapshot can reach past it.
+Each pass prunes those versions, drops their embeddings (and index entries),
+removes records whose surviving version is a committed tombstone, forgets
+finished transactions that no surviving version names as its creator, and
+compacts the vector matrix once enough rows are free.
+
+- Vacuum.run_once: One throttled pass; returns the pass's stats.
+- Vacuum.start / stop: Runs passes on a background thread every `interval` seconds.
+"""
+
+import sys
+import threading
+import time
+
+from .record import Record
+from .transaction import TransactionStatus
+from vector_search import vector_store
+
+
+class Vacuum:
+    def __init__(self, store, interval: float = 5.0, batch_size: int = 1000, pause: float = 0.001,
+                 compact_threshold: float = 0.25):
+        self.store = store
+        self.interval = interval
+        # chains pruned per batch, and the sleep between batches
+        self.batch_size = batch_size
+        self.pause = pause
+        # compact the vector matrix when this fraction of its rows is free
+        self.compact_threshold = compact_threshold
+        self.stats = {"passes": 0, "versions_reclaimed": 0, "vectors_reclaimed": 0, "records_removed": 0,
+                      "transactions_removed": 0, "bytes_reclaimed": 0, "compactions": 0}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _horizon_visible(self, creator_id: int, low_water: int) -> bool:
+        creator = self.store.transactions.get(creator_id)
+        return (
+            creator is not None
+            and creator.status == TransactionStatus.COMMITTED
+            and creator.commit_ts <= low_water
+        )
+
+    def _prune_chain(self, record_id: str, low_water: int, totals: dict, dead_versions: list) -> None:
+        # caller holds the record's stripe latch; dead_versions collects (record id, creator) for the version table
+        head = self.store.records.get(record_id)
+        kept_keys = set()
+        horizon = head
+        while horizon is not None and not self._horizon_visible(horizon.created_by_txn_id, low_water):
+            kept_keys.add(horizon.key)
+            horizon = horizon.next
+        if horizon is None:
+            return
+        kept_keys.add(horizon.key)
+
+        dead, horizon.next = horizon.next, None
+        removed = horizon is head and horizon.deleted
+        if removed:
+            # a committed delete that every snapshot sees: the record is gone for good
+            self.store.records.pop(record_id)
+            horizon.next, dead = dead, horizon
+            totals["records_removed"] += 1
+        while dead is not None:
+            totals["versions_reclaimed"] += 1
+            totals["bytes_reclaimed"] += _version_bytes(dead) + self.store.versions.row_bytes()
+            if removed or dead.key not in kept_keys:
+                dead_versions.append((record_id, dead.created_by_txn_id))
+            if not dead.deleted and dead.key not in kept_keys:
+                self.store._unindex_version(dead.key)
+            # versions written twice by one transaction share a vector key with the kept one
+            if not dead.deleted and dead.key not in kept_keys and dead.key in vector_store.vector_store:
+                vector_store.remove_vector(dead.key)
+                totals["vectors_reclaimed"] += 1
+                totals["bytes_reclaimed"] += vector_store.vector_store.dim * vector_store.vector_store.dtype.itemsize
+            dead.next, dead = None, dead.next
+
+    def run_once(self) -> dict:
+        totals = {"versions_reclaimed": 0, "vectors_reclaimed": 0, "records_removed": 0, "transactions_removed": 0,
+                  "bytes_reclaimed": 0, "compactions": 0}
+        dead_versions = []
+        record_ids = list(self.store.records)
+        for start in range(0, len(record_ids), self.batch_size):
+            low_water = self.store.low_water_mark()
+            for record_id in record_ids[start:start + self.batch_size]:
+                with self.store.stripe(record_id):
+                    self._prune_chain(record_id, low_water, totals, dead_versions)
+            if self.pause:
+                time.sleep(self.pause)
+
+        # also drops the rows of aborted transactions
+        self.store.versions.compact(dead_versions)
+        totals["transactions_removed"] = self._forget_transactions(self.store.low_water_mark())
+        # the cached committed snapshot of a state no transaction reads any more still holds pruned versions
+        shared = self.store._shared_snapshot
+        if shared is not None and shared[0] < self.store.low_water_mark():
+            self.store._shared_snapshot = None
+        matrix = vector_store.vector_store
+        with matrix.lock:
+            if matrix.fragmentation() > self.compact_threshold:
+                matrix.compact()
+                totals["compactions"] += 1
+
+        self.stats["passes"] += 1
+        for name, value in totals.items():
+            self.stats[name] += value
+        return totals
+
+    def _forget_transactions(self, low_water: int) -> int:
+        # a finished transaction is only ever looked up as the creator of a version in some chain
+        creators = self.store.versions.creator_ids()
+        store = self.store
+        with store.lock:
+            finished = [
+                txn_id for txn_id, txn in store.transactions.items()
+                if txn_id not in store.active_txns and txn_id not in creators
+                and (txn.status == TransactionStatus.ABORTED or txn.commit_ts <= low_water)
+            ]
+            for txn_id in finished:
+                del store.transactions[txn_id]
+        return len(finished)
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="mvcc-vacuum", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+def _version_bytes(record: Record) -> int:
+    return sys.getsizeof(record) + sys.getsizeof(record.value)
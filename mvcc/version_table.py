@@ -0,0 +1,167 @@
+"""
+Columnar index of every version in the store.
+
+Version chains stay the source of truth for point lookups, but resolving a
+whole snapshot by walking one chain per record is a Python loop over every
+version with a transaction lookup per step. The table keeps one row per
+version in flat NumPy columns (interned record id, creator transaction id,
+creator slot, flag bits) plus one commit sequence number per slot, so
+snapshot visibility is a couple of vectorized operations instead. Only
+transactions that wrote a version get a slot, and compact() renumbers the
+slots down to the creators of the surviving rows, so neither read-only nor
+long-finished transactions cost the table anything. Rows are appended in
+the order versions are linked into their chains, so within a record a later
+row is always a newer version.
+
+Aborted and vacuumed versions can never be the newest visible version of any
+live snapshot, so they are left in place until compact() drops them.
+
+- VersionTable.add: Registers a new version under its record id.
+- VersionTable.commit / abort: Records a transaction's outcome (O(1), no per-version work).
+- VersionTable.visible: (record id, creator txn id) of each record's newest version in a snapshot.
+- VersionTable.compact: Drops rows of aborted transactions and of given dead versions.
+"""
+
+import threading
+
+import numpy as np
+
+from .record import Record
+
+# commit sequence numbers of transactions that have not committed; never <= any snapshot
+UNCOMMITTED = np.iinfo(np.int64).max
+ABORTED = UNCOMMITTED - 1
+
+DELETED = 1
+
+
+class VersionTable:
+    def __init__(self, capacity: int = 1024):
+        self.initial_capacity = max(1, capacity)
+        self.lock = threading.Lock()
+        # record id <-> small int, so the table never stores id strings per version
+        self.id_codes: dict[str, int] = {}
+        self.ids: list[str] = []
+        self.size = 0
+        self._allocate(self.initial_capacity)
+        # txn id -> slot, and slot -> commit sequence number, for transactions that own rows
+        self.slot_of: dict[int, int] = {}
+        self.slot_commit_ts = np.full(self.initial_capacity, UNCOMMITTED, dtype=np.int64)
+
+    def _allocate(self, capacity: int) -> None:
+        self.record_codes = np.zeros(capacity, dtype=np.int32)
+        self.creators = np.zeros(capacity, dtype=np.int32)
+        self.slots = np.zeros(capacity, dtype=np.int32)
+        self.flags = np.zeros(capacity, dtype=np.uint8)
+
+    def _columns(self):
+        return self.record_codes, self.creators, self.slots, self.flags
+
+    def _slot(self, txn_id: int) -> int:
+        # caller holds self.lock
+        slot = self.slot_of.get(txn_id)
+        if slot is None:
+            slot = self.slot_of[txn_id] = len(self.slot_of)
+            if slot == self.slot_commit_ts.shape[0]:
+                grown = np.full(2 * slot, UNCOMMITTED, dtype=np.int64)
+                grown[:slot] = self.slot_commit_ts
+                self.slot_commit_ts = grown
+        return slot
+
+    @property
+    def capacity(self) -> int:
+        return self.flags.shape[0]
+
+    def add(self, record: Record) -> None:
+        """Registers a stamped version. Callers hold the record's chain latch, so row order matches chain order."""
+        with self.lock:
+            code = self.id_codes.get(record.id)
+            if code is None:
+                code = self.id_codes[record.id] = len(self.ids)
+                self.ids.append(record.id)
+            if self.size == self.capacity:
+                old = self._columns()
+                self._allocate(2 * self.capacity)
+                for new, column in zip(self._columns(), old):
+                    new[: self.size] = column[: self.size]
+            row = self.size
+            self.record_codes[row] = code
+            self.creators[row] = record.created_by_txn_id
+            self.slots[row] = self._slot(record.created_by_txn_id)
+            self.flags[row] = DELETED if record.deleted else 0
+            self.size += 1
+
+    def _set_outcome(self, txn_id: int, commit_ts: int) -> None:
+        with self.lock:
+            slot = self.slot_of.get(txn_id)
+            if slot is None:
+                return  # wrote nothing: no row depends on the outcome
+            # an abort is final: its versions are unlinked, so they must never turn visible
+            if self.slot_commit_ts[slot] != ABORTED:
+                self.slot_commit_ts[slot] = commit_ts
+
+    def commit(self, txn_id: int, commit_ts: int) -> None:
+        self._set_outcome(txn_id, commit_ts)
+
+    def abort(self, txn_id: int) -> None:
+        self._set_outcome(txn_id, ABORTED)
+
+    def visible(self, snapshot_ts: int) -> tuple[list[str], list[int]]:
+        """
+        Record ids and creator txn ids of each record's newest version committed at or
+        before snapshot_ts, leaving out records whose newest such version is a tombstone.
+        """
+        with self.lock:
+            n = self.size
+            codes, creators, slots, flags = self.record_codes[:n], self.creators[:n], self.slots[:n], self.flags[:n]
+            slot_commit_ts, ids, n_ids = self.slot_commit_ts, self.ids, len(self.ids)
+
+        rows = np.flatnonzero(slot_commit_ts[slots] <= snapshot_ts)
+        # rows are in chain order, so the highest visible row per record is its newest visible version
+        newest = np.full(n_ids, -1, dtype=np.intp)
+        np.maximum.at(newest, codes[rows], rows)
+        newest = newest[newest >= 0]
+        newest = newest[(flags[newest] & DELETED) == 0]
+        return [ids[c] for c in codes[newest].tolist()], creators[newest].tolist()
+
+    def compact(self, dead: list[tuple[str, int]] = ()) -> int:
+        """Drops rows of aborted transactions and every row of the given (record id, creator txn id)
+        versions, and the slots of transactions left without rows. Returns the number of rows dropped."""
+        with self.lock:
+            n = self.size
+            codes, creators = self.record_codes[:n], self.creators[:n]
+            keep = self.slot_commit_ts[self.slots[:n]] != ABORTED
+            pairs = [(self.id_codes[r], c) for r, c in dead if r in self.id_codes]
+            if pairs:
+                dead_keys = np.array([(code << 32) | creator for code, creator in pairs], dtype=np.int64)
+                keep &= ~np.isin((codes.astype(np.int64) << 32) | creators.astype(np.int64), dead_keys)
+            rows = np.flatnonzero(keep)
+            old = [column[rows] for column in self._columns()]
+            self._allocate(max(self.initial_capacity, rows.size))
+            for new, column in zip(self._columns(), old):
+                new[: rows.size] = column
+            self.size = rows.size
+            self._compact_slots()
+            return n - rows.size
+
+    def _compact_slots(self) -> None:
+        # caller holds self.lock; renumbers the slots still named by a row to 0..m-1
+        n = self.size
+        used, first, inverse = np.unique(self.slots[:n], return_index=True, return_inverse=True)
+        commit_ts = np.full(max(self.initial_capacity, used.size), UNCOMMITTED, dtype=np.int64)
+        commit_ts[: used.size] = self.slot_commit_ts[used]
+        self.slots[:n] = inverse
+        self.slot_of = dict(zip(self.creators[first].tolist(), range(used.size)))
+        self.slot_commit_ts = commit_ts
+
+    def creator_ids(self) -> set[int]:
+        """Ids of the transactions that created a version still in the table."""
+        with self.lock:
+            return set(self.slot_of)
+
+    def row_bytes(self) -> int:
+        """Bytes one row occupies across the table's columns."""
+        return sum(c.itemsize for c in self._columns())
+
+    def __len__(self) -> int:
+        return self.size
@@ -0,0 +1,4 @@
+import os
+
+# Run the suite on the model-free hashing encoder unless a model is requested explicitly.
+os.environ.setdefault("VECTOR_DB_ENCODER", "hashing")
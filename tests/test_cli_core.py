@@ -1,5 +1,8 @@
 from CLI.cli_core import run_script
 from mvcc.store import Store
+from mvcc.transaction import TransactionStatus
+import os
+import tempfile
 import threading
 
 def test_basic_insert_and_query():
@@ -190,6 +193,77 @@ def test_insert_conflict():
     print("test_insert_conflict passed.\n\n")
 
 
+def test_commit_after_conflict_abort():
+    """
+    Test: Committing a transaction the CLI aborted on a write conflict
+    - t3 updates B, then conflicts on A (already updated by the committed t2) and is
+      aborted by the CLI; the script then tries to commit t3.
+    - Expected: The commit is refused, t3 stays aborted, and later snapshots still see
+      t1's B and t2's A.
+    """
+
+    print("Starting test_commit_after_conflict_abort...")
+    store = Store()
+    out = run_script("""
+        begin t1
+        insert t1 A apple
+        insert t1 B banana
+        commit t1
+        begin t2
+        begin t3
+        update t3 B banana three
+        update t2 A apple two
+        commit t2
+        update t3 A apple three
+        commit t3
+    """, store=store)
+    assert "Write conflict" in out[9]
+    assert "not active" in out[10]
+    t1, t2, t3 = sorted(store.transactions)
+    assert store.transactions[t3].status == TransactionStatus.ABORTED
+    try:
+        store.abort_transaction(t2)  # would unlink t2's committed version of A
+        assert False, "aborting a committed transaction must be refused"
+    except Exception as e:
+        assert "already committed" in str(e)
+
+    reader = store.begin_transaction()
+    assert {r.id: r.value for r in store.read(reader, "apple banana", 5)} == {"A": "apple two", "B": "banana"}
+    assert sorted(store.transactions[reader].snapshot_data) == ["A", "B"]
+    print("test_commit_after_conflict_abort passed.\n\n")
+
+
+def test_bulk_load():
+    """
+    Test: Bulk load
+    - Loads three records from a file in one transaction, then loads a file that clashes with an existing key.
+    - Expected: The first load is visible after commit; the clashing load inserts nothing and aborts.
+    """
+
+    print("Starting test_bulk_load...")
+    store = Store(embed_batch_size=2)
+    with tempfile.TemporaryDirectory() as tmp:
+        good, bad = os.path.join(tmp, "good.txt"), os.path.join(tmp, "bad.txt")
+        with open(good, "w") as f:
+            f.write("A apple pie\nB banana bread\nC cherry tart\n")
+        with open(bad, "w") as f:
+            f.write("D date loaf\nA apple crumble\n")
+        script = f"""
+            begin txn1
+            load txn1 {good}
+            commit txn1
+            begin txn2
+            load txn2 {bad}
+            begin txn3
+            query txn3 apple
+            commit txn3
+        """
+        out = run_script(script, store=store)
+    assert out[1] == "loaded 3"
+    assert "already exists" in out[4]
+    assert "apple pie" in out[-2] and "D" not in out[-2]
+    print("test_bulk_load passed.\n\n")
+
 
 def test_write_write_conflict_threaded():
     """
@@ -246,5 +320,7 @@ if __name__ == "__main__":
     test_version_chain_traversal()
     test_abort_handling()
     test_insert_conflict()
+    test_commit_after_conflict_abort()
+    test_bulk_load()
     test_write_write_conflict_threaded()
     print("All tests passed!")
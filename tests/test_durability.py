@@ -0,0 +1,150 @@
+import os
+import tempfile
+import threading
+
+from mvcc.durability import Checkpointer, WriteAheadLog, recover
+from mvcc.record import Record
+from mvcc.store import Store
+from vector_search import utils, vector_store
+
+
+class _NoModel:
+    name = "no-model"
+
+    def encode(self, texts, batch_size=32):
+        raise AssertionError("recovery must not embed anything")
+
+
+def test_recover_from_checkpoint_and_log_without_model():
+    """
+    Test: Checkpoint + WAL tail restart
+    - A and B are committed and checkpointed; then A is updated, B deleted and C inserted
+      (logged only), and a torn frame is left at the end of the log.
+    - Expected: recover() rebuilds exactly the committed state, including the vectors, while
+      the encoder is disabled, and commits after the restart are appended to the repaired log.
+    """
+
+    print("Starting test_recover_from_checkpoint_and_log_without_model...")
+    with tempfile.TemporaryDirectory() as directory:
+        vector_store.reset_store()
+        store = Store(wal=WriteAheadLog(directory))
+        txn = store.begin_transaction()
+        store.insert(txn, Record("A", "apple pie"))
+        store.insert(txn, Record("B", "banana bread"))
+        store.commit_transaction(txn)
+        Checkpointer(store, directory).run_once()
+
+        txn = store.begin_transaction()
+        store.update(txn, Record("A", "apple crumble"))
+        store.delete(txn, "B")
+        store.commit_transaction(txn)
+        txn = store.begin_transaction()
+        store.insert(txn, Record("C", "cherry tart"))
+        store.commit_transaction(txn)
+        expected = {key: vector_store.get_vector(store.records[key].key) for key in ("A", "C")}
+        store.wal.close()
+        segment = sorted(n for n in os.listdir(directory) if n.startswith("wal-"))[-1]
+        with open(os.path.join(directory, segment), "ab") as f:
+            f.write(b"\x40\x00\x00\x00torn")
+
+        encoder = utils.get_encoder()
+        utils.set_encoder(_NoModel())
+        try:
+            restored = recover(directory, wal=WriteAheadLog(directory))
+        finally:
+            utils.set_encoder(encoder)
+
+        reader = restored.begin_transaction()
+        assert {r.id: r.value for r in restored.read(reader, "apple", 5)} == {"A": "apple crumble", "C": "cherry tart"}
+        for key, vector in expected.items():
+            assert (vector_store.get_vector(restored.records[key].key) == vector).all()
+
+        txn = restored.begin_transaction()
+        restored.insert(txn, Record("D", "date loaf"))
+        restored.commit_transaction(txn)
+        restored.wal.close()
+        again = recover(directory)
+        assert sorted(r.id for r in again.read(again.begin_transaction(), "loaf", 5)) == ["A", "C", "D"]
+    print("test_recover_from_checkpoint_and_log_without_model passed.\n\n")
+
+
+def test_group_commit_shares_syncs():
+    """
+    Test: Group commit
+    - Eight threads commit 20 transactions each against a log with a small group window.
+    - Expected: Every commit is logged, but far fewer syncs than commits are issued.
+    """
+
+    print("Starting test_group_commit_shares_syncs...")
+    with tempfile.TemporaryDirectory() as directory:
+        vector_store.reset_store()
+        wal = WriteAheadLog(directory, sync="flush", group_window=0.002)
+        store = Store(wal=wal)
+
+        def client(n):
+            for i in range(20):
+                txn = store.begin_transaction()
+                store.insert(txn, Record(f"K{n}-{i}", f"value {i}"))
+                store.commit_transaction(txn)
+
+        threads = [threading.Thread(target=client, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wal.close()
+        assert wal.stats["commits"] == 160
+        assert wal.stats["syncs"] < 160
+        assert store.visible_seq == store.commit_seq == 160
+    print("test_group_commit_shares_syncs passed.\n\n")
+
+
+def test_failed_sync_is_not_replayed():
+    """
+    Test: Log sync failure
+    - A is committed, then fsync fails while B commits, then C is committed once syncing
+      works again.
+    - Expected: B's commit raises and is aborted, and recover() restores A and C but not B.
+    """
+
+    print("Starting test_failed_sync_is_not_replayed...")
+    with tempfile.TemporaryDirectory() as directory:
+        vector_store.reset_store()
+        store = Store(wal=WriteAheadLog(directory))
+        txn = store.begin_transaction()
+        store.insert(txn, Record("A", "apple pie"))
+        store.commit_transaction(txn)
+
+        def failing_fsync(fd):
+            raise OSError("injected fsync failure")
+
+        txn = store.begin_transaction()
+        store.insert(txn, Record("B", "banana bread"))
+        fsync = os.fsync
+        os.fsync = failing_fsync
+        try:
+            store.commit_transaction(txn)
+            raise AssertionError("commit must fail when the log cannot be synced")
+        except OSError:
+            pass
+        finally:
+            os.fsync = fsync
+        assert "B" not in store.records
+
+        txn = store.begin_transaction()
+        store.insert(txn, Record("C", "cherry tart"))
+        store.commit_transaction(txn)
+        store.wal.close()
+
+        restored = recover(directory)
+        assert sorted(restored.records) == ["A", "C"]
+        reader = restored.begin_transaction()
+        assert sorted(r.id for r in restored.read(reader, "bread", 5)) == ["A", "C"]
+    print("test_failed_sync_is_not_replayed passed.\n\n")
+
+
+if __name__ == "__main__":
+    test_recover_from_checkpoint_and_log_without_model()
+    test_group_commit_shares_syncs()
+    test_failed_sync_is_not_replayed()
+    print("All durability tests passed!")
@@ -0,0 +1,47 @@
+from vector_search.embedding_cache import EmbeddingCache
+import tempfile
+
+
+def test_lru_eviction_and_counters():
+    """
+    Test: LRU eviction
+    - Fills a two-entry cache, touches the oldest entry, then adds a third.
+    - Expected: The least recently used entry is evicted and counters add up.
+    """
+
+    print("Starting test_lru_eviction_and_counters...")
+    cache = EmbeddingCache(max_entries=2)
+    cache.put("m", "a", [1.0, 0.0])
+    cache.put("m", "b", [0.0, 1.0])
+    assert cache.get("m", "a") is not None
+    cache.put("m", "c", [1.0, 1.0])
+
+    assert cache.get("m", "b") is None
+    assert cache.get("other-model", "a") is None
+    stats = cache.stats()
+    assert stats["entries"] == 2 and stats["evictions"] == 1
+    assert stats["hits"] == 1 and stats["misses"] == 2
+    print("test_lru_eviction_and_counters passed.\n\n")
+
+
+def test_disk_tier_survives_restart():
+    """
+    Test: On-disk tier
+    - Writes an embedding through one cache, then reads it through a fresh cache on the same directory.
+    - Expected: The second cache serves it from disk without a miss.
+    """
+
+    print("Starting test_disk_tier_survives_restart...")
+    with tempfile.TemporaryDirectory() as disk_dir:
+        EmbeddingCache(disk_dir=disk_dir).put("m", "hello", [0.5, 0.25])
+        cache = EmbeddingCache(disk_dir=disk_dir)
+        vector = cache.get("m", "hello")
+        assert list(vector) == [0.5, 0.25]
+        assert cache.stats()["disk_hits"] == 1 and cache.stats()["misses"] == 0
+    print("test_disk_tier_survives_restart passed.\n\n")
+
+
+if __name__ == "__main__":
+    test_lru_eviction_and_counters()
+    test_disk_tier_survives_restart()
+    print("All embedding cache tests passed!")
@@ -0,0 +1,112 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from mvcc.record import Record
+from mvcc.store import Store
+from vector_search import utils
+from vector_search.encoder_pool import PooledEncoder
+from vector_search.encoders import HashingEncoder, SentenceTransformerEncoder, encoder_from_name
+import numpy as np
+import sys
+
+
+def test_hashing_encoder_is_deterministic_and_lexical():
+    """
+    Test: Hashing encoder
+    - Encodes the same text twice and compares a related and an unrelated text.
+    - Expected: Identical vectors for identical text; shared words score higher than unrelated ones.
+    """
+
+    print("Starting test_hashing_encoder_is_deterministic_and_lexical...")
+    encoder = HashingEncoder(dim=256)
+    a, b, related, unrelated = encoder.encode(["cute dog", "cute dog", "a cute dogs", "stock market"])
+    assert a.shape == (256,) and np.array_equal(a, b)
+
+    def cosine(x, y):
+        return float(x @ y / (np.linalg.norm(x) * np.linalg.norm(y)))
+
+    assert cosine(a, related) > cosine(a, unrelated)
+    print("test_hashing_encoder_is_deterministic_and_lexical passed.\n\n")
+
+
+def test_model_encoder_loads_lazily():
+    """
+    Test: Lazy model loading
+    - Builds the default encoder from its config name without encoding anything.
+    - Expected: No model is loaded and sentence_transformers is not imported.
+    """
+
+    print("Starting test_model_encoder_loads_lazily...")
+    already_imported = "sentence_transformers" in sys.modules
+    encoder = encoder_from_name("instructor")
+    assert isinstance(encoder, SentenceTransformerEncoder) and not encoder.loaded
+    assert already_imported or "sentence_transformers" not in sys.modules
+    assert encoder_from_name("hashing-64").encode(["x"]).shape == (1, 64)
+    print("test_model_encoder_loads_lazily passed.\n\n")
+
+
+def test_pooled_encoder_batches_concurrent_requests():
+    """
+    Test: Encoder process pool
+    - Sixteen threads encode single texts at once through one worker process, then a Store
+      inserts and reads with the pooled encoder as the active encoder.
+    - Expected: Vectors match the in-process encoder, concurrent requests share batches,
+      and the Store works unchanged on top of it.
+    """
+
+    print("Starting test_pooled_encoder_batches_concurrent_requests...")
+    reference = encoder_from_name("hashing")
+    pooled = PooledEncoder("hashing", processes=1, max_batch=8, max_wait_ms=50)
+    previous = utils.get_encoder()
+    try:
+        pooled.warm_up()
+        texts = [f"text number {i}" for i in range(64)]
+        with ThreadPoolExecutor(16) as threads:
+            vectors = list(threads.map(lambda t: pooled.encode([t])[0], texts))
+        assert np.allclose(np.stack(vectors), reference.encode(texts))
+        stats = pooled.stats()
+        assert stats["requests"] == 64 and stats["queue_depth"] == 0
+        assert stats["batches"] < 64 and stats["max_batch"] > 1 and stats["max_batch"] <= 8
+        assert np.allclose(pooled.encode(texts[:40]), reference.encode(texts[:40]))
+
+        utils.set_encoder(pooled)
+        store = Store()
+        txn = store.begin_transaction()
+        store.insert(txn, Record("A", "pooled apples"))
+        store.insert(txn, Record("B", "quarterly earnings"))
+        store.commit_transaction(txn)
+        txn = store.begin_transaction()
+        assert store.read(txn, "apples pooled", 1)[0].id == "A"
+        store.commit_transaction(txn)
+    finally:
+        utils.set_encoder(previous)
+        pooled.close()
+    print("test_pooled_encoder_batches_concurrent_requests passed.\n\n")
+
+
+def test_pooled_encoder_close_drains_queue():
+    """
+    Test: Closing the encoder pool with requests still queued
+    - Queues three texts on a pool whose batches wait long to fill, then closes it.
+    - Expected: close() encodes the queued texts before stopping, and later requests are refused.
+    """
+
+    print("Starting test_pooled_encoder_close_drains_queue...")
+    pooled = PooledEncoder("hashing", processes=0, max_batch=64, max_wait_ms=5000)
+    futures = pooled.submit(["one", "two", "three"])
+    pooled.close()
+    reference = encoder_from_name("hashing").encode(["one", "two", "three"])
+    assert np.allclose(np.stack([f.result(timeout=5) for f in futures]), reference)
+    try:
+        pooled.submit(["four"])
+        assert False, "closed pool accepted a request"
+    except RuntimeError:
+        pass
+    print("test_pooled_encoder_close_drains_queue passed.\n\n")
+
+
+if __name__ == "__main__":
+    test_hashing_encoder_is_deterministic_and_lexical()
+    test_model_encoder_loads_lazily()
+    test_pooled_encoder_batches_concurrent_requests()
+    test_pooled_encoder_close_drains_queue()
+    print("All encoder tests passed!")
@@ -0,0 +1,129 @@
+from vector_search.vector_store import RowMask, VectorMatrix
+from vector_search.hnsw import HNSWIndex
+import numpy as np
+import threading
+import time
+
+
+def _exact(store, query, k, allowed=None):
+    matrix, _, live = store.view()
+    distances = 1.0 - matrix @ store.normalize(query)
+    mask = live if allowed is None else live & allowed
+    distances[~mask] = np.inf
+    return set(np.argsort(distances)[:k].tolist())
+
+
+def test_hnsw_recall_and_filtering():
+    """
+    Test: HNSW recall with and without a visibility filter
+    - Indexes 500 random vectors and compares top-10 results against brute force.
+    - Expected: High recall, and filtered results only contain allowed rows.
+    """
+
+    print("Starting test_hnsw_recall_and_filtering...")
+    rng = np.random.default_rng(0)
+    store = VectorMatrix()
+    store.attach_index(HNSWIndex(M=8, ef_construction=64, ef_search=64))
+    for i, vec in enumerate(rng.normal(size=(500, 16))):
+        store.add(f"k{i}", vec)
+
+    allowed = np.zeros(store.size, dtype=bool)
+    allowed[::2] = True
+    hits = total = 0
+    for query in rng.normal(size=(20, 16)):
+        rows, _ = store.index.search(store.normalize(query), 10)
+        hits += len(set(rows.tolist()) & _exact(store, query, 10))
+        total += 10
+        filtered, _ = store.index.search(store.normalize(query), 10, allowed)
+        assert allowed[filtered].all()
+    assert hits / total >= 0.9
+    print("test_hnsw_recall_and_filtering passed.\n\n")
+
+
+def test_hnsw_remove_keeps_graph_searchable():
+    """
+    Test: Removing indexed vectors
+    - Removes half of the vectors, then re-adds new vectors into the freed rows.
+    - Expected: Removed rows never come back from search and the graph stays connected.
+    """
+
+    print("Starting test_hnsw_remove_keeps_graph_searchable...")
+    rng = np.random.default_rng(1)
+    store = VectorMatrix()
+    store.attach_index(HNSWIndex(M=8, ef_construction=64))
+    for i, vec in enumerate(rng.normal(size=(200, 8))):
+        store.add(f"k{i}", vec)
+    removed = {store.remove(f"k{i}") for i in range(0, 200, 2)}
+    rows, _ = store.index.search(store.normalize(rng.normal(size=8)), 50)
+    assert not removed & set(rows.tolist()) and len(rows) == 50
+
+    for i, vec in enumerate(rng.normal(size=(100, 8))):
+        store.add(f"n{i}", vec)
+    rows, _ = store.index.search(store.normalize(rng.normal(size=8)), 200)
+    assert len(store.index) == 200 and len(rows) == 200
+    print("test_hnsw_remove_keeps_graph_searchable passed.\n\n")
+
+
+class _SlowDecisionIndex(HNSWIndex):
+    # widens the window between building the candidate mask and walking the graph
+    def prefers_exact(self, n_allowed, n_total):
+        time.sleep(0.0005)
+        return super().prefers_exact(n_allowed, n_total)
+
+
+def test_index_search_during_writes_and_compaction():
+    """
+    Test: Index searches racing writers and compaction
+    - One thread adds and removes vectors and compacts the matrix while another searches
+      through the graph (exact fallback disabled) with a RowMask over a fixed set of keys.
+    - Expected: No search fails, and every result is one of the masked-in keys.
+    """
+
+    print("Starting test_index_search_during_writes_and_compaction...")
+    rng = np.random.default_rng(1)
+    store = VectorMatrix()
+    store.attach_index(_SlowDecisionIndex(M=8, ef_construction=32, ef_search=32, exact_threshold=0))
+    # writer rows interleaved with the stable ones, so compaction moves the stable rows
+    stable = []
+    for i, vec in enumerate(rng.normal(size=(400, 16))):
+        key = f"s{i}" if i % 2 else f"w{i}"
+        store.add(key, vec)
+        if i % 2:
+            stable.append(key)
+    mask = RowMask(store, stable)
+    stop = threading.Event()
+    errors = []
+
+    def writer():
+        local = np.random.default_rng(2)
+        n = 0
+        try:
+            while not stop.is_set():
+                # free rows below stable ones, close the holes, then grow past the mask's size
+                for key in [key for key in list(store.keys()) if key.startswith("w")][:20]:
+                    store.remove(key)
+                store.compact()
+                for vec in local.normal(size=(20, 16)):
+                    store.add(f"w-{n}", vec)
+                    n += 1
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        for query in rng.normal(size=(200, 16)):
+            found = store.search(query, 5, mask)
+            assert set(found) <= set(stable), found
+    finally:
+        stop.set()
+        thread.join()
+    assert not errors
+    print("test_index_search_during_writes_and_compaction passed.\n\n")
+
+
+if __name__ == "__main__":
+    test_hnsw_recall_and_filtering()
+    test_hnsw_remove_keeps_graph_searchable()
+    test_index_search_during_writes_and_compaction()
+    print("All HNSW tests passed!")
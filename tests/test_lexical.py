@@ -0,0 +1,128 @@
+from CLI.cli_core import run_script
+from mvcc.lexical import reciprocal_rank_fusion
+from mvcc.record import Record
+from mvcc.store import Store
+from mvcc.vacuum import Vacuum
+
+
+def _catalog():
+    store = Store()
+    txn = store.begin_transaction()
+    store.insert_many(txn, [
+        Record("P1", "router zx900 dual band"),
+        Record("P2", "router ax1800 mesh"),
+        Record("P3", "wireless mesh network kit"),
+        Record("P4", "zx900 replacement antenna"),
+    ])
+    store.commit_transaction(txn)
+    return store
+
+
+def test_hybrid_read_is_snapshot_aware():
+    """
+    Test: BM25 + vector hybrid reads under MVCC
+    - An older snapshot, a writer that renames a product and deletes another, and a
+      transaction that aborts its insert all run lexical-prefiltered and fused reads.
+    - Expected: Each read only ranks versions its snapshot sees, the prefilter only returns
+      versions containing a query term, and aborted and vacuumed versions leave no postings.
+    """
+
+    print("Starting test_hybrid_read_is_snapshot_aware...")
+    store = _catalog()
+    reader = store.begin_transaction()
+    writer = store.begin_transaction()
+    store.update(writer, Record("P2", "router zx900 pro"))
+    store.delete(writer, "P4")
+    aborted = store.begin_transaction()
+    store.insert(aborted, Record("P5", "zx900 case"))
+    store.abort_transaction(aborted)
+
+    def ids(txn, query, k, mode):
+        return sorted(r.id for r in store.read(txn, query, k, hybrid=mode))
+
+    assert ids(reader, "zx900", 4, "prefilter") == ["P1", "P4"]
+    assert ids(writer, "zx900", 4, "prefilter") == ["P1", "P2"]
+    assert "P1" in ids(reader, "zx900 router", 2, True)
+    assert set(ids(writer, "zx900", 4, "rrf")) >= {"P1", "P2"}
+    assert "P4" not in ids(writer, "zx900", 4, "rrf")
+    assert not any(key.startswith("P5") for key in store.lexical.candidates("zx900"))
+
+    store.commit_transaction(writer)
+    store.commit_transaction(reader)
+    Vacuum(store, pause=0).run_once()
+    assert store.lexical.candidates("zx900") == {"P1_1", "P2_3"}
+    assert len(store.lexical) == 3
+    print("test_hybrid_read_is_snapshot_aware passed.\n\n")
+
+
+def test_bm25_statistics_follow_the_snapshot():
+    """
+    Test: Snapshot-local BM25 statistics
+    - A reader ranks "alpha beta" over two equally long versions, one per term; then an
+      uncommitted writer adds many versions containing "alpha" and another aborts some.
+    - Expected: The reader's lexical and fused rankings do not change, while the writer,
+      which sees its own versions, ranks with the rarer term "beta" first.
+    """
+
+    print("Starting test_bm25_statistics_follow_the_snapshot...")
+    store = Store()
+    txn = store.begin_transaction()
+    store.insert(txn, Record("X", "alpha filler"))
+    store.insert(txn, Record("Y", "beta filler"))
+    store.commit_transaction(txn)
+    reader = store.begin_transaction()
+
+    def lexical(txn_id):
+        keys = store.lexical.candidates("alpha beta")
+        visible = {r.key for r in store.transactions[txn_id].visible_records()} & keys
+        return store.lexical.rank("alpha beta", visible, 2, store._lexical_collection(store.transactions[txn_id]))
+
+    def fused(txn_id):
+        store.result_cache.clear()
+        return [r.id for r in store.read(txn_id, "alpha beta", 2, hybrid="rrf")]
+
+    store.read(reader, "alpha", 1)
+    before = lexical(reader), fused(reader)
+    writer = store.begin_transaction()
+    for i in range(10):
+        store.insert(writer, Record(f"W{i}", f"alpha words {i}"))
+    aborted = store.begin_transaction()
+    store.insert(aborted, Record("Z", "beta beta beta"))
+    store.abort_transaction(aborted)
+    assert (lexical(reader), fused(reader)) == before
+    store.read(writer, "alpha", 1)
+    assert lexical(writer)[0] == "Y_1"
+    print("test_bm25_statistics_follow_the_snapshot passed.\n\n")
+
+
+def test_rrf_and_cli_flag():
+    """
+    Test: Reciprocal-rank fusion and the CLI --hybrid flag
+    - Fuses two rankings, and queries a product name with --hybrid=prefilter in the CLI.
+    - Expected: Keys ranked high in both lists come first, and the CLI returns only
+      records containing the product name.
+    """
+
+    print("Starting test_rrf_and_cli_flag...")
+    assert reciprocal_rank_fusion([["a", "b", "c"], ["b", "c", "a"]])[:2] == ["b", "a"]
+    out = run_script("""
+        begin t1
+        insert t1 P1 router zx900 dual band
+        insert t1 P2 router ax1800 mesh
+        insert t1 P3 wireless mesh network kit
+        commit t1
+        begin t2
+        query t2 --hybrid=prefilter zx900
+        query t2 --hybrid mesh kit
+        commit t2
+    """, store=Store())
+    assert out[6] == repr({"P1": "router zx900 dual band"})
+    assert "P3" in out[7]
+    print("test_rrf_and_cli_flag passed.\n\n")
+
+
+if __name__ == "__main__":
+    test_hybrid_read_is_snapshot_aware()
+    test_bm25_statistics_follow_the_snapshot()
+    test_rrf_and_cli_flag()
+    print("All lexical tests passed!")
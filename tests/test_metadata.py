@@ -0,0 +1,159 @@
+import tempfile
+import threading
+import time
+
+from CLI.cli_core import run_script
+from mvcc.durability import Checkpointer, WriteAheadLog, recover
+from mvcc.metadata import MetadataIndexes
+from mvcc.record import Record
+from mvcc.store import Store
+from mvcc.vacuum import Vacuum
+from vector_search import vector_store
+
+
+def _catalog():
+    store = Store()
+    txn = store.begin_transaction()
+    store.insert_many(txn, [
+        Record("A", "apple pie", {"tenant": "acme", "year": 2021}),
+        Record("B", "apple tart", {"tenant": "acme", "year": 2023}),
+        Record("C", "apple cake", {"tenant": "globex", "year": 2024}),
+        Record("D", "banana bread", {"tenant": "acme", "year": 2024}),
+    ])
+    store.commit_transaction(txn)
+    return store
+
+
+def test_filtered_read_respects_snapshots():
+    """
+    Test: Pre-filtered search over metadata
+    - Indexes tenant (hash) and year (sorted), then moves B to another tenant in an
+      uncommitted update while an older snapshot and the writer both query.
+    - Expected: Only matching versions are ranked, each transaction filters on the metadata
+      of the versions it sees, and indexed and scanned filters agree.
+    """
+
+    print("Starting test_filtered_read_respects_snapshots...")
+    store = _catalog()
+    store.create_index("tenant")
+    store.create_index("year", "sorted")
+    reader = store.begin_transaction()
+    writer = store.begin_transaction()
+    store.update(writer, Record("B", "apple tart", {"tenant": "globex", "year": 2023}))
+    store.update(writer, Record("D", "banana loaf"))
+
+    def ids(txn, where, k=4):
+        return sorted(r.id for r in store.read(txn, "apple", k, where=where))
+
+    assert ids(reader, {"tenant": "acme"}) == ["A", "B", "D"]
+    assert ids(writer, {"tenant": "acme"}) == ["A", "D"]
+    assert ids(reader, {"tenant": "acme", "year": (">=", 2022)}) == ["B", "D"]
+    assert ids(writer, {"year": ("<", 2024), "tenant": ("in", ["globex"])}) == ["B"]
+    # unindexed conditions and predicates go through a scan of the snapshot
+    assert ids(writer, {"tenant": ("!=", "acme")}) == ["B", "C"]
+    assert ids(reader, lambda r: r.metadata["year"] == 2024) == ["C", "D"]
+    # filtering happens before ranking, so k results come back whenever k versions match
+    assert [r.id for r in store.read(reader, "apple", 1, where={"tenant": "acme", "year": 2024})] == ["D"]
+    # an update without metadata keeps the previous version's
+    assert store.records["D"].metadata == {"tenant": "acme", "year": 2024}
+
+    store.commit_transaction(writer)
+    store.commit_transaction(reader)
+    Vacuum(store, pause=0).run_once()
+    assert store.metadata_indexes.by_field["tenant"].lookup("==", "acme") == {"A_1", "D_3"}
+    print("test_filtered_read_respects_snapshots passed.\n\n")
+
+
+def test_metadata_survives_recovery_and_cli():
+    """
+    Test: Metadata through the log, checkpoints and the CLI
+    - Sets metadata with @field=value in the CLI, checkpoints, updates it, and recovers.
+    - Expected: The recovered store filters on the latest metadata, and CLI queries accept
+      @field<op>value filters.
+    """
+
+    print("Starting test_metadata_survives_recovery_and_cli...")
+    with tempfile.TemporaryDirectory() as directory:
+        vector_store.reset_store()
+        store = Store(wal=WriteAheadLog(directory))
+        out = run_script("""
+            index year sorted
+            begin t1
+            insert t1 A @tenant=acme @year=2021 apple pie
+            insert t1 B @tenant=acme @year=2023 apple tart
+            commit t1
+            begin t2
+            query t2 @year>2022 apple
+            commit t2
+        """, store=store)
+        assert out[6] == repr({"B": "apple tart"})
+        Checkpointer(store, directory).run_once()
+        run_script("""
+            begin t3
+            update t3 B @tenant=globex @year=2023 apple tart
+            commit t3
+        """, store=store)
+        store.wal.close()
+
+        restored = recover(directory)
+        restored.create_index("tenant")
+        txn = restored.begin_transaction()
+        assert [r.id for r in restored.read(txn, "apple", 2, where={"tenant": "globex"})] == ["B"]
+        assert restored.records["A"].metadata == {"tenant": "acme", "year": 2021}
+    print("test_metadata_survives_recovery_and_cli passed.\n\n")
+
+
+def test_sorted_index_with_mismatched_value_type():
+    """
+    Test: Sorted-index lookups on a value of another type
+    - Indexes year (sorted, integers) and filters on it with string bounds.
+    - Expected: No error; those conditions match nothing, exactly like the unindexed scan,
+      and an "in" list still matches its values of the right type.
+    """
+
+    print("Starting test_sorted_index_with_mismatched_value_type...")
+    store = _catalog()
+    scanned = store.begin_transaction()
+    wheres = [{"year": "2024"}, {"year": (">=", "2022")}, {"year": ("in", ["2021", 2023])}]
+    expected = [sorted(r.id for r in store.read(scanned, "apple", 4, where=where)) for where in wheres]
+    assert expected == [[], [], ["B"]]
+
+    store.create_index("year", "sorted")
+    store.result_cache.clear()  # same committed state: make the reads hit the index, not the cache
+    reader = store.begin_transaction()
+    assert [sorted(r.id for r in store.read(reader, "apple", 4, where=where)) for where in wheres] == expected
+    print("test_sorted_index_with_mismatched_value_type passed.\n\n")
+
+
+def test_version_written_during_index_creation():
+    """
+    Test: A write racing create_index
+    - While an index walks the existing versions, another thread indexes a freshly linked
+      version that the walk has already missed.
+    - Expected: The write waits for the index to be published and then lands in it.
+    """
+
+    print("Starting test_version_written_during_index_creation...")
+    indexes = MetadataIndexes()
+    record = Record("A", "apple pie", {"tenant": "acme"})
+    record.key = "A_1"
+    writer = threading.Thread(target=indexes.add, args=(record,))
+
+    def versions():
+        # the walk's view of the records is taken; now the writer links and indexes A
+        writer.start()
+        time.sleep(0.05)
+        yield from ()
+
+    indexes.create("tenant", "hash", versions())
+    writer.join()
+    assert indexes.lookup([("tenant", "==", "acme")])[0] == {"A_1"}
+    print("test_version_written_during_index_creation passed.\n\n")
+
+
+if __name__ == "__main__":
+    test_filtered_read_respects_snapshots()
+    test_metadata_survives_recovery_and_cli()
+    test_sorted_index_with_mismatched_value_type()
+    test_version_written_during_index_creation()
+    print("All metadata tests passed!")
@@ -0,0 +1,96 @@
+import ast
+
+from CLI.cli_core import run_script
+from mvcc.record import Record
+from mvcc.store import Store
+from vector_search import metrics
+from vector_search.vector_store import reset_store
+
+
+def test_store_operations_are_measured_and_exported():
+    """
+    Test: Metrics through the stats command and the Prometheus dump
+    - Runs a CLI script with commits, a write conflict, an abort and reads, then asks for
+      stats and the Prometheus text.
+    - Expected: Counters and per-operation latencies reflect the script, gauges describe
+      the store, and the dump has counters, cumulative histogram buckets and gauges.
+    """
+
+    print("Starting test_store_operations_are_measured_and_exported...")
+    reset_store()
+    metrics.registry.reset()
+    store = Store()
+    out = run_script("""
+        begin t1
+        insert t1 A apples
+        insert t1 B bananas
+        commit t1
+        begin t2
+        begin t3
+        update t2 A green apples
+        commit t2
+        update t3 A red apples
+        begin t4
+        query t4 apples
+        stats
+        stats prometheus
+    """, store=store)
+
+    report = ast.literal_eval(out[11])
+    assert report["counters"]["store.commits"] == 2
+    assert report["counters"]["store.conflicts"] == 1 and report["counters"]["store.aborts"] == 1
+    for op in ("encode", "store.read", "store.commit", "store.snapshot", "search.score", "search.filter"):
+        assert report["latency"][op]["count"] >= 1
+    assert report["gauges"]["store.versions"] == 3 and report["gauges"]["store.active_transactions"] == 1
+    assert report["gauges"]["vectors.live"] == 3
+
+    text = out[12]
+    assert "vector_db_store_commits_total 2" in text
+    assert '# TYPE vector_db_latency_seconds histogram' in text
+    buckets = [int(line.rsplit(" ", 1)[1]) for line in text.splitlines()
+               if line.startswith('vector_db_latency_seconds_bucket{op="store.commit"')]
+    assert buckets == sorted(buckets) and buckets[-1] == 2
+    assert "vector_db_store_active_transactions 1" in text
+    print("test_store_operations_are_measured_and_exported passed.\n\n")
+
+
+def test_tracing_and_disabled_registry():
+    """
+    Test: Span tracing and the disabled fast path
+    - Traces one read, then disables the registry and reads again.
+    - Expected: Spans nest under store.read on the calling thread, and nothing is recorded
+      while disabled.
+    """
+
+    print("Starting test_tracing_and_disabled_registry...")
+    store = Store()
+    txn = store.begin_transaction()
+    store.insert(txn, Record("A", "traced apples"))
+    store.commit_transaction(txn)
+
+    metrics.registry.reset()
+    metrics.set_tracing(True)
+    try:
+        store.read(store.begin_transaction(), "traced", 1)
+    finally:
+        metrics.set_tracing(False)
+    spans = {span["name"]: span for span in metrics.traces()}
+    assert spans["store.read"]["parent"] is None
+    assert spans["search.score"]["parent"] == "store.read"
+    assert spans["store.resolve"]["duration_ms"] <= spans["store.read"]["duration_ms"]
+
+    metrics.registry.reset()
+    metrics.registry.enabled = False
+    try:
+        store.read(store.begin_transaction(), "traced again", 1)
+        metrics.inc("store.commits")
+    finally:
+        metrics.registry.enabled = True
+    assert metrics.stats() == {"counters": {}, "latency": {}}
+    print("test_tracing_and_disabled_registry passed.\n\n")
+
+
+if __name__ == "__main__":
+    test_store_operations_are_measured_and_exported()
+    test_tracing_and_disabled_registry()
+    print("All metrics tests passed!")
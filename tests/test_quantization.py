@@ -0,0 +1,47 @@
+from vector_search.quantization import ProductQuantizer, ScalarQuantizer
+from vector_search.vector_store import VectorMatrix
+import numpy as np
+
+
+def test_quantized_search_reranks_exactly():
+    """
+    Test: int8 and PQ candidate search with exact re-ranking
+    - Indexes 1000 random vectors with each quantizer, searches with and without a row
+      filter, then removes rows and compacts the matrix.
+    - Expected: High recall against brute force, exact distances, filtered results only
+      contain allowed rows, and removed rows never come back after the remap.
+    """
+
+    print("Starting test_quantized_search_reranks_exactly...")
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(1000, 32))
+    queries = rng.normal(size=(20, 32))
+    for index, min_recall in ((ScalarQuantizer(rerank=4), 0.95), (ProductQuantizer(m=8, rerank=20), 0.8)):
+        store = VectorMatrix()
+        for i, vec in enumerate(vectors):
+            store.add(f"k{i}", vec)
+        store.attach_index(index)
+        assert index.trained and len(index) == 1000
+
+        hits = 0
+        allowed = np.zeros(store.size, dtype=bool)
+        allowed[::3] = True
+        for query in queries:
+            rows, distances = index.search(store.normalize(query), 10)
+            hits += len(set(rows.tolist()) & set(store.exact_search(query, 10).tolist()))
+            assert np.allclose(distances, 1.0 - store.view()[0][rows] @ store.normalize(query), atol=1e-5)
+            filtered, _ = index.search(store.normalize(query), 10, allowed)
+            assert allowed[filtered].all()
+        assert hits / (10 * len(queries)) >= min_recall
+
+        for i in range(0, 1000, 2):
+            store.remove(f"k{i}")
+        store.compact()
+        keys = store.search(queries[0], 10)
+        assert len(keys) == 10 and all(int(key[1:]) % 2 == 1 for key in keys)
+    print("test_quantized_search_reranks_exactly passed.\n\n")
+
+
+if __name__ == "__main__":
+    test_quantized_search_reranks_exactly()
+    print("All quantization tests passed!")
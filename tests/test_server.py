@@ -0,0 +1,68 @@
+import asyncio
+
+from CLI.server import CommandServer
+from mvcc.store import Store
+from mvcc.transaction import TransactionStatus
+
+
+async def _send(reader, writer, *lines):
+    writer.write("".join(line + "\n" for line in lines).encode())
+    await writer.drain()
+    return [(await reader.readline()).decode().strip() for _ in lines]
+
+
+def test_server_sessions_pipelining_and_limits():
+    """
+    Test: Network front-end
+    - Two clients pipeline commands with clashing transaction names, a third connection goes
+      over the limit, and one client disconnects with a transaction still open.
+    - Expected: Responses come back in order per session, sessions are isolated, errors are
+      reported as lines, the extra connection is refused, and the abandoned transaction is
+      aborted.
+    """
+
+    print("Starting test_server_sessions_pipelining_and_limits...")
+    store = Store()
+
+    async def scenario():
+        server = CommandServer(store, port=0, workers=4, max_connections=2, max_pipeline=2)
+        await server.start()
+        try:
+            a = await asyncio.open_connection("127.0.0.1", server.port)
+            b = await asyncio.open_connection("127.0.0.1", server.port)
+            out = await _send(*a, "begin t", "insert t A apple pie", "commit t", "begin t", "query t apple")
+            assert out[0].startswith("began t") and out[1] == "ok" and out[2].startswith("committed t")
+            assert out[4] == repr({"A": "apple pie"})
+            open_txn = int(out[3].rsplit("T", 1)[1])
+
+            # b's "t" is a different transaction; it sees A but not a's later uncommitted insert
+            await _send(*b, "begin t")
+            out = await _send(*a, "insert t B apple tart", "query t apple")
+            assert "B" in out[1]
+            out = await _send(*b, "query t apple", "delete t missing", "frobnicate")
+            assert out[0] == repr({"A": "apple pie"})
+            assert out[1].startswith("error:") and out[2] == "Unknown command: frobnicate"
+
+            c_reader, c_writer = await asyncio.open_connection("127.0.0.1", server.port)
+            assert (await c_reader.readline()).decode().startswith("error: too many connections")
+            c_writer.close()
+
+            a[1].close()
+            for _ in range(100):
+                if store.transactions[open_txn].status == TransactionStatus.ABORTED:
+                    break
+                await asyncio.sleep(0.01)
+            assert store.transactions[open_txn].status == TransactionStatus.ABORTED
+            assert await _send(*b, "quit") == ["bye"]
+        finally:
+            await server.stop()
+        return server.stats
+
+    stats = asyncio.run(scenario())
+    assert stats["refused"] == 1 and stats["errors"] == 1
+    print("test_server_sessions_pipelining_and_limits passed.\n\n")
+
+
+if __name__ == "__main__":
+    test_server_sessions_pipelining_and_limits()
+    print("All server tests passed!")
@@ -0,0 +1,349 @@
+from mvcc.record import Record
+from mvcc.store import DeadlockError, LockWaitTimeout, Store
+from mvcc.transaction import TransactionStatus
+from vector_search import metrics, utils, vector_store
+from vector_search.encoders import HashingEncoder
+from vector_search.hnsw import HNSWIndex
+import threading
+import time
+
+
+def test_snapshot_is_shared_until_written():
+    """
+    Test: Shared snapshots with a private write overlay
+    - Two transactions begin from the same committed state; one of them writes.
+    - Expected: Both start from the same snapshot mapping; only the writer holds private
+      state, and its own update and delete are visible to it alone.
+    """
+
+    print("Starting test_snapshot_is_shared_until_written...")
+    store = Store()
+    t1 = store.begin_transaction()
+    store.insert(t1, Record("A", "alpha"))
+    store.insert(t1, Record("B", "beta"))
+    store.commit_transaction(t1)
+
+    t2, t3 = store.begin_transaction(), store.begin_transaction()
+    store.update(t2, Record("A", "alpha two"))
+    store.delete(t2, "B")
+    assert {r.value for r in store.read(t2, "alpha", 5)} == {"alpha two"}
+    assert {r.value for r in store.read(t3, "alpha", 5)} == {"alpha", "beta"}
+    assert store.transactions[t2].snapshot_data is store.transactions[t3].snapshot_data
+
+    stats = store.snapshot_stats(t2)
+    assert stats["shared_records"] == 2 and stats["own_writes"] == 2
+    assert store.snapshot_stats(t3)["own_writes"] == 0
+    print("test_snapshot_is_shared_until_written passed.\n\n")
+
+
+def test_lazy_snapshot_sees_state_at_begin():
+    """
+    Test: Lazy visibility resolution
+    - txn2 begins (without reading) before A is deleted and re-inserted by later committed transactions.
+    - Expected: begin does not materialize anything, and txn2's first read still sees the original A.
+    """
+
+    print("Starting test_lazy_snapshot_sees_state_at_begin...")
+    store = Store()
+    t1 = store.begin_transaction()
+    store.insert(t1, Record("A", "original"))
+    store.commit_transaction(t1)
+
+    t2 = store.begin_transaction()
+    assert store.transactions[t2].snapshot_data is None
+
+    t3 = store.begin_transaction()
+    store.delete(t3, "A")
+    store.commit_transaction(t3)
+    t4 = store.begin_transaction()
+    store.insert(t4, Record("A", "replacement"))
+    store.commit_transaction(t4)
+
+    assert [r.value for r in store.read(t2, "original", 1)] == ["original"]
+    t5 = store.begin_transaction()
+    assert [r.value for r in store.read(t5, "original", 1)] == ["replacement"]
+    print("test_lazy_snapshot_sees_state_at_begin passed.\n\n")
+
+
+def _committed_store(*ids):
+    store = Store()
+    txn = store.begin_transaction()
+    for record_id in ids:
+        store.insert(txn, Record(record_id, record_id.lower()))
+    store.commit_transaction(txn)
+    return store
+
+
+def test_blocked_update_wakes_on_commit_and_times_out():
+    """
+    Test: Condition-variable waits and lock-wait timeouts
+    - txn2 holds an uncommitted update of A; txn3 updates A and blocks until txn2 aborts.
+      txn4 then tries A while txn5 holds it, with a short lock-wait timeout.
+    - Expected: txn3 proceeds right after the abort; txn4 raises LockWaitTimeout. Wait metrics are recorded.
+    """
+
+    print("Starting test_blocked_update_wakes_on_commit_and_times_out...")
+    store = _committed_store("A")
+    t2, t3 = store.begin_transaction(), store.begin_transaction()
+    store.update(t2, Record("A", "from t2"))
+
+    waiter = threading.Thread(target=store.update, args=(t3, Record("A", "from t3")))
+    waiter.start()
+    time.sleep(0.05)
+    assert store.lock_wait_stats()["blocked"] == 1
+    store.abort_transaction(t2)
+    waiter.join(timeout=1)
+    assert not waiter.is_alive() and store.records["A"].value == "from t3"
+    store.commit_transaction(t3)
+
+    store.lock_wait_timeout = 0.05
+    t4, t5 = store.begin_transaction(), store.begin_transaction()
+    store.update(t5, Record("A", "from t5"))
+    try:
+        store.update(t4, Record("A", "from t4"))
+        assert False, "expected a lock wait timeout"
+    except LockWaitTimeout:
+        pass
+    stats = store.lock_wait_stats()
+    assert stats["waits"] == 2 and stats["timeouts"] == 1 and stats["blocked"] == 0
+    print("test_blocked_update_wakes_on_commit_and_times_out passed.\n\n")
+
+
+def test_deadlock_aborts_youngest_transaction():
+    """
+    Test: Wait-for-graph deadlock detection
+    - txn2 holds A and txn3 holds B; txn2 then waits on B while txn3 asks for A.
+    - Expected: txn3 (the youngest in the cycle) is aborted with DeadlockError and txn2 completes.
+      Aborting txn3 again, as the CLI does after a failed update, is a no-op.
+    """
+
+    print("Starting test_deadlock_aborts_youngest_transaction...")
+    store = _committed_store("A", "B")
+    t2, t3 = store.begin_transaction(), store.begin_transaction()
+    store.update(t2, Record("A", "a2"))
+    store.update(t3, Record("B", "b3"))
+
+    waiter = threading.Thread(target=store.update, args=(t2, Record("B", "b2")))
+    waiter.start()
+    time.sleep(0.05)
+    try:
+        store.update(t3, Record("A", "a3"))
+        assert False, "expected a deadlock"
+    except DeadlockError:
+        pass
+    waiter.join(timeout=1)
+    assert not waiter.is_alive()
+    assert store.transactions[t3].status == TransactionStatus.ABORTED
+    assert store.records["B"].value == "b2"
+    assert store.lock_wait_stats()["deadlocks"] == 1
+    aborts = metrics.registry.counters.get("store.aborts", 0)
+    store.abort_transaction(t3)
+    assert metrics.registry.counters.get("store.aborts", 0) == aborts
+    print("test_deadlock_aborts_youngest_transaction passed.\n\n")
+
+
+def test_commit_and_abort_touch_only_the_write_set():
+    """
+    Test: Write-set based commit and abort
+    - txn2 updates A twice and deletes B, then commits; txn3 inserts C and updates A, then aborts.
+    - Expected: Superseded versions of A and B are closed at txn2's timestamp, C is gone after
+      the abort, A's head is txn2's last version again, and the untouched record D is unchanged.
+    """
+
+    print("Starting test_commit_and_abort_touch_only_the_write_set...")
+    store = _committed_store("A", "B", "D")
+    t2 = store.begin_transaction()
+    store.update(t2, Record("A", "a2"))
+    store.update(t2, Record("A", "a2 again"))
+    store.delete(t2, "B")
+    assert len(store.transactions[t2].write_set) == 3
+    store.commit_transaction(t2)
+    assert store.records["A"].next.next.end_ts == t2
+    assert store.records["B"].deleted and store.records["B"].next.end_ts == t2
+
+    t3 = store.begin_transaction()
+    store.insert(t3, Record("C", "c3"))
+    store.update(t3, Record("A", "a3"))
+    store.abort_transaction(t3)
+    assert "C" not in store.records
+    assert store.records["A"].value == "a2 again"
+    assert store.records["D"].created_by_txn_id == 1 and store.records["D"].next is None
+    print("test_commit_and_abort_touch_only_the_write_set passed.\n\n")
+
+
+def test_concurrent_writers_on_distinct_records():
+    """
+    Test: Striped chain latches
+    - Eight threads each update their own record 25 times in separate transactions while
+      a reader thread queries the store.
+    - Expected: No conflicts or lost updates; every record ends with its writer's last value
+      and a chain of 26 versions.
+    """
+
+    print("Starting test_concurrent_writers_on_distinct_records...")
+    ids = [f"K{i}" for i in range(8)]
+    store = _committed_store(*ids)
+    errors = []
+
+    def writer(record_id):
+        try:
+            for n in range(25):
+                txn = store.begin_transaction()
+                store.update(txn, Record(record_id, f"{record_id} v{n}"))
+                store.commit_transaction(txn)
+        except Exception as e:
+            errors.append(e)
+
+    def reader():
+        try:
+            for _ in range(25):
+                txn = store.begin_transaction()
+                store.read(txn, "v3", 3)
+                store.commit_transaction(txn)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in ids] + [threading.Thread(target=reader)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    for record_id in ids:
+        head, versions = store.records[record_id], 0
+        assert head.value == f"{record_id} v24"
+        while head is not None:
+            versions, head = versions + 1, head.next
+        assert versions == 26
+    print("test_concurrent_writers_on_distinct_records passed.\n\n")
+
+
+def test_read_many_matches_single_reads():
+    """
+    Test: Batched multi-query search
+    - One transaction holds an uncommitted update while another commits a new record;
+      both run a batch of queries with read_many.
+    - Expected: Each batch returns, per query and in order, exactly what read() returns
+      for that query in the same snapshot.
+    """
+
+    print("Starting test_read_many_matches_single_reads...")
+    store = _committed_store("A", "B", "C")
+    writer = store.begin_transaction()
+    store.update(writer, Record("A", "apple pie with cream"))
+    other = store.begin_transaction()
+    store.insert(other, Record("D", "date and apple loaf"))
+    store.commit_transaction(other)
+    reader = store.begin_transaction()
+
+    queries = ["apple", "value", "date loaf", "apple"]
+    for txn in (writer, reader):
+        batch = store.read_many(txn, queries, 2)
+        assert len(batch) == len(queries)
+        assert [[r.value for r in rows] for rows in batch] == [[r.value for r in store.read(txn, q, 2)] for q in queries]
+    assert store.read_many(reader, [], 2) == []
+    print("test_read_many_matches_single_reads passed.\n\n")
+
+
+def test_result_cache_respects_snapshots():
+    """
+    Test: Snapshot-keyed query result cache
+    - Readers repeat a query across read-only commits, while a transaction with its own
+      update, a newer committed write and an abort happen in between.
+    - Expected: Readers of the same committed state share cached results, a transaction with
+      writes and a reader of a newer state never get them, and stale entries are pruned
+      once no transaction can read their state.
+    """
+
+    print("Starting test_result_cache_respects_snapshots...")
+    store = _committed_store("A", "B", "C")
+    cache = store.result_cache
+
+    def values(txn, query="a"):
+        return [r.value for r in store.read(txn, query, 3)]
+
+    old = store.begin_transaction()
+    assert values(old) and cache.stats()["misses"] == 1
+    for _ in range(2):  # read-only commits do not change the state key
+        txn = store.begin_transaction()
+        values(txn)
+        store.commit_transaction(txn)
+    assert cache.stats()["hits"] == 2
+
+    writer = store.begin_transaction()
+    store.update(writer, Record("A", "a changed"))
+    assert "a changed" in values(writer)
+    assert cache.stats()["hits"] == 2
+    store.commit_transaction(writer)
+
+    new = store.begin_transaction()
+    assert "a changed" in values(new) and "a changed" not in values(old)
+    assert cache.stats()["hits"] == 3 and len(cache) == 2
+
+    aborted = store.begin_transaction()
+    store.insert(aborted, Record("E", "a extra"))
+    store.abort_transaction(aborted)
+    store.commit_transaction(old)
+    store.commit_transaction(new)
+    store.abort_transaction(store.begin_transaction())
+    assert len(cache) == 1 and cache.stats()["invalidations"] == 1
+    print("test_result_cache_respects_snapshots passed.\n\n")
+
+
+def test_result_cache_follows_search_config():
+    """
+    Test: Result cache keys include the search configuration
+    - One reader repeats a query while a vector index is attached, its beam width changed,
+      the encoder swapped and the hybrid fusion depth changed.
+    - Expected: Each change is a cache miss; repeating a read under unchanged settings is a hit.
+    """
+
+    print("Starting test_result_cache_follows_search_config...")
+    store = Store(lexical_index=True)
+    txn = store.begin_transaction()
+    for record_id in ("A", "B", "C"):
+        store.insert(txn, Record(record_id, f"{record_id.lower()} apples"))
+    store.commit_transaction(txn)
+    cache = store.result_cache
+    reader = store.begin_transaction()
+    encoder = utils.get_encoder()
+
+    def misses_after(**kwargs):
+        before = cache.stats()["misses"]
+        store.read(reader, "apples", 2, **kwargs)
+        store.read(reader, "apples", 2, **kwargs)
+        return cache.stats()["misses"] - before
+
+    assert misses_after() == 1
+    index = HNSWIndex(ef_search=16)
+    vector_store.set_index(index)
+    try:
+        assert misses_after() == 1
+        index.ef_search = 32
+        assert misses_after() == 1
+        other = HashingEncoder(encoder.dim)
+        other.name = "other-hashing"
+        utils.set_encoder(other)
+        assert misses_after() == 1
+    finally:
+        utils.set_encoder(encoder)
+        vector_store.set_index(None)
+    assert misses_after() == 0
+    assert misses_after(hybrid="rrf") == 1
+    store.hybrid_depth = 10
+    assert misses_after(hybrid="rrf") == 1
+    print("test_result_cache_follows_search_config passed.\n\n")
+
+
+if __name__ == "__main__":
+    test_snapshot_is_shared_until_written()
+    test_lazy_snapshot_sees_state_at_begin()
+    test_blocked_update_wakes_on_commit_and_times_out()
+    test_deadlock_aborts_youngest_transaction()
+    test_commit_and_abort_touch_only_the_write_set()
+    test_concurrent_writers_on_distinct_records()
+    test_read_many_matches_single_reads()
+    test_result_cache_respects_snapshots()
+    test_result_cache_follows_search_config()
+    print("All store tests passed!")
@@ -0,0 +1,154 @@
+import gc
+
+from mvcc.record import Record
+from mvcc.store import Store
+from mvcc.vacuum import Vacuum
+from vector_search import vector_store
+
+
+def test_vacuum_respects_oldest_active_snapshot():
+    """
+    Test: Vacuum low-water mark
+    - A is updated three times while an old reader transaction is still active, and B is deleted.
+    - Expected: Nothing the old reader can see is reclaimed; after it commits, every superseded
+      version, its vector and the deleted record are reclaimed, and the matrix is compacted
+      without breaking the visibility mask of a transaction that read before the compaction.
+    """
+
+    print("Starting test_vacuum_respects_oldest_active_snapshot...")
+    vector_store.reset_store()
+    store = Store()
+    t1 = store.begin_transaction()
+    store.insert(t1, Record("A", "a1"))
+    store.insert(t1, Record("B", "b1"))
+    store.commit_transaction(t1)
+
+    reader = store.begin_transaction()
+    for value in ("a2", "a3", "a4"):
+        txn = store.begin_transaction()
+        store.update(txn, Record("A", value))
+        store.commit_transaction(txn)
+    txn = store.begin_transaction()
+    store.delete(txn, "B")
+    store.commit_transaction(txn)
+
+    vacuum = Vacuum(store, pause=0, compact_threshold=0.5)
+    vacuum.run_once()
+    assert {r.value for r in store.read(reader, "a1", 5)} == {"a1", "b1"}
+
+    survivor = store.begin_transaction()
+    assert [r.value for r in store.read(survivor, "a4", 1)] == ["a4"]
+    store.commit_transaction(reader)
+    stats = vacuum.run_once()
+    assert stats["versions_reclaimed"] == 5 and stats["vectors_reclaimed"] == 4
+    assert stats["records_removed"] == 1 and stats["compactions"] == 1
+    assert "B" not in store.records and store.records["A"].next is None
+    assert len(vector_store.vector_store) == 1 and vector_store.vector_store.size == 1
+
+    fresh = store.begin_transaction()
+    assert [r.value for r in store.read(fresh, "a4", 5)] == ["a4"]
+    # a mask built before the compaction follows the moved rows
+    assert [r.value for r in store.read(survivor, "a4", 5)] == ["a4"]
+    print("test_vacuum_respects_oldest_active_snapshot passed.\n\n")
+
+
+def test_abort_drops_vectors():
+    """
+    Test: Aborted embeddings are released
+    - A transaction inserts two records and aborts.
+    - Expected: Their vectors are removed from the vector store right away.
+    """
+
+    print("Starting test_abort_drops_vectors...")
+    vector_store.reset_store()
+    store = Store()
+    txn = store.begin_transaction()
+    store.insert(txn, Record("A", "a"))
+    store.insert(txn, Record("B", "b"))
+    store.abort_transaction(txn)
+    assert len(vector_store.vector_store) == 0
+    print("test_abort_drops_vectors passed.\n\n")
+
+
+def test_reclaimed_versions_are_freed():
+    """
+    Test: Vacuumed versions are released from memory
+    - A record is updated by 50 transactions (each also reading it) and one aborted writer,
+      then the vacuum runs with no reader left.
+    - Expected: Only the newest version is still alive; finished transactions, the shared
+      snapshot and the result cache hold no references to the pruned ones.
+    """
+
+    print("Starting test_reclaimed_versions_are_freed...")
+    vector_store.reset_store()
+    store = Store()
+    txn = store.begin_transaction()
+    store.insert(txn, Record("gc-A", "v0"))
+    store.commit_transaction(txn)
+    for i in range(1, 51):
+        txn = store.begin_transaction()
+        store.read(txn, "v", 1)
+        store.update(txn, Record("gc-A", f"v{i}"))
+        store.commit_transaction(txn)
+    txn = store.begin_transaction()
+    store.update(txn, Record("gc-A", "aborted"))
+    store.abort_transaction(txn)
+
+    stats = Vacuum(store, pause=0).run_once()
+    assert stats["versions_reclaimed"] == 50
+    gc.collect()
+    alive = [o for o in gc.get_objects() if isinstance(o, Record) and o.id == "gc-A"]
+    assert [r.value for r in alive] == ["v50"]
+    print("test_reclaimed_versions_are_freed passed.\n\n")
+
+
+def test_finished_transactions_are_forgotten():
+    """
+    Test: Bookkeeping of finished transactions stays bounded
+    - 2000 read-only transactions and 50 updates of one record run, with an old reader
+      still open during the first vacuum pass; a second pass runs after it finishes.
+    - Expected: The first pass keeps everything the reader may need; afterwards only the
+      creators of surviving versions are remembered, by the store and the version table,
+      and the surviving data still reads and updates normally.
+    """
+
+    print("Starting test_finished_transactions_are_forgotten...")
+    vector_store.reset_store()
+    store = Store()
+    txn = store.begin_transaction()
+    store.insert(txn, Record("A", "apple"))
+    store.insert(txn, Record("B", "banana"))
+    store.commit_transaction(txn)
+    old_reader = store.begin_transaction()
+    for i in range(2000):
+        txn = store.begin_transaction()
+        store.read(txn, "apple", 1)
+        store.commit_transaction(txn)
+    for i in range(50):
+        txn = store.begin_transaction()
+        store.update(txn, Record("A", f"apple {i}"))
+        store.commit_transaction(txn)
+
+    vacuum = Vacuum(store, pause=0)
+    vacuum.run_once()
+    assert {r.value for r in store.read(old_reader, "apple banana", 2)} == {"apple", "banana"}
+    store.commit_transaction(old_reader)
+    stats = vacuum.run_once()
+
+    creators = {store.records["A"].created_by_txn_id, store.records["B"].created_by_txn_id}
+    assert set(store.transactions) == creators == store.versions.creator_ids()
+    assert vacuum.stats["transactions_removed"] == 2050 and stats["versions_reclaimed"] == 50
+    txn = store.begin_transaction()
+    assert {r.value for r in store.read(txn, "apple banana", 2)} == {"apple 49", "banana"}
+    store.update(txn, Record("B", "blueberry"))
+    store.commit_transaction(txn)
+    assert store.records["B"].value == "blueberry"
+    print("test_finished_transactions_are_forgotten passed.\n\n")
+
+
+if __name__ == "__main__":
+    test_vacuum_respects_oldest_active_snapshot()
+    test_abort_drops_vectors()
+    test_reclaimed_versions_are_freed()
+    test_finished_transactions_are_forgotten()
+    print("All vacuum tests passed!")
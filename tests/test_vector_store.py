@@ -0,0 +1,206 @@
+import os
+import tempfile
+import threading
+import time
+
+from vector_search.segments import SegmentManager
+from vector_search.vector_store import RowMask, VectorMatrix
+import numpy as np
+
+
+def test_matrix_grows_and_reuses_rows():
+    """
+    Test: Matrix growth and free-list reuse
+    - Adds more vectors than the initial capacity, removes one and adds another.
+    - Expected: The matrix doubles in place and the freed row is handed out again.
+    """
+
+    print("Starting test_matrix_grows_and_reuses_rows...")
+    store = VectorMatrix(capacity=2)
+    for i in range(5):
+        store.add(f"k{i}", [float(i + 1), 0.0, 1.0])
+    assert store.capacity == 8 and len(store) == 5
+
+    freed = store.remove("k2")
+    assert "k2" not in store and not store.live[freed]
+    assert store.add("k5", [0.0, 1.0, 0.0]) == freed
+    assert store.size == 5
+    print("test_matrix_grows_and_reuses_rows passed.\n\n")
+
+
+def test_rows_are_normalized_and_recoverable():
+    """
+    Test: Pre-normalized rows
+    - Stores a vector and reads back both the normalized row and the original vector.
+    - Expected: The row has unit norm and get() restores the original values.
+    """
+
+    print("Starting test_rows_are_normalized_and_recoverable...")
+    store = VectorMatrix()
+    row = store.add("a", [3.0, 4.0])
+    matrix, norms, live = store.view()
+    assert np.isclose(np.linalg.norm(matrix[row]), 1.0)
+    assert np.isclose(norms[row], 5.0) and live[row]
+    assert np.allclose(store.get("a"), [3.0, 4.0])
+    assert list(store.rows_for(["missing", "a"])) == [row]
+    print("test_rows_are_normalized_and_recoverable passed.\n\n")
+
+
+def test_row_mask_restricts_top_k():
+    """
+    Test: Visibility mask filtering
+    - Builds a RowMask from a key set, then updates it incrementally.
+    - Expected: exact_search only returns rows set in the mask, closest first.
+    """
+
+    print("Starting test_row_mask_restricts_top_k...")
+    store = VectorMatrix(capacity=2)
+    for i in range(6):
+        store.add(f"k{i}", [1.0, i / 10])
+    mask = RowMask(store, ["k0", "k1", "k5"])
+    mask.discard("k0")
+    store.add("k6", [1.0, 0.01])
+    mask.add("k6")
+
+    top = store.exact_search([1.0, 0.0], 2, mask.view())
+    assert [store.row_keys[r] for r in top] == ["k6", "k1"]
+    assert len(mask) == 3
+    print("test_row_mask_restricts_top_k passed.\n\n")
+
+
+def test_sealed_segments_search_and_merge():
+    """
+    Test: Memory-mapped segments
+    - Seals 40 vectors into a float16 segment, rewrites one sealed key, removes another,
+      adds more to the delta, seals again and then merges the segments.
+    - Expected: Sealed rows are memory-mapped, exact top-k across segments and delta matches a
+      plain float32 matrix, and the merge drops the dead rows while a RowMask follows along.
+    """
+
+    print("Starting test_sealed_segments_search_and_merge...")
+    rng = np.random.default_rng(3)
+    vectors = rng.normal(size=(60, 8)).astype(np.float32)
+    reference = VectorMatrix(capacity=4)
+    with tempfile.TemporaryDirectory() as directory:
+        store = VectorMatrix(capacity=4)
+        store.search_chunk_rows = 16
+        manager = SegmentManager(store, directory, dtype=np.float16, seal_rows=40, merge_garbage=0.01)
+        for i in range(40):
+            store.add(f"k{i}", vectors[i])
+            reference.add(f"k{i}", vectors[i])
+        manager.run_once()
+        assert store.delta_base == 40 and store.segments[0].mapped
+        assert store.segments[0].vectors.dtype == np.float16
+        mask = RowMask(store, ["k7", "k9", "k50"])
+
+        store.add("k3", vectors[3] * 2)
+        reference.add("k3", vectors[3] * 2)
+        store.remove("k5")
+        reference.remove("k5")
+        for i in range(40, 60):
+            store.add(f"k{i}", vectors[i])
+            reference.add(f"k{i}", vectors[i])
+        mask.add("k50")
+        assert np.allclose(store.get("k3"), vectors[3] * 2)
+        assert np.allclose(store.get("k9"), vectors[9], atol=1e-2)
+
+        store.seal(directory, np.float16)
+        assert len(store.segments) == 2 and store.sealed_garbage() > 0
+        for query in rng.normal(size=(5, 8)):
+            assert store.search(query, 5) == reference.search(query, 5)
+            assert store.search(query, 5, metric="euclidean") == reference.search(query, 5, metric="euclidean")
+
+        manager.run_once()
+        assert len(store.segments) == 1 and store.sealed_garbage() == 0.0
+        assert len(os.listdir(directory)) == 1
+        assert store.size == len(store) == 59
+        assert sorted(store.row_keys[r] for r in np.flatnonzero(mask.view())) == ["k50", "k7", "k9"]
+        query = rng.normal(size=8)
+        assert store.search(query, 5) == reference.search(query, 5)
+        store.clear()
+        assert os.listdir(directory) == []
+    print("test_sealed_segments_search_and_merge passed.\n\n")
+
+
+def test_sharded_search_matches_single_thread():
+    """
+    Test: Parallel sharded search
+    - Runs the same queries (with and without a row filter, cosine and euclidean) on one
+      thread and on a pool of 3 workers with 7 shards.
+    - Expected: Identical keys in identical order, and the filter still applies per shard.
+    """
+
+    print("Starting test_sharded_search_matches_single_thread...")
+    rng = np.random.default_rng(5)
+    store = VectorMatrix()
+    for i, vec in enumerate(rng.normal(size=(500, 16))):
+        store.add(f"k{i}", vec)
+    allowed = rng.random(store.size) < 0.3
+    queries = rng.normal(size=(8, 16))
+    expected = [store.search_many(queries, 10, mask, metric=metric)
+                for mask in (None, allowed) for metric in ("cosine", "euclidean")]
+
+    store.set_search_workers(3, shards=7)
+    try:
+        found = [store.search_many(queries, 10, mask, metric=metric)
+                 for mask in (None, allowed) for metric in ("cosine", "euclidean")]
+        assert found == expected
+        assert all(allowed[store.key_to_row[key]] for keys in found[2] for key in keys)
+    finally:
+        store.set_search_workers(1)
+    print("test_sharded_search_matches_single_thread passed.\n\n")
+
+
+class _SlowRowsMatrix(VectorMatrix):
+    """Pauses before resolving keys to rows, widening the window a compaction can slip into."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.resolving = threading.Event()
+
+    def rows_for(self, keys):
+        self.resolving.set()
+        time.sleep(0.02)
+        return super().rows_for(keys)
+
+
+def test_row_mask_built_during_compaction():
+    """
+    Test: RowMask construction racing a compaction
+    - Builds a mask while another thread removes rows and compacts the matrix, then copies
+      it while more compactions run.
+    - Expected: The mask and its copies, once synced, select exactly the requested keys.
+    """
+
+    print("Starting test_row_mask_built_during_compaction...")
+    store = _SlowRowsMatrix(capacity=64)
+    for i in range(60):
+        store.add(f"k{i}", [float(i + 1), 1.0, 0.0])
+    wanted = {f"k{i}" for i in range(30, 60)}
+
+    def compactor():
+        store.resolving.wait()
+        for i in range(30):
+            store.remove(f"k{i}")
+            store.compact()
+
+    def selected(mask):
+        return {store.row_keys[r] for r in np.flatnonzero(mask.view()).tolist()}
+
+    thread = threading.Thread(target=compactor)
+    thread.start()
+    mask = RowMask(store, sorted(wanted))
+    copies = [mask.copy() for _ in range(50)]
+    thread.join()
+    assert selected(mask) == wanted
+    assert all(selected(c) == wanted for c in copies)
+    print("test_row_mask_built_during_compaction passed.\n\n")
+
+if __name__ == "__main__":
+    test_matrix_grows_and_reuses_rows()
+    test_rows_are_normalized_and_recoverable()
+    test_row_mask_restricts_top_k()
+    test_sealed_segments_search_and_merge()
+    test_sharded_search_matches_single_thread()
+    test_row_mask_built_during_compaction()
+    print("All vector store tests passed!")
@@ -0,0 +1,122 @@
+# embedding_cache.py
+
+"""
+Bounded cache for text embeddings.
+
+Entries are keyed by a SHA-256 of (model name, text), so a cache shared by
+several models, or persisted across model upgrades, never mixes vectors up.
+
+- EmbeddingCache.get / put: LRU lookup and insert, evicting the least recently
+  used entries once max_entries or max_bytes is exceeded.
+- Optional on-disk tier (disk_dir): every put is also written as <hash>.npy,
+  and memory misses fall back to disk, so the cache survives restarts.
+- stats: Hit / miss / eviction counters and current size.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class EmbeddingCache:
+    def __init__(self, max_entries=10000, max_bytes=None, disk_dir=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        if disk_dir is not None:
+            os.makedirs(disk_dir, exist_ok=True)
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Drops the in-memory tier and resets counters (the disk tier is left alone)."""
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key_for(model_name, text):
+        return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key + ".npy")
+
+    def _remember(self, key, vector):
+        # caller holds self.lock
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old.nbytes
+        self.entries[key] = vector
+        self.bytes += vector.nbytes
+        while self.entries and (
+            len(self.entries) > self.max_entries
+            or (self.max_bytes is not None and self.bytes > self.max_bytes)
+        ):
+            _, evicted = self.entries.popitem(last=False)
+            self.bytes -= evicted.nbytes
+            self.evictions += 1
+
+    def get(self, model_name, text):
+        """Returns the cached (read-only) vector, or None on a miss."""
+        key = self.key_for(model_name, text)
+        with self.lock:
+            vector = self.entries.get(key)
+            if vector is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return vector
+
+        if self.disk_dir is not None:
+            try:
+                vector = np.load(self._disk_path(key))
+            except (OSError, ValueError):
+                vector = None
+            if vector is not None:
+                vector.flags.writeable = False
+                with self.lock:
+                    self.disk_hits += 1
+                    self._remember(key, vector)
+                return vector
+
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, model_name, text, vector):
+        """Caches vector for (model_name, text) and returns the cached read-only copy."""
+        key = self.key_for(model_name, text)
+        vector = np.array(vector, dtype=np.float32)
+        vector.flags.writeable = False
+        with self.lock:
+            self._remember(key, vector)
+
+        if self.disk_dir is not None:
+            # write to a temp file first so a crash never leaves a truncated entry behind
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, vector)
+            os.replace(tmp_path, self._disk_path(key))
+        return vector
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,195 @@
+# encoder_pool.py
+
+"""
+Encoder service: runs the model in worker processes, fed through a
+micro-batching request queue.
+
+A transformer forward pass holds the GIL for long stretches, so encoding in
+the caller's thread stalls every other transaction thread of the process.
+PooledEncoder is an Encoder (same name, same encode contract) whose encode
+only enqueues the texts and waits on futures. A dispatcher thread groups
+queued requests into batches of up to `max_batch` texts, waiting at most
+`max_wait_ms` for a batch to fill, and hands each batch to a process pool
+whose workers each load the model once. Calls that already bring a full
+batch (insert_many, read_many) skip the queue.
+
+Set it as the active encoder (utils.set_encoder, or VECTOR_DB_ENCODER_PROCESSES
+for the environment-configured one) and Store.insert / update / read use it
+without changes.
+
+- PooledEncoder.submit: Queues texts, returning one Future per text.
+- PooledEncoder.encode: Encoder interface; blocks on the futures.
+- PooledEncoder.stats: Queue depth and batch-size metrics.
+"""
+
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from .encoders import Encoder, encoder_from_name
+
+# the encoder of a worker process, built once by _init_worker
+_worker_encoder = None
+
+
+def _init_worker(name):
+    global _worker_encoder
+    _worker_encoder = encoder_from_name(name)
+
+
+def _encode_in_worker(texts, batch_size):
+    return _worker_encoder.encode(texts, batch_size=batch_size)
+
+
+class PooledEncoder(Encoder):
+    def __init__(self, encoder="instructor", processes=1, max_batch=32, max_wait_ms=5.0):
+        """
+        Args:
+            encoder (str): Name of the encoder each worker builds (see encoder_from_name).
+            processes (int): Worker processes; 0 encodes on a single in-process thread instead.
+            max_batch (int): Most texts per model call.
+            max_wait_ms (float): Longest a queued text waits for its batch to fill.
+        """
+        self.encoder_name = encoder
+        self.name = encoder_from_name(encoder).name  # embedding-cache keys stay the same
+        self.processes = processes
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._requests: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._metrics = {"requests": 0, "texts": 0, "batches": 0, "max_batch": 0, "max_queue_depth": 0}
+        self._pool = None
+        self._dispatcher = None
+        self._closed = False
+
+    def _start(self):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("encoder pool is closed")
+            if self._pool is not None:
+                return
+            if self.processes:
+                # spawn: model libraries do not survive fork
+                self._pool = ProcessPoolExecutor(
+                    self.processes, mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker, initargs=(self.encoder_name,),
+                )
+            else:
+                self._pool = ThreadPoolExecutor(1, initializer=_init_worker, initargs=(self.encoder_name,))
+            self._dispatcher = threading.Thread(target=self._dispatch, name="encoder-dispatch", daemon=True)
+            self._dispatcher.start()
+
+    def warm_up(self, background=False):
+        """Starts the workers and has each load its model."""
+        self._start()
+        warm = [self._pool.submit(_encode_in_worker, [""], 1) for _ in range(max(1, self.processes))]
+        if background:
+            return None
+        for future in warm:
+            future.result()
+        return None
+
+    def submit(self, texts):
+        """Queues texts for encoding; returns one Future (resolving to a float32 vector) per text."""
+        self._start()
+        futures = []
+        with self._lock:
+            # queued under the lock, so a concurrent close() puts its stop marker after these
+            if self._closed:
+                raise RuntimeError("encoder pool is closed")
+            for text in texts:
+                future = Future()
+                self._requests.put((text, future))
+                futures.append(future)
+            self._metrics["requests"] += 1
+            self._metrics["max_queue_depth"] = max(self._metrics["max_queue_depth"], self._requests.qsize())
+        return futures
+
+    def encode(self, texts, batch_size=32):
+        texts = list(texts)
+        if len(texts) >= self.max_batch:
+            # already a full batch: straight to a worker, no queueing delay
+            self._start()
+            with self._lock:
+                self._metrics["requests"] += 1
+            chunks = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+            results = [self._run_batch(chunk, batch_size) for chunk in chunks]
+            return np.concatenate([r.result() for r in results]).astype(np.float32, copy=False)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.stack([f.result() for f in self.submit(texts)]).astype(np.float32, copy=False)
+
+    def _run_batch(self, texts, batch_size):
+        with self._lock:
+            self._metrics["texts"] += len(texts)
+            self._metrics["batches"] += 1
+            self._metrics["max_batch"] = max(self._metrics["max_batch"], len(texts))
+        return self._pool.submit(_encode_in_worker, texts, batch_size)
+
+    def _dispatch(self):
+        while True:
+            first = self._requests.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._requests.get(timeout=remaining) if remaining > 0 else self._requests.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._requests.put(None)  # finish this batch, then stop
+                    break
+                batch.append(item)
+            self._send(batch)
+
+    def _send(self, batch):
+        texts = [text for text, _ in batch]
+        futures = [future for _, future in batch]
+        try:
+            result = self._run_batch(texts, self.max_batch)
+        except Exception as e:  # pool shut down or broken
+            for future in futures:
+                future.set_exception(e)
+            return
+
+        def deliver(done):
+            try:
+                vectors = done.result()
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                return
+            for future, vector in zip(futures, vectors):
+                future.set_result(np.asarray(vector, dtype=np.float32))
+
+        result.add_done_callback(deliver)
+
+    def stats(self):
+        """Requests and texts seen, batches sent, mean / max batch size and current / peak queue depth."""
+        with self._lock:
+            stats = dict(self._metrics)
+        stats["queue_depth"] = self._requests.qsize()
+        stats["mean_batch"] = round(stats["texts"] / stats["batches"], 2) if stats["batches"] else 0.0
+        return stats
+
+    def close(self):
+        """Stops the dispatcher and the workers; queued requests are still encoded first."""
+        with self._lock:
+            if self._closed:
+                return
+            # new submissions are refused from here on, but the dispatcher keeps using the pool
+            self._closed = True
+            pool, dispatcher = self._pool, self._dispatcher
+        if pool is not None:
+            self._requests.put(None)
+            dispatcher.join()
+            pool.shutdown(wait=True)
+        with self._lock:
+            self._pool = self._dispatcher = None
@@ -0,0 +1,103 @@
+# encoders.py
+
+"""
+Pluggable text encoders.
+
+An encoder has a `name` (used in embedding-cache keys) and
+`encode(texts, batch_size)` returning a float32 matrix with one row per text.
+
+- SentenceTransformerEncoder: The transformer model, loaded lazily on first
+  use (or ahead of time with warm_up, optionally on a background thread).
+- HashingEncoder: Deterministic feature hashing of words and character
+  trigrams. No model, no downloads, starts instantly; for tests, control-plane
+  processes and offline benchmarks.
+- encoder_from_name: Builds an encoder from a config string
+  ("instructor", "hashing", or any sentence-transformers model name).
+"""
+
+import os
+import re
+import threading
+import zlib
+
+import numpy as np
+
+DEFAULT_MODEL = "hkunlp/instructor-xl"
+
+
+class Encoder:
+    name = ""
+
+    def encode(self, texts, batch_size=32):
+        raise NotImplementedError
+
+    def warm_up(self, background=False):
+        """Loads whatever the encoder needs ahead of the first encode call."""
+        return None
+
+
+class SentenceTransformerEncoder(Encoder):
+    def __init__(self, model_name=DEFAULT_MODEL):
+        self.name = model_name
+        self._model = None
+        self._load_lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self._model is not None
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._load_lock:
+                if self._model is None:
+                    os.environ["USE_TF"] = "0"
+                    from sentence_transformers import SentenceTransformer
+                    self._model = SentenceTransformer(self.name)
+        return self._model
+
+    def encode(self, texts, batch_size=32):
+        return np.asarray(self.model.encode(list(texts), batch_size=batch_size), dtype=np.float32)
+
+    def warm_up(self, background=False):
+        if not background:
+            self.model
+            return None
+        thread = threading.Thread(target=lambda: self.model, name="encoder-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+
+class HashingEncoder(Encoder):
+    _token = re.compile(r"\w+")
+
+    def __init__(self, dim=768):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text):
+        for word in self._token.findall(text.lower()):
+            yield word, 1.0
+            padded = f" {word} "
+            for i in range(len(padded) - 2):
+                yield padded[i:i + 3], 0.5
+
+    def encode(self, texts, batch_size=32):
+        texts = list(texts)
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text):
+                h = zlib.crc32(feature.encode("utf-8"))
+                # low bits pick the bucket, the top bit picks the sign
+                out[row, h % self.dim] += weight if h & 0x80000000 else -weight
+        return out
+
+
+def encoder_from_name(name):
+    if name in ("", "instructor", DEFAULT_MODEL):
+        return SentenceTransformerEncoder(DEFAULT_MODEL)
+    if name == "hashing":
+        return HashingEncoder()
+    if name.startswith("hashing-"):
+        return HashingEncoder(int(name.split("-", 1)[1]))
+    return SentenceTransformerEncoder(name)
@@ -0,0 +1,242 @@
+# hnsw.py
+
+"""
+Approximate nearest-neighbour index (HNSW) over the rows of a VectorMatrix.
+
+The graph stores row numbers only; vectors are read from the owning matrix,
+which keeps rows L2-normalized, so the distance is 1 - dot product (cosine).
+An index is attached with VectorMatrix.attach_index and is then maintained
+incrementally by add / remove.
+
+- HNSWIndex.search: Filtered top-k search; rows outside the allowed mask are
+  traversed but never returned.
+- HNSWIndex.prefers_exact: True when a filter is selective enough that a
+  brute-force scan over the allowed rows is cheaper and exact.
+
+Knobs: M (graph degree, 2*M on layer 0), ef_construction (build-time beam),
+ef_search (query-time beam, the main recall/latency trade-off).
+"""
+
+import heapq
+import math
+import random
+
+import numpy as np
+
+
+class HNSWIndex:
+    def __init__(self, M=16, ef_construction=200, ef_search=64, exact_threshold=0.05, seed=42):
+        self.M = M
+        self.M0 = 2 * M
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.exact_threshold = exact_threshold
+        self.level_mult = 1 / math.log(M)
+        self.rng = random.Random(seed)
+        self.store = None
+        self.clear()
+
+    def clear(self):
+        self.levels = {}      # row -> top layer of that node
+        self.graph = []       # layer -> {row: [neighbour rows]}
+        self.incoming = []    # layer -> {row: set of rows linking to it}
+        self.entry_point = None
+        self.max_level = -1
+
+    def bind(self, store):
+        """Attaches the index to a VectorMatrix and indexes its live rows."""
+        self.store = store
+        self.clear()
+        for row in np.flatnonzero(store.live[: store.size]):
+            self.add(int(row))
+
+    def __len__(self):
+        return len(self.levels)
+
+    # -- distances ---------------------------------------------------------
+
+    def _distances(self, q, rows):
+        return 1.0 - self.store.vectors(rows) @ q
+
+    def _distance(self, q, row):
+        return 1.0 - float(self.store.vectors(row) @ q)
+
+    # -- graph maintenance -------------------------------------------------
+
+    def _max_degree(self, level):
+        return self.M0 if level == 0 else self.M
+
+    def _set_neighbours(self, level, node, neighbours):
+        layer, incoming = self.graph[level], self.incoming[level]
+        for old in layer.get(node, ()):
+            linked_from = incoming.get(old)
+            if linked_from is not None:
+                linked_from.discard(node)
+        layer[node] = neighbours
+        for new in neighbours:
+            incoming[new].add(node)
+
+    def _select(self, base, candidates, limit):
+        """HNSW neighbour-selection heuristic: keep a candidate only if it is
+        closer to the base vector than to every neighbour already kept."""
+        if len(candidates) <= limit:
+            return list(candidates)
+        candidates = np.asarray(candidates, dtype=np.intp)
+        vectors = self.store.vectors(candidates)
+        base_dist = 1.0 - vectors @ base
+        order = np.argsort(base_dist, kind="stable")
+        candidates, vectors, base_dist = candidates[order], vectors[order], base_dist[order]
+        pairwise = 1.0 - vectors @ vectors.T
+        kept = []
+        for i in range(len(candidates)):
+            if len(kept) == limit:
+                break
+            if kept and (pairwise[i, kept] < base_dist[i]).any():
+                continue
+            kept.append(i)
+        selected = candidates[kept].tolist()
+        # top up with the closest leftovers so sparse regions stay connected
+        if len(selected) < limit:
+            chosen = set(selected)
+            selected.extend(c for c in candidates.tolist() if c not in chosen)
+            selected = selected[:limit]
+        return selected
+
+    def _search_layer(self, q, entry_points, ef, level, allowed=None):
+        """Beam search on one layer. Returns up to ef (distance, row) pairs, closest first."""
+        layer = self.graph[level]
+        visited = set(entry_points)
+        dists = self._distances(q, list(entry_points))
+        candidates = [(float(d), ep) for d, ep in zip(dists, entry_points)]
+        heapq.heapify(candidates)
+        results = [(-d, ep) for d, ep in candidates if allowed is None or allowed[ep]]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            dist, node = heapq.heappop(candidates)
+            if len(results) >= ef and dist > -results[0][0]:
+                break
+            fresh = [n for n in layer.get(node, ()) if n not in visited]
+            if not fresh:
+                continue
+            visited.update(fresh)
+            for d, n in zip(self._distances(q, fresh).tolist(), fresh):
+                if len(results) < ef or d < -results[0][0]:
+                    heapq.heappush(candidates, (d, n))
+                    if allowed is None or allowed[n]:
+                        heapq.heappush(results, (-d, n))
+                        if len(results) > ef:
+                            heapq.heappop(results)
+        return sorted((-d, n) for d, n in results)
+
+    def _greedy_descend(self, q, top, bottom):
+        ep = self.entry_point
+        ep_dist = self._distance(q, ep)
+        for level in range(top, bottom, -1):
+            changed = True
+            while changed:
+                changed = False
+                neighbours = self.graph[level].get(ep, ())
+                if not neighbours:
+                    break
+                dists = self._distances(q, neighbours)
+                best = int(np.argmin(dists))
+                if dists[best] < ep_dist:
+                    ep, ep_dist, changed = neighbours[best], float(dists[best]), True
+        return ep
+
+    def add(self, row):
+        if row in self.levels:
+            self.remove(row)
+        level = int(-math.log(1.0 - self.rng.random()) * self.level_mult)
+        self.levels[row] = level
+        while len(self.graph) <= level:
+            self.graph.append({})
+            self.incoming.append({})
+        for l in range(level + 1):
+            self.graph[l][row] = []
+            self.incoming[l][row] = set()
+
+        if self.entry_point is None:
+            self.entry_point, self.max_level = row, level
+            return
+
+        q = self.store.vectors(row)
+        ep = self._greedy_descend(q, self.max_level, level)
+        entry_points = [ep]
+        for l in range(min(level, self.max_level), -1, -1):
+            found = self._search_layer(q, entry_points, self.ef_construction, l)
+            found_rows = [n for _, n in found if n != row]
+            limit = self._max_degree(l)
+            self._set_neighbours(l, row, self._select(q, found_rows, self.M))
+            for n in self.graph[l][row]:
+                links = self.graph[l][n] + [row]
+                if len(links) > limit:
+                    links = self._select(self.store.vectors(n), links, limit)
+                self._set_neighbours(l, n, links)
+            entry_points = found_rows or entry_points
+
+        if level > self.max_level:
+            self.entry_point, self.max_level = row, level
+
+    def remove(self, row):
+        level = self.levels.pop(row, None)
+        if level is None:
+            return
+        for l in range(level + 1):
+            outgoing = self.graph[l][row]
+            self._set_neighbours(l, row, [])
+            del self.graph[l][row]
+            # reconnect every node that pointed at the removed one through its neighbours
+            for n in list(self.incoming[l].pop(row)):
+                candidates = [c for c in self.graph[l][n] if c != row]
+                candidates += [c for c in outgoing if c != n and c not in candidates]
+                self._set_neighbours(l, n, self._select(self.store.vectors(n), candidates, self._max_degree(l)))
+
+        if row == self.entry_point:
+            if self.levels:
+                self.entry_point = max(self.levels, key=self.levels.get)
+                self.max_level = self.levels[self.entry_point]
+            else:
+                self.entry_point, self.max_level = None, -1
+        while self.graph and not self.graph[-1]:
+            self.graph.pop()
+            self.incoming.pop()
+
+    def remap(self, mapping):
+        """Renumbers rows after the owning matrix is compacted (mapping[old] == new)."""
+        mapping = {old: new for old, new in enumerate(np.asarray(mapping).tolist()) if new >= 0}
+        self.levels = {mapping[r]: lvl for r, lvl in self.levels.items()}
+        self.graph = [{mapping[r]: [mapping[n] for n in ns] for r, ns in layer.items()} for layer in self.graph]
+        self.incoming = [{mapping[r]: {mapping[n] for n in ns} for r, ns in layer.items()} for layer in self.incoming]
+        if self.entry_point is not None:
+            self.entry_point = mapping[self.entry_point]
+
+    # -- queries -----------------------------------------------------------
+
+    def prefers_exact(self, n_allowed, n_total):
+        return n_allowed <= max(self.ef_search, n_total * self.exact_threshold)
+
+    def search(self, query, k, allowed=None, ef_search=None):
+        """
+        Approximate top-k search.
+
+        Args:
+            query (np.ndarray): L2-normalized query vector.
+            k (int): Number of results.
+            allowed (np.ndarray of bool, optional): Row mask; only rows set here are returned.
+            ef_search (int, optional): Overrides the index's beam width for this query.
+
+        Returns:
+            (np.ndarray, np.ndarray): Rows and cosine distances, closest first.
+        """
+        if self.entry_point is None or k <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=self.store.dtype)
+        ef = max(ef_search or self.ef_search, k)
+        ep = self._greedy_descend(query, self.max_level, 0)
+        found = self._search_layer(query, [ep], ef, 0, allowed)[:k]
+        rows = np.fromiter((n for _, n in found), dtype=np.intp, count=len(found))
+        dists = np.fromiter((d for d, _ in found), dtype=np.float64, count=len(found))
+        return rows, dists
@@ -0,0 +1,272 @@
+# metrics.py
+
+"""
+Process-wide latency histograms, counters and optional span tracing for the
+store and vector search hot paths.
+
+Instrumented code wraps an operation in `with metrics.span("store.read"):`.
+That records its latency in a fixed-bucket histogram. When tracing is on, it
+also appends a span (name, start, duration, thread, parent span) to a bounded
+ring buffer. With metrics disabled (VECTOR_DB_METRICS=0 or
+registry.enabled = False), span returns a shared no-op context and inc /
+observe return at once, so instrumented paths pay one attribute check.
+
+Operations recorded:
+- encode: model calls, including those made through the embedding cache.
+- store.read / store.read_many / store.snapshot / store.filter / store.resolve: reads,
+  snapshot resolution, metadata filtering, and mapping keys back to versions
+  (chain walks).
+- store.commit / store.lock_wait: commits, including WAL sync, and time
+  blocked on another transaction's uncommitted head.
+- search.filter / search.score / search.index: candidate masks, exact scoring
+  (dot products / cdist) and ANN index walks.
+
+- Registry: The collector; `registry` is the process-wide instance.
+- span / inc / observe: Record through the process-wide registry.
+- set_tracing / traces: Turn span tracing on or off and read the recorded spans.
+- stats: Counters, latency summaries and (given a Store) its gauges, as a dict.
+- prometheus: The same in Prometheus text exposition format.
+"""
+
+import bisect
+import os
+import threading
+import time
+from collections import deque
+
+# histogram bucket upper bounds, in seconds
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        # caller holds the registry lock
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (the max for the overflow bucket)."""
+        rank, seen = q * self.count, 0
+        for bound, n in zip(BUCKETS, self.counts):
+            seen += n
+            if n and seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        ms = 1000.0
+        return {
+            "count": self.count,
+            "mean_ms": round(self.sum / self.count * ms, 4) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.5) * ms, 4),
+            "p95_ms": round(self.quantile(0.95) * ms, 4),
+            "p99_ms": round(self.quantile(0.99) * ms, 4),
+            "max_ms": round(self.max * ms, 4),
+        }
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+_UNTRACED = object()
+
+
+class _Span:
+    __slots__ = ("registry", "name", "start", "parent")
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        registry = self.registry
+        self.parent = _UNTRACED
+        if registry.tracing:
+            stack = registry._stack()
+            self.parent = stack[-1] if stack else None
+            stack.append(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        registry = self.registry
+        registry.observe(self.name, elapsed)
+        if self.parent is not _UNTRACED:
+            registry._stack().pop()
+            registry._spans.append({
+                "name": self.name,
+                "start": self.start,
+                "duration_ms": elapsed * 1000.0,
+                "thread": threading.current_thread().name,
+                "parent": self.parent,
+                "error": exc_type.__name__ if exc_type else None,
+            })
+        return False
+
+
+class Registry:
+    def __init__(self, enabled=True, tracing=False, trace_capacity=10000):
+        self.enabled = enabled
+        self.tracing = tracing
+        self.lock = threading.Lock()
+        self._local = threading.local()
+        self._spans = deque(maxlen=trace_capacity)
+        self.reset()
+
+    def reset(self):
+        """Zeroes every counter and histogram and drops recorded spans."""
+        with self.lock:
+            self.counters: dict[str, float] = {}
+            self.histograms: dict[str, Histogram] = {}
+        self._spans.clear()
+
+    def span(self, name):
+        return _Span(self, name) if self.enabled else _NULL_SPAN
+
+    def inc(self, name, n=1):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, seconds):
+        if not self.enabled:
+            return
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def set_tracing(self, enabled, capacity=None):
+        """Starts or stops recording spans (the newest `capacity` are kept)."""
+        if capacity is not None:
+            self._spans = deque(self._spans, maxlen=capacity)
+        self.tracing = enabled
+
+    def traces(self):
+        return list(self._spans)
+
+    def stats(self, store=None):
+        with self.lock:
+            report = {
+                "counters": dict(self.counters),
+                "latency": {name: h.summary() for name, h in sorted(self.histograms.items())},
+            }
+        if store is not None:
+            report["gauges"] = store_gauges(store)
+        return report
+
+    def prometheus(self, store=None, prefix="vector_db"):
+        """Prometheus text exposition: counters as <prefix>_<name>_total, latencies as one histogram by op."""
+        lines = []
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((name, list(h.counts), h.count, h.sum) for name, h in self.histograms.items())
+        for name, value in counters:
+            metric = f"{prefix}_{_metric_name(name)}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        if histograms:
+            metric = f"{prefix}_latency_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            for name, counts, count, total in histograms:
+                cumulative = 0
+                for bound, n in zip(BUCKETS, counts):
+                    cumulative += n
+                    lines.append(f'{metric}_bucket{{op="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{op="{name}",le="+Inf"}} {count}')
+                lines.append(f'{metric}_sum{{op="{name}"}} {total}')
+                lines.append(f'{metric}_count{{op="{name}"}} {count}')
+        if store is not None:
+            for name, value in sorted(store_gauges(store).items()):
+                metric = f"{prefix}_{_metric_name(name)}"
+                lines += [f"# TYPE {metric} gauge", f"{metric} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+def _metric_name(name):
+    return name.replace(".", "_").replace("-", "_")
+
+
+def store_gauges(store):
+    """Point-in-time sizes of a Store and the vector store behind it."""
+    from vector_search import utils, vector_store
+
+    with store.lock:
+        active = len(store.active_txns)
+    wait_stats = store.lock_wait_stats()
+    cache = store.result_cache.stats()
+    embeddings = utils.embedding_cache.stats()
+    return {
+        "store.records": len(store.records),
+        "store.versions": store.versions.size,
+        "store.active_transactions": active,
+        "store.blocked_transactions": wait_stats["blocked"],
+        "store.lock_waits": wait_stats["waits"],
+        "store.lock_timeouts": wait_stats["timeouts"],
+        "store.deadlocks": wait_stats["deadlocks"],
+        "store.result_cache_entries": cache["entries"],
+        "store.result_cache_hit_rate": round(cache["hit_rate"], 4),
+        "vectors.live": len(vector_store.vector_store),
+        "embedding_cache.hit_rate": round(embeddings["hit_rate"], 4),
+    }
+
+
+registry = Registry(
+    enabled=os.environ.get("VECTOR_DB_METRICS", "1") != "0",
+    tracing=os.environ.get("VECTOR_DB_TRACE") == "1",
+)
+
+
+def span(name):
+    return registry.span(name)
+
+
+def inc(name, n=1):
+    registry.inc(name, n)
+
+
+def observe(name, seconds):
+    registry.observe(name, seconds)
+
+
+def set_tracing(enabled, capacity=None):
+    registry.set_tracing(enabled, capacity)
+
+
+def traces():
+    return registry.traces()
+
+
+def stats(store=None):
+    return registry.stats(store)
+
+
+def prometheus(store=None):
+    return registry.prometheus(store)
@@ -0,0 +1,252 @@
+# quantization.py
+
+"""
+Compressed candidate search with exact re-ranking.
+
+A quantized index keeps a compact code per matrix row next to the full
+vectors. A query scores every code (a scan over 1 byte per dimension for int8,
+m bytes per vector for PQ instead of 4 bytes per dimension), keeps the best
+`rerank` candidates and re-scores only those against the full normalized rows,
+so the returned distances are exact. With sealed segments (segments.py) the
+full rows can stay on disk while the codes are scanned in memory.
+
+Both indexes plug into VectorMatrix.attach_index like HNSWIndex (same add /
+remove / remap / search contract) and are kept in sync on every write. They are
+trained on a sample of the live rows when bound, or once `train_size` rows have
+been added; until then searches take the exact path.
+
+- ScalarQuantizer: int8 codes with a per-dimension range (dim bytes per vector).
+- ProductQuantizer: m sub-vector codebooks of up to 256 centroids, scored with
+  per-query lookup tables (m bytes per vector).
+
+Knobs: rerank (shortlist size per result; ef_search overrides the shortlist
+length per query), m for PQ (bytes per vector vs. recall).
+"""
+
+import numpy as np
+
+
+class _QuantizedIndex:
+    code_dtype = np.uint8
+
+    def __init__(self, rerank=4, train_size=20000, exact_threshold=0.05, seed=42):
+        self.rerank = rerank
+        self.train_size = train_size
+        self.exact_threshold = exact_threshold
+        self.rng = np.random.default_rng(seed)
+        self.store = None
+        self.clear()
+
+    def clear(self):
+        self.trained = False
+        self.codes = np.zeros((0, 0), dtype=self.code_dtype)
+        self.encoded = np.zeros(0, dtype=bool)  # rows that have a current code
+
+    def bind(self, store):
+        """Attaches the index to a VectorMatrix, training it on the live rows if there are any."""
+        self.store = store
+        self.clear()
+        if len(store):
+            self.train()
+
+    def __len__(self):
+        return int(np.count_nonzero(self.encoded))
+
+    @property
+    def code_bytes(self):
+        """Bytes of code stored per vector."""
+        return self.codes.shape[1] * self.codes.itemsize
+
+    # -- training / encoding -----------------------------------------------
+
+    def train(self, sample=None):
+        """Fits the quantizer to sample (default: up to train_size live rows) and encodes every live row."""
+        store = self.store
+        live = np.flatnonzero(store.live[: store.size])
+        if sample is None:
+            if live.size > self.train_size:
+                live_sample = np.sort(self.rng.choice(live, size=self.train_size, replace=False))
+            else:
+                live_sample = live
+            sample = store.vectors(live_sample)
+        self._fit(np.asarray(sample, dtype=np.float32))
+        self.trained = True
+        self.codes = np.zeros((store.capacity, self._code_width()), dtype=self.code_dtype)
+        self.encoded = np.zeros(store.capacity, dtype=bool)
+        for start in range(0, live.size, store.search_chunk_rows):
+            rows = live[start : start + store.search_chunk_rows]
+            self.codes[rows] = self._encode(store.vectors(rows))
+        self.encoded[live] = True
+
+    def _fit_rows(self, rows):
+        if rows > self.encoded.shape[0]:
+            capacity = max(rows, 2 * self.encoded.shape[0])
+            codes = np.zeros((capacity, self.codes.shape[1]), dtype=self.code_dtype)
+            codes[: self.codes.shape[0]] = self.codes
+            encoded = np.zeros(capacity, dtype=bool)
+            encoded[: self.encoded.shape[0]] = self.encoded
+            self.codes, self.encoded = codes, encoded
+
+    def add(self, row):
+        if not self.trained:
+            if len(self.store) >= self.train_size:
+                self.train()
+            return
+        self._fit_rows(row + 1)
+        self.codes[row] = self._encode(self.store.vectors([row]))[0]
+        self.encoded[row] = True
+
+    def remove(self, row):
+        if row < self.encoded.shape[0]:
+            self.encoded[row] = False
+
+    def remap(self, mapping):
+        """Renumbers rows after the owning matrix is compacted (mapping[old] == new)."""
+        if not self.trained:
+            return
+        mapping = np.asarray(mapping)
+        old = np.flatnonzero(mapping >= 0)
+        old = old[old < self.encoded.shape[0]]
+        codes = np.zeros_like(self.codes)
+        encoded = np.zeros_like(self.encoded)
+        codes[mapping[old]] = self.codes[old]
+        encoded[mapping[old]] = self.encoded[old]
+        self.codes, self.encoded = codes, encoded
+
+    # -- queries -----------------------------------------------------------
+
+    def prefers_exact(self, n_allowed, n_total):
+        return not self.trained or n_allowed <= n_total * self.exact_threshold
+
+    def search(self, query, k, allowed=None, ef_search=None):
+        """
+        Top-k search: scan the codes, then re-rank the shortlist exactly.
+
+        Args:
+            query (np.ndarray): L2-normalized query vector.
+            k (int): Number of results.
+            allowed (np.ndarray of bool, optional): Row mask; only rows set here are returned.
+            ef_search (int, optional): Shortlist length to re-rank (default k * rerank).
+
+        Returns:
+            (np.ndarray, np.ndarray): Rows and exact cosine distances, closest first.
+        """
+        store = self.store
+        n = min(store.size, self.encoded.shape[0])
+        candidates = self.encoded[:n].copy()
+        if allowed is not None:
+            m = min(n, allowed.shape[0])
+            candidates[:m] &= allowed[:m]
+            candidates[m:] = False
+        n_candidates = int(np.count_nonzero(candidates))
+        if n_candidates == 0 or k <= 0:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.float64)
+
+        shortlist = min(max(ef_search or k * self.rerank, k), n_candidates)
+        table = self._score_table(np.asarray(query, dtype=np.float32))
+        found_rows, found_scores = [], []
+        for start in range(0, n, store.search_chunk_rows):
+            allowed_chunk = candidates[start : start + store.search_chunk_rows]
+            if not allowed_chunk.any():
+                continue
+            if allowed_chunk.all():
+                rows = np.arange(start, start + allowed_chunk.shape[0])
+                scores = self._scores(table, self.codes[start : start + allowed_chunk.shape[0]])
+            else:
+                rows = start + np.flatnonzero(allowed_chunk)
+                scores = self._scores(table, self.codes[rows])
+            if scores.shape[0] > shortlist:
+                top = np.argpartition(-scores, shortlist - 1)[:shortlist]
+                rows, scores = rows[top], scores[top]
+            found_rows.append(rows)
+            found_scores.append(scores)
+        rows, scores = np.concatenate(found_rows), np.concatenate(found_scores)
+        if rows.shape[0] > shortlist:
+            rows = rows[np.argpartition(-scores, shortlist - 1)[:shortlist]]
+
+        # exact re-rank against the full rows
+        rows = np.sort(rows)  # row order reads each segment sequentially
+        distances = 1.0 - store.vectors(rows) @ query
+        order = np.argsort(distances, kind="stable")[:k]
+        return rows[order], distances[order].astype(np.float64)
+
+
+class ScalarQuantizer(_QuantizedIndex):
+    """int8 codes: each dimension is mapped linearly from its trained [low, high] range onto 256 levels."""
+
+    code_dtype = np.int8
+
+    def _code_width(self):
+        return self.low.shape[0]
+
+    def _fit(self, sample):
+        self.low = sample.min(axis=0)
+        span = sample.max(axis=0) - self.low
+        self.step = np.where(span > 0, span / 255.0, 1.0).astype(np.float32)
+
+    def _encode(self, vectors):
+        levels = np.rint((vectors - self.low) / self.step) - 128
+        return np.clip(levels, -128, 127).astype(np.int8)
+
+    def _score_table(self, query):
+        # q . (low + (code + 128) * step) ranks like code . (q * step): the rest is constant per query
+        return query * self.step
+
+    def _scores(self, table, codes):
+        return codes.astype(np.float32) @ table
+
+
+class ProductQuantizer(_QuantizedIndex):
+    """PQ codes: the dimensions are split into m sub-vectors, each replaced by its nearest trained centroid."""
+
+    def __init__(self, m=16, n_centroids=256, kmeans_iters=20, **kwargs):
+        if not 1 <= n_centroids <= 256:
+            raise ValueError("n_centroids must be between 1 and 256 (codes are one byte)")
+        self.m = m
+        self.n_centroids = n_centroids
+        self.kmeans_iters = kmeans_iters
+        super().__init__(**kwargs)
+
+    def _code_width(self):
+        return len(self.subspaces)
+
+    def _fit(self, sample):
+        self.subspaces = [s for s in np.array_split(np.arange(sample.shape[1]), self.m) if s.size]
+        self.codebooks = [self._kmeans(sample[:, dims]) for dims in self.subspaces]
+
+    def _kmeans(self, x):
+        k = min(self.n_centroids, x.shape[0])
+        centroids = x[self.rng.choice(x.shape[0], size=k, replace=False)].copy()
+        for _ in range(self.kmeans_iters):
+            assignment = self._nearest(x, centroids)
+            counts = np.bincount(assignment, minlength=k)
+            sums = np.stack([np.bincount(assignment, weights=x[:, d], minlength=k) for d in range(x.shape[1])], axis=1)
+            empty = counts == 0
+            centroids[~empty] = sums[~empty] / counts[~empty, None]
+            # re-seed empty clusters on random points
+            centroids[empty] = x[self.rng.choice(x.shape[0], size=int(empty.sum()))]
+        return centroids
+
+    @staticmethod
+    def _nearest(x, centroids):
+        distances = (centroids ** 2).sum(axis=1) - 2.0 * x @ centroids.T
+        return distances.argmin(axis=1)
+
+    def _encode(self, vectors):
+        codes = np.empty((vectors.shape[0], len(self.subspaces)), dtype=np.uint8)
+        for j, (dims, centroids) in enumerate(zip(self.subspaces, self.codebooks)):
+            codes[:, j] = self._nearest(vectors[:, dims], centroids)
+        return codes
+
+    def _score_table(self, query):
+        # per-query lookup table: table[j, c] = q_j . centroid_c of sub-vector j
+        table = np.zeros((len(self.subspaces), self.n_centroids), dtype=np.float32)
+        for j, (dims, centroids) in enumerate(zip(self.subspaces, self.codebooks)):
+            table[j, : centroids.shape[0]] = centroids @ query[dims]
+        return table
+
+    def _scores(self, table, codes):
+        scores = np.zeros(codes.shape[0], dtype=np.float32)
+        for j in range(codes.shape[1]):
+            scores += table[j].take(codes[:, j])
+        return scores
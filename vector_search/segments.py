@@ -0,0 +1,119 @@
+# segments.py
+
+"""
+Sealed vector segments for data sets larger than RAM.
+
+A VectorMatrix keeps fresh writes in an in-memory delta. seal() turns the
+delta into an immutable Segment: its rows keep their row numbers, are written
+to a flat .npy file (float32, or float16 to halve the footprint) and are then
+read through np.memmap, so the OS pages them in and out instead of the heap
+holding them. merge_segments() rewrites the sealed segments without the rows
+that were removed since, and renumbers rows through the usual remaps.
+
+- Segment: An immutable block of normalized rows [base, base + n).
+- write_segment: Writes rows to a .npy file and returns them memory-mapped.
+- SegmentManager: Seals the delta once it is large enough and merges segments,
+  on demand (run_once) or on a background thread.
+"""
+
+import os
+import threading
+
+import numpy as np
+
+
+class Segment:
+    def __init__(self, base, vectors, path=None):
+        self.base = base
+        # normalized rows; an in-memory array while sealing, a read-only memmap afterwards
+        self.vectors = vectors
+        self.path = path
+
+    @property
+    def n(self):
+        return self.vectors.shape[0]
+
+    @property
+    def end(self):
+        return self.base + self.n
+
+    @property
+    def mapped(self):
+        return isinstance(self.vectors, np.memmap)
+
+    def drop_file(self):
+        if self.path is not None and os.path.exists(self.path):
+            self.vectors = None
+            os.remove(self.path)
+
+
+def write_segment(path, chunks, shape, dtype=np.float32):
+    """
+    Writes consecutive blocks of rows (chunks, together of the given shape) as a flat .npy
+    file, via a temporary name, and returns a read-only memmap of it.
+    """
+    tmp = path + ".tmp"
+    out = np.lib.format.open_memmap(tmp, mode="w+", dtype=dtype, shape=tuple(shape))
+    start = 0
+    for chunk in chunks:
+        out[start : start + chunk.shape[0]] = chunk
+        start += chunk.shape[0]
+    out.flush()
+    del out
+    os.replace(tmp, path)
+    return np.load(path, mmap_mode="r")
+
+
+class SegmentManager:
+    def __init__(self, store, directory, dtype=np.float32, seal_rows=100_000, max_segments=8,
+                 merge_garbage=0.25, interval=1.0):
+        """
+        Args:
+            store (VectorMatrix): The matrix whose delta is sealed.
+            directory (str): Where segment files are written.
+            dtype: float32, or float16 to halve sealed storage (at a small precision cost).
+            seal_rows (int): Seal the delta once it holds this many rows.
+            max_segments (int): Merge when there are more sealed segments than this...
+            merge_garbage (float): ...or when this fraction of sealed rows has been removed.
+            interval (float): Seconds between background passes.
+        """
+        self.store = store
+        self.directory = directory
+        self.dtype = np.dtype(dtype)
+        self.seal_rows = seal_rows
+        self.max_segments = max_segments
+        self.merge_garbage = merge_garbage
+        self.interval = interval
+        self.stats = {"seals": 0, "merges": 0}
+        os.makedirs(directory, exist_ok=True)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self):
+        store = self.store
+        if store.size - store.delta_base >= self.seal_rows:
+            store.seal(self.directory, self.dtype)
+            self.stats["seals"] += 1
+        if len(store.segments) > self.max_segments or (
+            store.segments and store.sealed_garbage() > self.merge_garbage
+        ):
+            store.merge_segments(self.directory, self.dtype)
+            self.stats["merges"] += 1
+        return dict(self.stats)
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="vector-segments", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -1,25 +1,96 @@
 import os
-os.environ["USE_TF"] = "0"
 
-from sentence_transformers import SentenceTransformer
 import numpy as np
-from scipy.spatial.distance import cdist
-from vector_search.vector_store import get_all_vectors
+from vector_search import metrics, vector_store
+from vector_search.embedding_cache import EmbeddingCache
+from vector_search.encoder_pool import PooledEncoder
+from vector_search.encoders import encoder_from_name
 
 """
 Utility functions for vector encoding and similarity search.
 
-- string_to_vector: Converts text to a vector using a pre-trained model.
-- compute_top_k: Finds the top-k closest vectors to a query using a distance metric.
+- get_encoder / set_encoder: The active encoder. It is chosen by VECTOR_DB_ENCODER
+  ("instructor" by default, or "hashing" for a model-free deterministic encoder)
+  and nothing is loaded until the first encode, unless warm_up is called. With
+  VECTOR_DB_ENCODER_PROCESSES set, it runs in that many worker processes behind a
+  micro-batching queue (see encoder_pool).
+- string_to_vector: Converts text to a vector using the active encoder, through
+  an LRU embedding cache (VECTOR_DB_CACHE_SIZE entries; persisted to
+  VECTOR_DB_CACHE_DIR when that is set).
+- strings_to_vectors: Batched variant of string_to_vector for bulk loads.
+- get_top_k_keys: Finds the top-k closest vectors to a query using a distance metric.
+  Uses the store's ANN index when one is attached, unless the key filter is
+  selective enough that an exact scan is cheaper.
+- get_top_k_keys_batch: get_top_k_keys for many queries against the same filter,
+  scored as one matrix-matrix product.
 """
 
 
-model = SentenceTransformer("hkunlp/instructor-xl")
+if os.environ.get("VECTOR_DB_ENCODER_PROCESSES"):
+    encoder = PooledEncoder(
+        os.environ.get("VECTOR_DB_ENCODER", "instructor"),
+        processes=int(os.environ["VECTOR_DB_ENCODER_PROCESSES"]),
+        max_batch=int(os.environ.get("VECTOR_DB_ENCODER_BATCH", 32)),
+        max_wait_ms=float(os.environ.get("VECTOR_DB_ENCODER_WAIT_MS", 5)),
+    )
+else:
+    encoder = encoder_from_name(os.environ.get("VECTOR_DB_ENCODER", "instructor"))
+
+embedding_cache = EmbeddingCache(
+    max_entries=int(os.environ.get("VECTOR_DB_CACHE_SIZE", 10000)),
+    disk_dir=os.environ.get("VECTOR_DB_CACHE_DIR"),
+)
+
+def get_encoder():
+    return encoder
+
+def set_encoder(new_encoder):
+    """Swaps the active encoder (an Encoder instance or a VECTOR_DB_ENCODER-style name)."""
+    global encoder
+    encoder = encoder_from_name(new_encoder) if isinstance(new_encoder, str) else new_encoder
+    return encoder
+
+def warm_up(background=True):
+    """Loads the encoder ahead of the first query; returns the warm-up thread when background."""
+    return encoder.warm_up(background=background)
+
+if os.environ.get("VECTOR_DB_WARMUP") == "1":
+    warm_up()
 
 def string_to_vector(text):
-    return model.encode(text).tolist()
+    vector = embedding_cache.get(encoder.name, text)
+    if vector is None:
+        with metrics.span("encode"):
+            encoded = encoder.encode([text])[0]
+        vector = embedding_cache.put(encoder.name, text, encoded)
+    return vector
+
+def strings_to_vectors(texts, batch_size=64):
+    """
+    Batched string_to_vector: cached texts are served from the embedding cache and
+    the rest are encoded with encoder.encode(..., batch_size=batch_size).
+
+    Returns:
+        list of np.ndarray: One vector per input text, in order.
+    """
+    vectors = {}
+    missing = []
+    for text in texts:
+        if text in vectors:
+            continue
+        vectors[text] = embedding_cache.get(encoder.name, text)
+        if vectors[text] is None:
+            missing.append(text)
+
+    for start in range(0, len(missing), batch_size):
+        batch = missing[start:start + batch_size]
+        with metrics.span("encode"):
+            encoded = encoder.encode(batch, batch_size=batch_size)
+        for text, vector in zip(batch, encoded):
+            vectors[text] = embedding_cache.put(encoder.name, text, vector)
+    return [vectors[text] for text in texts]
 
-def get_top_k_keys(query, valid_keys, k, metric="cosine"):
+def get_top_k_keys(query, valid_keys, k, metric="cosine", ef_search=None):
     """
     Computes the top-k closest vectors to the query.
 
@@ -27,29 +98,40 @@ def get_top_k_keys(query, valid_keys, k, metric="cosine"):
         query (list of float): The query vector.
         k (int): Number of top results to return.
         metric (str): Distance metric to use (default: "cosine").
-        valid_keys (list of str, optional): If provided, only consider candidates whose keys are in this list.
+        valid_keys (RowMask, bool np.ndarray or iterable of str): Visible candidates, either as a
+            row mask over the vector store or as a collection of keys.
+        ef_search (int, optional): Beam width override when an ANN index is attached.
 
     Returns:
-        list of dict: Top-k results with 'key' and 'score'.
+        list of str: Keys of the top-k results, closest first.
     """
 
-    keys_and_vectors = get_all_vectors()
-    # print(f"Total vectors in store: {len(keys_and_vectors)}")
-    
-    candidates = [c for c in keys_and_vectors if c["key"] in valid_keys]
-    # print(f"Filtered candidates: {len(candidates)}")
+    store = vector_store.vector_store
+    return store.search(query, k, _search_mask(store, valid_keys), metric=metric, ef_search=ef_search)
 
-    if not candidates:
-        return []
+def _search_mask(store, valid_keys):
+    if isinstance(valid_keys, (vector_store.RowMask, np.ndarray)):
+        return valid_keys
+    with metrics.span("search.filter"), store.lock:
+        return store.mask_for(valid_keys)
 
-    keys = [c["key"] for c in candidates]
-    vectors = np.array([c["vector"] for c in candidates])
-    query_vec = np.array(query)
+def get_top_k_keys_batch(queries, valid_keys, k, metric="cosine", ef_search=None):
+    """
+    get_top_k_keys for a batch of query vectors sharing one set of visible candidates.
+    The filter is resolved once and the queries are scored together.
 
-    distances = cdist([query_vec], vectors, metric=metric)[0]
-    # print(f"Distances: {distances}")
+    Args:
+        queries (list of list of float or np.ndarray): The query vectors, one per row.
+        valid_keys (RowMask, bool np.ndarray or iterable of str): Visible candidates.
+        k (int): Number of top results per query.
+        metric (str): Distance metric to use (default: "cosine").
+        ef_search (int, optional): Beam width override when an ANN index is attached.
 
-    top_k_indices = np.argsort(distances)[:k]
-    # print(f"Top {k} indices: {top_k_indices}")
+    Returns:
+        list of list of str: Keys of each query's top-k results, closest first.
+    """
 
-    return [keys[i] for i in top_k_indices]
+    if len(queries) == 0:
+        return []
+    store = vector_store.vector_store
+    return store.search_many(queries, k, _search_mask(store, valid_keys), metric=metric, ef_search=ef_search)
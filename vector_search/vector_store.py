@@ -3,19 +3,603 @@
 """
 In-memory key-vector store utilities.
 
+Vectors live in a single preallocated float32 matrix that grows by doubling.
+Every row is L2-normalized on insert (the original norm is kept alongside),
+so cosine similarity against a normalized query is one matrix-vector product.
+Mutations take the matrix's own lock; searches hold it only long enough to
+grab consistent views and score outside it. Rows freed by remove_vector are
+reused by later inserts, and compact() moves
+live rows down to close the holes (RowMasks and the index follow along through
+the recorded row remaps). An optional ANN
+index (see hnsw.py) can be attached and is kept in sync on every add/remove.
+The matrix itself is only the in-memory delta: seal() moves it into an
+immutable memory-mapped segment (see segments.py), and searches score every
+segment plus the delta block by block (optionally sharded over a thread
+pool) and merge their top-k lists.
+
+- VectorMatrix: The matrix engine (key -> row index, free-list row reuse).
+- RowMask: Incrementally maintained visibility bitmap over matrix rows.
+- set_index: Attaches (or detaches, with None) an ANN index to the store.
+- set_search_workers: Scores exact searches in parallel shards on a thread pool.
 - add_vector: Adds a vector with a key.
+- remove_vector: Removes the vector stored under a key.
+- get_vector: Retrieves the original (un-normalized) vector for a key.
 - get_all_vectors: Retrieves all stored vectors.
 - reset_store: Clears the store.
 """
 
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from scipy.spatial.distance import cdist
+
+from . import metrics
+from .segments import Segment, write_segment
+
+
+class VectorMatrix:
+    def __init__(self, dim=None, capacity=1024, dtype=np.float32):
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.initial_capacity = max(1, capacity)
+        self.index = None
+        # bumped whenever rows move; remaps[g] maps rows of generation g to generation g + 1 (-1: dropped)
+        self.generation = 0
+        self.remaps = []
+        self.size = 0
+        # rows [0, delta_base) are sealed into segments; rows from delta_base on live in self.matrix
+        self.segments = []
+        self.delta_base = 0
+        # rows scored per block during a search, which bounds the temporaries on large segments
+        self.search_chunk_rows = 65536
+        # queries scored together in search_many; with search_chunk_rows this bounds the distance block
+        self.search_query_batch = 64
+        # optional thread pool for sharded scoring (see set_search_workers)
+        self._search_pool = None
+        self.search_shards = None
+        self.lock = threading.RLock()
+        # serializes seal / merge_segments, which do their file I/O outside self.lock
+        self._maintenance_lock = threading.Lock()
+        self._segment_count = 0
+        self.clear()
+
+    def clear(self):
+        with self._maintenance_lock, self.lock:
+            self._clear()
+
+    def _clear(self):
+        if self.size:
+            self.remaps.append(np.full(self.size, -1, dtype=np.intp))
+            self.generation += 1
+        for segment in self.segments:
+            segment.drop_file()
+        self.segments = []
+        self.delta_base = 0
+        self.key_to_row = {}
+        self.row_keys = []
+        self.free_rows = []
+        self.size = 0  # rows [0, size) have been handed out at least once
+        self._allocate(self.initial_capacity if self.dim is not None else 0)
+        if self.index is not None:
+            self.index.clear()
+
+    def attach_index(self, index):
+        """Attaches an ANN index (or detaches with None); live rows are indexed immediately."""
+        with self.lock:
+            self.index = index
+            if index is not None:
+                index.bind(self)
+
+    def _allocate(self, capacity):
+        # capacity counts delta rows; norms and live cover sealed rows as well
+        dim = self.dim or 0
+        self.matrix = np.zeros((capacity, dim), dtype=self.dtype)
+        self.norms = np.zeros(self.delta_base + capacity, dtype=self.dtype)
+        self.live = np.zeros(self.delta_base + capacity, dtype=bool)
+
+    @property
+    def capacity(self):
+        return self.delta_base + self.matrix.shape[0]
+
+    def _grow(self, min_capacity):
+        capacity = max(self.matrix.shape[0], self.initial_capacity)
+        while self.delta_base + capacity < min_capacity:
+            capacity *= 2
+        matrix, norms, live = self.matrix, self.norms, self.live
+        self._allocate(capacity)
+        n = self.size - self.delta_base
+        self.matrix[:n] = matrix[:n]
+        self.norms[: self.size] = norms[: self.size]
+        self.live[: self.size] = live[: self.size]
+
+    def _take_row(self):
+        if self.free_rows:
+            return self.free_rows.pop()
+        if self.size == self.capacity:
+            self._grow(self.size + 1)
+        row = self.size
+        self.size += 1
+        self.row_keys.append(None)
+        return row
+
+    def add(self, key, vector):
+        """Stores vector under key, overwriting any previous vector for key. Returns its row."""
+        vec = np.asarray(vector, dtype=self.dtype).reshape(-1)
+        norm = np.linalg.norm(vec)
+        with self.lock:
+            return self._add(key, vec, norm)
+
+    def _add(self, key, vec, norm):
+        if self.dim is None:
+            self.dim = vec.shape[0]
+            self._allocate(self.initial_capacity)
+        elif vec.shape[0] != self.dim:
+            raise ValueError(f"vector has dimension {vec.shape[0]}, store expects {self.dim}")
+
+        row = self.key_to_row.get(key)
+        if row is not None and row < self.delta_base:
+            # sealed rows are immutable: the new vector moves the key into the delta
+            self._remove(key)
+            row = None
+        if row is None:
+            row = self._take_row()
+            self.key_to_row[key] = row
+            self.row_keys[row] = key
+
+        self.matrix[row - self.delta_base] = vec / norm if norm > 0 else 0
+        self.norms[row] = norm
+        self.live[row] = True
+        if self.index is not None:
+            self.index.add(row)
+        return row
+
+    def remove(self, key):
+        """Frees the row holding key. Returns the freed row, or None if key is absent."""
+        with self.lock:
+            return self._remove(key)
+
+    def _remove(self, key):
+        row = self.key_to_row.pop(key, None)
+        if row is None:
+            return None
+        if self.index is not None:
+            self.index.remove(row)
+        self.row_keys[row] = None
+        self.live[row] = False
+        self.norms[row] = 0
+        if row >= self.delta_base:
+            self.matrix[row - self.delta_base] = 0
+            self.free_rows.append(row)
+        # a sealed row stays behind as garbage until merge_segments drops it
+        return row
+
+    def fragmentation(self):
+        """Fraction of handed-out delta rows that are currently free."""
+        n = self.size - self.delta_base
+        return len(self.free_rows) / n if n else 0.0
+
+    def sealed_garbage(self):
+        """Fraction of sealed rows whose key has been removed or rewritten since sealing."""
+        if not self.delta_base:
+            return 0.0
+        return 1.0 - np.count_nonzero(self.live[: self.delta_base]) / self.delta_base
+
+    def compact(self):
+        """
+        Moves live delta rows to the front of a freshly allocated delta and drops the free list
+        (sealed rows keep their numbers; merge_segments reclaims those).
+        Arrays are replaced rather than modified in place, so views taken earlier stay intact.
+        Returns the old -> new row mapping (-1 for rows that were free).
+        """
+        with self.lock:
+            return self._compact()
+
+    def _compact(self):
+        base = self.delta_base
+        live_rows = base + np.flatnonzero(self.live[base : self.size])
+        n = live_rows.size
+        mapping = np.full(self.size, -1, dtype=np.intp)
+        mapping[:base] = np.arange(base)
+        mapping[live_rows] = base + np.arange(n)
+
+        matrix, norms, live = self.matrix, self.norms, self.live
+        self._allocate(max(self.initial_capacity, n))
+        self.matrix[:n] = matrix[live_rows - base]
+        self.norms[:base] = norms[:base]
+        self.norms[base : base + n] = norms[live_rows]
+        self.live[:base] = live[:base]
+        self.live[base : base + n] = True
+        self.row_keys = self.row_keys[:base] + [self.row_keys[r] for r in live_rows]
+        self.key_to_row = {key: row for row, key in enumerate(self.row_keys) if key is not None}
+        self.free_rows = []
+        self.size = base + n
+        self._record_remap(mapping)
+        return mapping
+
+    def _record_remap(self, mapping):
+        self.remaps.append(mapping)
+        self.generation += 1
+        if self.index is not None:
+            self.index.remap(mapping)
+
+    def _segment_path(self, directory):
+        self._segment_count += 1
+        return os.path.join(directory, f"segment-{self._segment_count:06d}.npy")
+
+    def seal(self, directory, dtype=None):
+        """
+        Freezes the current delta into an immutable segment, written to directory as a flat
+        .npy file in dtype (default: the matrix dtype) and memory-mapped from then on. Writes
+        go on into a fresh delta meanwhile; sealed rows keep their row numbers.
+        Returns the new Segment, or None if the delta was empty.
+        """
+        with self._maintenance_lock:
+            with self.lock:
+                n = self.size - self.delta_base
+                if n == 0:
+                    return None
+                # free delta rows are sealed as garbage; the frozen array is never written again
+                segment = Segment(self.delta_base, self.matrix[:n])
+                self.segments.append(segment)
+                norms, live = self.norms, self.live
+                self.delta_base = self.size
+                self.free_rows = []
+                self._allocate(self.initial_capacity)
+                self.norms[: self.size] = norms[: self.size]
+                self.live[: self.size] = live[: self.size]
+                path = self._segment_path(directory)
+
+            vectors = write_segment(path, [segment.vectors], segment.vectors.shape, dtype or self.dtype)
+            with self.lock:
+                segment.vectors, segment.path = vectors, path
+            return segment
+
+    def merge_segments(self, directory, dtype=None):
+        """
+        Rewrites all sealed segments into one, without the rows removed since they were sealed,
+        and renumbers rows accordingly (recorded as a remap, like compact()).
+        Returns the old -> new row mapping, or None if nothing is sealed.
+        """
+        with self._maintenance_lock:
+            with self.lock:
+                segments = list(self.segments)
+                if not segments:
+                    return None
+                end = self.delta_base
+                keep = np.flatnonzero(self.live[:end])
+                path = self._segment_path(directory)
+
+            # segments are immutable, so the copy runs without the lock
+            chunks = (
+                segment.vectors[rows - segment.base]
+                for segment in segments
+                for block in [keep[(keep >= segment.base) & (keep < segment.end)]]
+                for rows in np.array_split(block, max(1, -(-block.size // self.search_chunk_rows)))
+                if rows.size
+            )
+            n = keep.size
+            vectors = write_segment(path, chunks, (n, self.dim), dtype or self.dtype) if n else None
+
+            with self.lock:
+                dropped = end - n
+                mapping = np.full(self.size, -1, dtype=np.intp)
+                mapping[keep] = np.arange(n)
+                mapping[end:] = np.arange(end, self.size) - dropped
+
+                norms, live = self.norms, self.live
+                self.delta_base = n
+                self.norms = np.zeros(norms.shape[0] - dropped, dtype=self.dtype)
+                self.live = np.zeros(live.shape[0] - dropped, dtype=bool)
+                self.norms[:n] = norms[keep]
+                self.norms[n:] = norms[end:]
+                # rows removed while the merge was copying stay behind as (dead) garbage
+                self.live[:n] = live[keep]
+                self.live[n:] = live[end:]
+                self.row_keys = [self.row_keys[r] for r in keep] + self.row_keys[end:]
+                self.key_to_row = {key: row for row, key in enumerate(self.row_keys) if key is not None}
+                self.free_rows = [r - dropped for r in self.free_rows]
+                self.size -= dropped
+                self.segments = [Segment(0, vectors, path)] if n else []
+                self._record_remap(mapping)
+
+            for segment in segments:
+                segment.drop_file()
+            return mapping
+
+    def vectors(self, rows):
+        """Normalized vectors of the given rows, wherever they live (delta or sealed segment)."""
+        if not self.delta_base:
+            return self.matrix[rows]
+        rows = np.asarray(rows, dtype=np.intp)
+        if rows.ndim == 0:
+            return self.vectors(rows.reshape(1))[0]
+        out = np.empty((rows.shape[0], self.dim), dtype=self.dtype)
+        in_delta = rows >= self.delta_base
+        out[in_delta] = self.matrix[rows[in_delta] - self.delta_base]
+        if not in_delta.all():
+            sealed = np.flatnonzero(~in_delta)
+            starts = np.array([segment.base for segment in self.segments])
+            owners = np.searchsorted(starts, rows[sealed], side="right") - 1
+            for owner in np.unique(owners):
+                segment = self.segments[owner]
+                picked = sealed[owners == owner]
+                out[picked] = segment.vectors[rows[picked] - segment.base]
+        return out
+
+    def get(self, key):
+        row = self.key_to_row.get(key)
+        if row is None:
+            return None
+        return self.vectors(row) * self.norms[row]
+
+    def rows_for(self, keys):
+        """Row indices (in iteration order) of the given keys that are present in the store."""
+        key_to_row = self.key_to_row
+        return np.fromiter(
+            (key_to_row[k] for k in keys if k in key_to_row), dtype=np.intp
+        )
+
+    def mask_for(self, keys):
+        """Boolean mask over view() rows, set for the given keys."""
+        mask = np.zeros(self.size, dtype=bool)
+        mask[self.rows_for(keys)] = True
+        return mask
 
-vector_store = {}
+    def view(self):
+        """
+        (normalized matrix, norms, live flags) over the rows handed out so far. Zero-copy views
+        while nothing is sealed; otherwise the matrix part is gathered into memory.
+        """
+        matrix = self.matrix[: self.size] if not self.delta_base else self.vectors(np.arange(self.size))
+        return matrix, self.norms[: self.size], self.live[: self.size]
+
+    def normalize(self, query):
+        q = np.asarray(query, dtype=self.dtype).reshape(-1)
+        norm = np.linalg.norm(q)
+        return q / norm if norm > 0 else q
+
+    def _blocks(self):
+        # (first row, normalized rows) of every segment and of the delta, in row order
+        blocks = [(segment.base, segment.vectors) for segment in self.segments]
+        blocks.append((self.delta_base, self.matrix[: self.size - self.delta_base]))
+        return blocks
+
+    def _consistent_view(self, mask):
+        """
+        (blocks, norms, candidates, row_keys) captured together under the lock.
+        Writers replace these arrays on growth / compaction / sealing instead of
+        touching them in place, and rows inside a caller's mask are never freed
+        under it, so scoring can run on the capture after the lock is released.
+        """
+        with self.lock:
+            norms, live = self.norms[: self.size], self.live[: self.size]
+            if mask is None:
+                candidates = live.copy()
+            else:
+                if isinstance(mask, RowMask):
+                    mask = mask.view()
+                candidates = np.zeros(self.size, dtype=bool)
+                n = min(self.size, mask.shape[0])
+                candidates[:n] = live[:n] & mask[:n]
+            return self._blocks(), norms, candidates, self.row_keys
+
+    def _rank(self, blocks, norms, candidates, query, k, metric):
+        return self._rank_many(blocks, norms, candidates, np.asarray(query, dtype=self.dtype)[None, :], k, metric)[0]
+
+    def _rank_many(self, blocks, norms, candidates, queries, k, metric):
+        n = int(np.count_nonzero(candidates))
+        if n == 0 or k <= 0:
+            return [np.empty(0, dtype=np.intp) for _ in range(queries.shape[0])]
+        k = min(k, n)
+        results = []
+        for start in range(0, queries.shape[0], self.search_query_batch):
+            group = queries[start : start + self.search_query_batch]
+            results.extend(self._rank_group(blocks, norms, candidates, group, k, metric))
+        return results
+
+    def set_search_workers(self, workers, shards=None):
+        """
+        Scores searches on a pool of `workers` threads (NumPy releases the GIL in the products),
+        splitting the rows into `shards` ranges (default: one per worker). workers <= 1 goes back
+        to scoring on the calling thread.
+        """
+        with self.lock:
+            old, self._search_pool = self._search_pool, None
+            self.search_shards = None
+            if workers and workers > 1:
+                self._search_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="vector-search")
+                self.search_shards = shards or workers
+        if old is not None:
+            old.shutdown(wait=True)
+
+    def _shards(self, blocks, candidates):
+        # (first row, rows) ranges of at most search_chunk_rows rows (fewer when sharding), skipping masked-out ones
+        step = self.search_chunk_rows
+        if self.search_shards:
+            step = min(step, max(1, -(-candidates.shape[0] // self.search_shards)))
+        for base, block in blocks:
+            for start in range(0, block.shape[0], step):
+                first = base + start
+                if candidates[first : first + step].any():
+                    yield first, block[start : start + step]
+
+    def _rank_shard(self, first, chunk, norms, candidates, q, k, metric):
+        allowed = candidates[first : first + chunk.shape[0]]
+        if metric == "cosine":
+            # rows are pre-normalized, so cosine distance is 1 - dot product
+            distances = 1.0 - q @ chunk.T
+            distances[:, ~allowed] = np.inf
+            rows = np.arange(first, first + chunk.shape[0])
+        else:
+            local = np.flatnonzero(allowed)
+            vectors = chunk[local].astype(self.dtype) * norms[first + local, None]
+            distances = cdist(q, vectors, metric=metric)
+            rows = first + local
+        kk = min(k, distances.shape[1])
+        if kk < distances.shape[1]:
+            top = np.argpartition(distances, kk - 1, axis=1)[:, :kk]
+        else:
+            top = np.broadcast_to(np.arange(kk), (q.shape[0], kk))
+        return rows[top], np.take_along_axis(distances, top, axis=1)
+
+    def _rank_group(self, blocks, norms, candidates, queries, k, metric):
+        if metric == "cosine":
+            norm = np.linalg.norm(queries, axis=1, keepdims=True)
+            q = np.divide(queries, norm, out=queries.astype(self.dtype), where=norm > 0)
+        else:
+            q = queries
+
+        # top-k per shard (in parallel when a pool is set), then one merge over the survivors
+        def rank(shard):
+            return self._rank_shard(*shard, norms, candidates, q, k, metric)
+
+        shards = list(self._shards(blocks, candidates))
+        pool = self._search_pool
+        found = list(pool.map(rank, shards)) if pool is not None and len(shards) > 1 else [rank(s) for s in shards]
+
+        rows = np.hstack([rows for rows, _ in found])
+        distances = np.hstack([distances for _, distances in found])
+        order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+        rows, distances = np.take_along_axis(rows, order, axis=1), np.take_along_axis(distances, order, axis=1)
+        # a shard with fewer than k candidates contributes masked-out (infinite) rows too
+        return [r[np.isfinite(d)] for r, d in zip(rows, distances)]
+
+    def exact_search(self, query, k, mask=None, metric="cosine"):
+        """Brute-force top-k over live rows (restricted to mask if given). Returns rows, closest first."""
+        blocks, norms, candidates, _ = self._consistent_view(mask)
+        return self._rank(blocks, norms, candidates, query, k, metric)
+
+    def search(self, query, k, mask=None, metric="cosine", ef_search=None):
+        """
+        Top-k over live rows (restricted to mask if given), through the ANN index when it is worth using.
+        Sealed segments and the delta are scored block by block and their top-k lists merged.
+        Returns keys, closest first: rows can move once the lock is released, keys cannot.
+        """
+        return self.search_many([query], k, mask, metric=metric, ef_search=ef_search)[0]
+
+    def search_many(self, queries, k, mask=None, metric="cosine", ef_search=None):
+        """
+        search() for a batch of queries sharing one mask: the view is captured once and the exact
+        path scores all queries as one matrix-matrix product per block. Returns one key list per query.
+        """
+        queries = np.asarray(queries, dtype=self.dtype).reshape(len(queries), -1)
+        if self.index is not None and metric == "cosine":
+            # the graph is mutated in place by add / remove / remap, so the candidate mask has to be
+            # built and the graph walked in one lock hold, or their rows may disagree
+            with self.lock:
+                with metrics.span("search.filter"):
+                    blocks, norms, candidates, row_keys = self._consistent_view(mask)
+                index = self.index
+                if index is not None and not index.prefers_exact(int(np.count_nonzero(candidates)), len(self)):
+                    with metrics.span("search.index"):
+                        return [
+                            [row_keys[r] for r in index.search(self.normalize(q), k, candidates, ef_search=ef_search)[0]]
+                            for q in queries
+                        ]
+        else:
+            with metrics.span("search.filter"):
+                blocks, norms, candidates, row_keys = self._consistent_view(mask)
+        with metrics.span("search.score"):
+            ranked = self._rank_many(blocks, norms, candidates, queries, k, metric)
+        return [[row_keys[r] for r in rows] for rows in ranked]
+
+    def keys(self):
+        return self.key_to_row.keys()
+
+    def __len__(self):
+        return len(self.key_to_row)
+
+    def __contains__(self, key):
+        return key in self.key_to_row
+
+
+class RowMask:
+    """
+    Visibility bitmap over the rows of a VectorMatrix.
+
+    Built once from a set of keys and then maintained incrementally with
+    add / discard as a transaction writes; grows with the matrix.
+    """
+
+    def __init__(self, store, keys=()):
+        self.store = store
+        # generation and rows captured together, or a compaction in between would be replayed twice
+        with store.lock:
+            self.generation = store.generation
+            self.bits = np.zeros(store.capacity, dtype=bool)
+            self.bits[store.rows_for(keys)] = True
+
+    def _sync(self):
+        # replay any row moves (compaction / reset) since the mask was last used
+        while self.generation < self.store.generation:
+            mapping = self.store.remaps[self.generation]
+            rows = np.flatnonzero(self.bits[: mapping.shape[0]])
+            rows = mapping[rows]
+            self.bits = np.zeros(self.store.capacity, dtype=bool)
+            self.bits[rows[rows >= 0]] = True
+            self.generation += 1
+
+    def _fit(self, rows):
+        self._sync()
+        if rows > self.bits.shape[0]:
+            bits = np.zeros(max(rows, self.store.capacity), dtype=bool)
+            bits[: self.bits.shape[0]] = self.bits
+            self.bits = bits
+
+    def add(self, key):
+        with self.store.lock:
+            row = self.store.key_to_row.get(key)
+            if row is not None:
+                self._fit(row + 1)
+                self.bits[row] = True
+
+    def discard(self, key):
+        with self.store.lock:
+            self._sync()
+            row = self.store.key_to_row.get(key)
+            if row is not None and row < self.bits.shape[0]:
+                self.bits[row] = False
+
+    def copy(self):
+        clone = RowMask.__new__(RowMask)
+        clone.store = self.store
+        # a concurrent _sync of this mask swaps bits and generation under the lock
+        with self.store.lock:
+            clone.generation = self.generation
+            clone.bits = self.bits.copy()
+        return clone
+
+    def view(self):
+        """The mask as a bool array aligned with store.view() rows."""
+        with self.store.lock:
+            self._fit(self.store.size)
+            return self.bits[: self.store.size]
+
+    def __len__(self):
+        return int(np.count_nonzero(self.view() & self.store.live[: self.store.size]))
+
+
+vector_store = VectorMatrix()
+
+def set_index(index):
+    vector_store.attach_index(index)
+
+def set_search_workers(workers, shards=None):
+    vector_store.set_search_workers(workers, shards)
 
 def add_vector(key, vector):
-    vector_store[key] = vector
+    vector_store.add(key, vector)
+
+def remove_vector(key):
+    vector_store.remove(key)
+
+def get_vector(key):
+    return vector_store.get(key)
 
 def get_all_vectors():
-    return [{"key": k, "vector": v} for k, v in vector_store.items()]
+    return [{"key": k, "vector": vector_store.get(k)} for k in vector_store.keys()]
 
 def reset_store():
     vector_store.clear()